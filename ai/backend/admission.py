@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, TypeVar
+
+_T = TypeVar("_T")
+
+
+class AdmissionRejected(Exception):
+    """No slot for this call: the wait queue is full, the wait took too long, or it was preempted."""
+
+    def __init__(self, name: str, reason: str) -> None:
+        self.name = name
+        self.reason = reason  # "queue_full" | "queue_timeout" | "reserved" | "preempted"
+        super().__init__(f"{name} admission rejected: {reason}")
+
+
+# Request priority classes, highest first: Telegram chats, API/proxy
+# callers, and work nobody is waiting on (cache warming, prompt translation).
+INTERACTIVE = "interactive"
+API = "api"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, API, BACKGROUND)
+
+
+def parse_priority(value: Optional[str], default: str = API) -> str:
+    """Normalize a client-supplied priority class; unknown values get ``default``."""
+    value = (value or "").strip().lower()
+    return value if value in PRIORITIES else default
+
+
+class AdmissionLimiter:
+    """Concurrency limit with bounded priority wait queues and a maximum wait.
+
+    ``max_concurrent`` calls run at once (0 = unlimited). Further callers wait
+    in queues of at most ``max_queue`` in total; a caller that finds them
+    full, or waits longer than ``max_wait_s``, gets :class:`AdmissionRejected`
+    instead of piling more work onto a saturated upstream. Released slots go
+    to the oldest waiter of the highest priority class.
+
+    Background calls never take the last ``background_reserve`` slots (when
+    that leaves none, they are rejected at once with reason ``reserved``) and
+    wait while a higher-class caller is queued or one waited longer than
+    ``slo_wait_s`` in the last ``slo_window_s``. A higher-class caller that
+    has to queue also preempts the newest running background call that
+    registered a ``preempt`` event.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = 4,
+        max_queue: int = 32,
+        max_wait_s: float = 15.0,
+        window: int = 200,
+        background_reserve: int = 1,
+        slo_wait_s: float = 1.0,
+        slo_window_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.max_concurrent = max(0, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_s = max_wait_s
+        self.background_reserve = max(0, background_reserve)
+        self.slo_wait_s = slo_wait_s
+        self.slo_window_s = slo_window_s
+        self._clock = clock
+        self.active = 0
+        self._waiters: Dict[str, Deque["asyncio.Future[None]"]] = {p: deque() for p in PRIORITIES}
+        self._waits: Dict[str, Deque[float]] = {p: deque(maxlen=window) for p in PRIORITIES}
+        self._admitted_by: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._preemptible: List[asyncio.Event] = []
+        self._slo_missed_at: Optional[float] = None
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.rejected_reserved = 0
+        self.peak_queue = 0
+        self.preempted = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    def queued_for(self, priority: str) -> int:
+        return len(self._waiters[priority])
+
+    def slo_at_risk(self) -> bool:
+        """A higher-class caller is queued or recently waited past ``slo_wait_s``."""
+        if self._waiters[INTERACTIVE] or self._waiters[API]:
+            return True
+        return self._slo_missed_at is not None and self._clock() - self._slo_missed_at < self.slo_window_s
+
+    def _has_slot(self, priority: str = API) -> bool:
+        if self.max_concurrent == 0:
+            return priority != BACKGROUND or not self.slo_at_risk()
+        if priority == BACKGROUND:
+            return self.active < self._background_limit() and not self.slo_at_risk()
+        return self.active < self.max_concurrent
+
+    def _background_limit(self) -> int:
+        return self.max_concurrent - self.background_reserve
+
+    def _queued_ahead(self, priority: str) -> bool:
+        return any(self._waiters[p] for p in PRIORITIES[: PRIORITIES.index(priority) + 1])
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, highest priority class first."""
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters:
+                if waiters[0].done():
+                    waiters.popleft()
+                    continue
+                if not self._has_slot(priority):
+                    return
+                self.active += 1
+                waiters.popleft().set_result(None)
+            # Lower classes only get slots once this one is drained.
+
+    def _preempt_background(self) -> None:
+        while self._preemptible:
+            event = self._preemptible.pop()
+            if not event.is_set():
+                event.set()
+                self.preempted += 1
+                return
+
+    def _admit(self, priority: str, waited: float, preempt: Optional[asyncio.Event]) -> None:
+        self.admitted += 1
+        self._admitted_by[priority] += 1
+        self._waits[priority].append(waited)
+        if priority != BACKGROUND and waited > self.slo_wait_s:
+            self._slo_missed_at = self._clock()
+        if priority == BACKGROUND and preempt is not None:
+            self._preemptible.append(preempt)
+
+    async def acquire(self, priority: str = API, preempt: Optional[asyncio.Event] = None) -> float:
+        """Take a slot, waiting in the queue if needed; returns seconds waited.
+
+        A background caller passing ``preempt`` must stop its work and
+        release the slot once the event is set.
+        """
+        if priority == BACKGROUND and self.max_concurrent and self._background_limit() <= 0:
+            # Every slot is reserved for live requests.
+            self.rejected_reserved += 1
+            raise AdmissionRejected(self.name, "reserved")
+        if self._has_slot(priority) and not self._queued_ahead(priority):
+            self.active += 1
+            self._admit(priority, 0.0, preempt)
+            return 0.0
+        if self.queued >= self.max_queue:
+            self.rejected_full += 1
+            raise AdmissionRejected(self.name, "queue_full")
+        if priority != BACKGROUND:
+            self._preempt_background()
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        self.queued_total += 1
+        self.peak_queue = max(self.peak_queue, self.queued)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.max_wait_s)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on.
+                self.release()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters[priority].remove(waiter)
+                except ValueError:
+                    pass
+                # A background waiter may have been held back only by this one.
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_timeout += 1
+                raise AdmissionRejected(self.name, "queue_timeout") from None
+            raise
+        waited = time.perf_counter() - started
+        self._admit(priority, waited, preempt)
+        return waited
+
+    def release(self, preempt: Optional[asyncio.Event] = None) -> None:
+        if preempt is not None and preempt in self._preemptible:
+            self._preemptible.remove(preempt)
+        self.active = max(0, self.active - 1)
+        self._dispatch()
+
+    @staticmethod
+    def _percentile_ms(waits: Iterable[float], pct: float) -> Optional[int]:
+        ordered = sorted(waits)
+        if not ordered:
+            return None
+        return int(ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))] * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        all_waits = [w for waits in self._waits.values() for w in waits]
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.queued,
+            "peak_queue": self.peak_queue,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "rejected_reserved": self.rejected_reserved,
+            "wait_p50_ms": self._percentile_ms(all_waits, 50),
+            "wait_p95_ms": self._percentile_ms(all_waits, 95),
+            "background_reserve": self.background_reserve,
+            "slo_at_risk": self.slo_at_risk(),
+            "preempted": self.preempted,
+            "priorities": {
+                priority: {
+                    "queued": len(self._waiters[priority]),
+                    "admitted": self._admitted_by[priority],
+                    "wait_p50_ms": self._percentile_ms(self._waits[priority], 50),
+                    "wait_p95_ms": self._percentile_ms(self._waits[priority], 95),
+                }
+                for priority in PRIORITIES
+            },
+        }
+
+
+async def run_preemptible(name: str, work: Awaitable[_T], preempt: asyncio.Event) -> _T:
+    """Await ``work`` unless ``preempt`` is set first; then cancel it and raise ``AdmissionRejected``."""
+    task = asyncio.ensure_future(work)
+    preempted = asyncio.ensure_future(preempt.wait())
+    try:
+        await asyncio.wait([task, preempted], return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        preempted.cancel()
+    if not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise AdmissionRejected(name, "preempted")
+    return task.result()
+
+
+async def until_preempted(name: str, items: AsyncIterator[_T], preempt: asyncio.Event) -> AsyncIterator[_T]:
+    """Yield from ``items`` until ``preempt`` is set, then cancel them and raise ``AdmissionRejected``."""
+    pieces = items.__aiter__()
+    preempted = asyncio.ensure_future(preempt.wait())
+    try:
+        while True:
+            piece = asyncio.ensure_future(pieces.__anext__())
+            await asyncio.wait([piece, preempted], return_when=asyncio.FIRST_COMPLETED)
+            if not piece.done():
+                piece.cancel()
+                await asyncio.gather(piece, return_exceptions=True)
+                raise AdmissionRejected(name, "preempted")
+            try:
+                value = piece.result()
+            except StopAsyncIteration:
+                return
+            yield value
+    finally:
+        preempted.cancel()
+        aclose = getattr(pieces, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+class AdmissionControl:
+    """One limiter per provider name."""
+
+    def __init__(self, limiters: Iterable[AdmissionLimiter]) -> None:
+        self._limiters = {limiter.name: limiter for limiter in limiters}
+
+    def get(self, name: str) -> AdmissionLimiter:
+        return self._limiters[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
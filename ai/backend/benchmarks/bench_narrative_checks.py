@@ -0,0 +1,71 @@
+"""Microbenchmark: legacy inline narrative checks vs the precompiled validation pipeline.
+
+Run from ai/backend:
+
+    python -m benchmarks.bench_narrative_checks [--number 2000]
+
+Each iteration vets one LLM narrative the way ``_combine_ticker_output``
+does in ticker mode (TON-only). A per-stage breakdown of the pipeline
+follows the totals.
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Callable, List, Tuple
+
+from benchmarks import ticker_narrative_reference as legacy
+from benchmarks.narratives import LONG_NARRATIVES, NARRATIVES
+from narrative_checks import NarrativeValidator
+
+Entry = Tuple[str, str, str, str]
+
+
+def _legacy(entry: Entry) -> None:
+    lang, name, symbol, text = entry
+    legacy.vet_ticker_narrative(text, lang, name, symbol, True, name)
+
+
+def _pipeline(validator: NarrativeValidator) -> Callable[[Entry], None]:
+    def run(entry: Entry) -> None:
+        lang, name, symbol, text = entry
+        validator.vet(text, lang, name, symbol, ton_only=True)
+
+    return run
+
+
+def _per_narrative_us(fn: Callable[[Entry], None], entries: List[Entry], number: int) -> float:
+    def run() -> None:
+        for entry in entries:
+            fn(entry)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / (number * len(entries)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="iterations per timing run")
+    args = parser.parse_args()
+
+    groups: List[Tuple[str, List[Entry]]] = [("short", NARRATIVES), ("long", LONG_NARRATIVES)]
+    print(f"{'corpus':<10}{'legacy us/narr':>16}{'pipeline us/narr':>20}{'speedup':>10}")
+    for name, entries in groups:
+        old = _per_narrative_us(_legacy, entries, args.number)
+        new = _per_narrative_us(_pipeline(NarrativeValidator()), entries, args.number)
+        print(f"{name:<10}{old:>16.2f}{new:>20.2f}{old / new:>9.1f}x")
+
+    validator = NarrativeValidator()
+    run = _pipeline(validator)
+    for _ in range(args.number):
+        for entry in NARRATIVES + LONG_NARRATIVES:
+            run(entry)
+    print()
+    print(f"{'stage':<26}{'calls':>10}{'rejected':>10}{'avg us':>10}")
+    for stage, row in validator.stats()["stages"].items():
+        avg = f"{row['avg_us']:.2f}" if row["avg_us"] is not None else "-"
+        print(f"{stage:<26}{row['calls']:>10}{row['rejected']:>10}{avg:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Microbenchmark: legacy vs single-pass prompt term protection on long templates.
+
+Run from ai/backend:
+
+    python -m benchmarks.bench_prompt_i18n [--number 200]
+
+Each iteration masks a template and restores the masked text, as one
+localization miss does.
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+import prompt_i18n
+from benchmarks import prompt_i18n_reference as legacy
+
+_PARAGRAPH = (
+    "- Treat this asset strictly as part of the TON ecosystem; every jetton in "
+    "REFERENCE_FACTS is a TON jetton. Keep the NARRATIVE short, mention {SYMBOL} "
+    "and link https://tonviewer.com/{ADDRESS} when relevant. DOGS and CATS are "
+    "community tokens.\n"
+)
+
+
+def _template(paragraphs: int) -> str:
+    return "Reply ONLY in Russian.\n" + _PARAGRAPH * paragraphs
+
+
+def _per_call_us(module, text: str, number: int) -> float:
+    def run() -> None:
+        masked, protected = module._protect_terms(text)
+        module._restore_terms(masked, protected)
+
+    return min(timeit.repeat(run, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=200, help="iterations per timing run")
+    args = parser.parse_args()
+
+    print(f"{'paragraphs':<12}{'terms':>7}{'legacy us':>12}{'single-pass us':>16}{'speedup':>10}")
+    for paragraphs in (1, 4, 16, 64):
+        text = _template(paragraphs)
+        terms = len(prompt_i18n._protect_terms(text)[1])
+        old = _per_call_us(legacy, text, args.number)
+        new = _per_call_us(prompt_i18n, text, args.number)
+        print(f"{paragraphs:<12}{terms:>7}{old:>12.1f}{new:>16.1f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
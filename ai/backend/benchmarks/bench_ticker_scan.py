@@ -0,0 +1,58 @@
+"""Microbenchmark: legacy per-helper ticker checks vs the single-pass scanner.
+
+Run from ai/backend:
+
+    python -m benchmarks.bench_ticker_scan [--number 2000]
+
+Each iteration does what the chat handler does for one user message: the
+explicit-signal check, the strong-context check and candidate extraction.
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+from typing import Callable, List, Tuple
+
+from benchmarks import ticker_scan_reference as legacy
+from benchmarks.messages import GENERAL_MESSAGES, LONG_MESSAGES, TICKER_MESSAGES
+from ticker_scan import scan_ticker_text
+
+
+def _legacy(text: str) -> None:
+    legacy._has_explicit_ticker_signal(text)
+    legacy._is_ticker_context_strong(text)
+    legacy._extract_ticker_candidates(text)
+
+
+def _single_pass(text: str) -> None:
+    scan_ticker_text(text)
+
+
+def _per_message_us(fn: Callable[[str], None], messages: List[str], number: int) -> float:
+    def run() -> None:
+        for text in messages:
+            fn(text)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best / (number * len(messages)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="iterations per timing run")
+    args = parser.parse_args()
+
+    groups: List[Tuple[str, List[str]]] = [
+        ("ticker", TICKER_MESSAGES),
+        ("general", GENERAL_MESSAGES),
+        ("long", LONG_MESSAGES),
+    ]
+    print(f"{'corpus':<10}{'legacy us/msg':>16}{'single-pass us/msg':>22}{'speedup':>10}")
+    for name, messages in groups:
+        old = _per_message_us(_legacy, messages, args.number)
+        new = _per_message_us(_single_pass, messages, args.number)
+        print(f"{name:<10}{old:>16.2f}{new:>22.2f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Representative chat messages (EN/RU, short and long) for ticker benchmarks."""
+
+TICKER_MESSAGES = [
+    "$DOGS",
+    "dogs",
+    "DOGS",
+    "what is DOGS token?",
+    "что такое DOGS токен",
+    "Tell me about $NOT and $DOGS price today",
+    "is (MCOM) a good buy?",
+    "TONUSDT chart looks bullish",
+    "токен dogs",
+    "цена $ton сейчас",
+    "Compare STON, DEDUST and $TON liquidity on the exchange",
+    "I love dogs and cats",
+    "how do I send TON from my wallet to an exchange address?",
+    "What's the market cap of 'HMSTR'?",
+    "Напиши мне краткий обзор монеты NOT и её саплай",
+    "hello",
+    "Hi! Can you explain what a jetton is in the TON ecosystem?",
+]
+
+GENERAL_MESSAGES = [
+    "Can you help me write a short birthday message for my friend?",
+    "Почему небо голубое? Объясни простыми словами.",
+    "Summarize the plot of the book in three sentences, please.",
+    "What are the best practices for securing a seed phrase offline?",
+    "Как мне настроить уведомления в приложении?",
+]
+
+LONG_MESSAGES = [
+    (
+        "Hey, quick question. I've been holding $DOGS since the airdrop and I'm also "
+        "looking at NOT, HMSTR and CATI. The price action on DOGSUSDT has been weird this "
+        "week, and my wallet shows a different balance than the exchange. Could you check "
+        "https://tonviewer.com/EQabc and tell me whether the contract address is legit? "
+        "Also, what's the circulating supply vs total supply, and is the market cap "
+        "realistic compared to (STON) or 'DEDUST'? Thanks!"
+    ),
+    (
+        "Привет! Подскажи, пожалуйста: я купил немного $NOT и думаю про DOGS токен. "
+        "Какая сейчас капитализация и саплай? Стоит ли держать или продать после пампа? "
+        "И ещё вопрос — как перевести TON с кошелька на биржу без больших комиссий? "
+        "Слышал, что скоро будет аирдроп у HMSTR, это правда?"
+    ),
+    " ".join(
+        "Daily recap: markets were mixed, volume was thin and most of the chat was about "
+        "weekend plans rather than anything on chain." for _ in range(6)
+    ),
+]
+
+ALL_MESSAGES = TICKER_MESSAGES + GENERAL_MESSAGES + LONG_MESSAGES
@@ -0,0 +1,83 @@
+"""Ticker-mode LLM narratives (EN/RU) as the model actually writes them, for validation benchmarks.
+
+Each entry is ``(user_lang, token_name, token_symbol, narrative)``. The mix
+covers narratives that pass, ones that repeat stats, and each kind the
+validator rejects (boilerplate, mixed script, other chains, fallback text).
+"""
+
+NARRATIVES = [
+    (
+        "en", "Dogs", "DOGS",
+        "DOGS grew out of the Telegram sticker culture around Spotty, the dog Pavel Durov drew for the community. "
+        "The token turned a running in-joke into a badge of early membership, and its appeal is mostly about "
+        "belonging to one of the loudest meme crowds on TON.",
+    ),
+    (
+        "en", "Notcoin", "NOT",
+        "Notcoin started as a tap-to-earn game inside Telegram and became a shared ritual for millions of players. "
+        "Its supply is 102,719,221,714 NOT and it has 2,800,000 holders. The story is less about technology and more "
+        "about how a simple game made crypto feel familiar.",
+    ),
+    (
+        "en", "Hamster Kombat", "HMSTR",
+        "HMSTR is a utility token used for transactions across the TON ecosystem and decentralized applications, "
+        "offering a digital asset for DeFi projects.",
+    ),
+    (
+        "en", "Catizen", "CATI",
+        "CATI is a digital asset built on blockchain technology for the TON ecosystem, bringing decentralized "
+        "finance and NFT integrations to users.",
+    ),
+    (
+        "en", "Resistance Dog", "REDO",
+        "Resistance Dog is the TON answer to Dogecoin and Shiba Inu on Ethereum, positioning itself as the top dog "
+        "for anyone who missed the Solana memecoin run.",
+    ),
+    ("en", "Gram", "GRAM", "Insufficient data for analysis."),
+    ("en", "Fish", "FISH", ""),
+    (
+        "en", "Tonfish", "FISH",
+        "   A fish-themed meme   that leans on\n\nocean jokes and\tsticker packs shared in TON chats.   ",
+    ),
+    (
+        "en", "Jetton Cat", "JCAT",
+        "Jetton Cat 代币 is a community token with a playful cat mascot.",
+    ),
+    (
+        "ru", "Dogs", "DOGS",
+        "DOGS вырос из стикерной культуры Telegram вокруг Спотти — пса, которого Павел Дуров нарисовал для сообщества. "
+        "Токен превратил внутреннюю шутку в знак раннего участия, и его притягательность прежде всего в чувстве "
+        "принадлежности к одному из самых громких мемных комьюнити TON.",
+    ),
+    (
+        "ru", "Notcoin", "NOT",
+        "Notcoin начинался как тапалка внутри Telegram и стал общим ритуалом для миллионов игроков. Выпуск составляет "
+        "102 719 221 714 NOT, держателей около 2,8 млн. История скорее про то, как простая игра сделала крипту понятной.",
+    ),
+    (
+        "ru", "Hamster Kombat", "HMSTR",
+        "HMSTR используется для транзакций в экосистеме TON и децентрализованных приложениях как цифровой актив.",
+    ),
+    (
+        "ru", "Catizen", "CATI",
+        "CATI is a playful cat token that brings Telegram mini-app gamers together around a shared mascot и мемы.",
+    ),
+    ("ru", "Gram", "GRAM", "Недостаточно данных для анализа."),
+    (
+        "ru", "Resistance Dog", "REDO",
+        "Resistance Dog подаётся как ответ TON на доге и биткоин-мемы, собирая тех, кто пропустил ранний рост.",
+    ),
+    (
+        "ru", "Durev", "DUREV",
+        "Мем вокруг образа основателя Telegram, который сообщество превратило в ироничный символ свободы общения.",
+    ),
+]
+
+# Long narratives, as a model writes them when num_predict is generous.
+LONG_NARRATIVES = [
+    (lang, name, symbol, " ".join([text] * 6))
+    for lang, name, symbol, text in NARRATIVES
+    if text
+]
+
+ALL_NARRATIVES = NARRATIVES + LONG_NARRATIVES
@@ -0,0 +1,58 @@
+"""Pre-single-pass ``prompt_i18n`` term protection, kept verbatim as the benchmark baseline.
+
+Note: this version can leak placeholders (e.g. a URL containing "ton" is
+masked twice); see tests/test_prompt_i18n.py.
+"""
+import re
+from typing import Dict
+
+# Terms/placeholders we should never translate.
+_PROTECTED_PATTERNS = (
+    r"\bTON\b",
+    r"\bjetton\b",
+    r"\bREFERENCE_FACTS\b",
+    r"\bNARRATIVE\b",
+    r"\bDOGS\b",
+    r"\bCATS\b",
+    r"https?://[^\s)]+",
+    r"\{[A-Z0-9_]+\}",
+)
+
+
+def _protect_terms(text: str) -> tuple[str, Dict[str, str]]:
+    protected: Dict[str, str] = {}
+    masked = text
+    idx = 0
+
+    for pattern in _PROTECTED_PATTERNS:
+        for m in list(re.finditer(pattern, masked, flags=re.IGNORECASE)):
+            original = m.group(0)
+            token = f"__KEEP_{idx}__"
+            idx += 1
+            protected[token] = original
+            masked = masked[:m.start()] + token + masked[m.end():]
+            # Restart for this pattern because indices changed.
+            break
+
+    # Re-run until no more replacements for all patterns.
+    changed = True
+    while changed:
+        changed = False
+        for pattern in _PROTECTED_PATTERNS:
+            m = re.search(pattern, masked, flags=re.IGNORECASE)
+            if not m:
+                continue
+            original = m.group(0)
+            token = f"__KEEP_{idx}__"
+            idx += 1
+            protected[token] = original
+            masked = masked[:m.start()] + token + masked[m.end():]
+            changed = True
+    return masked, protected
+
+
+def _restore_terms(text: str, protected: Dict[str, str]) -> str:
+    restored = text
+    for token, original in protected.items():
+        restored = restored.replace(token, original)
+    return restored
@@ -0,0 +1,149 @@
+"""Pre-``narrative_checks`` ticker narrative helpers, kept verbatim as the parity/benchmark baseline.
+
+Do not "fix" anything here: tests compare ``narrative_checks.NarrativeValidator``
+against :func:`vet_ticker_narrative` output-for-output.
+"""
+import re
+
+_CJK_RE = re.compile(r"[\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF]")
+
+
+def _narrative_fallback(user_lang: str) -> str:
+    return "Недостаточно данных для анализа." if user_lang == "ru" else "Insufficient data for analysis."
+
+
+def _contains_plain_fallback_phrase(text: str, user_lang: str) -> bool:
+    raw = (text or "").strip().lower()
+    if not raw:
+        return True
+    if user_lang == "ru":
+        return "недостаточно данных для анализа" in raw
+    return "insufficient data for analysis" in raw
+
+
+def _sanitize_ticker_narrative(narrative: str, user_lang: str) -> str:
+    text = re.sub(r"\s+", " ", (narrative or "").strip())
+    if not text:
+        return _narrative_fallback(user_lang)
+    # Keep narrative permissive so model can use available facts imaginatively.
+    # Only block obvious malformed/mixed-script garbage.
+    if _CJK_RE.search(text):
+        return _narrative_fallback(user_lang)
+    return text
+
+
+def _ensure_ticker_identity_in_narrative(narrative: str, token_name: str, token_symbol: str, user_lang: str) -> str:
+    """Guarantee narrative explicitly references token identity (name/symbol)."""
+    text = (narrative or "").strip()
+    if not text:
+        return text
+
+    lower = text.lower()
+    name_present = bool(token_name and token_name.strip() and token_name.strip().lower() in lower)
+    symbol_present = bool(token_symbol and token_symbol.strip() and token_symbol.strip().lower() in lower)
+    if name_present or symbol_present:
+        return text
+
+    if user_lang == "ru":
+        prefix = f"Для {token_name or token_symbol} ({token_symbol}) этот нарратив связан с мемной идентичностью сообщества в TON."
+    else:
+        prefix = f"For {token_name or token_symbol} ({token_symbol}), this narrative centers on meme identity and community culture in TON."
+    return f"{prefix} {text}"
+
+
+def _strip_stat_repetition(narrative: str, user_lang: str) -> str:
+    """Remove narrative sentences that just repeat stats already shown above."""
+    text = (narrative or "").strip()
+    if not text:
+        return text
+
+    parts = re.split(r"(?<=[.!?])\s+", text)
+    stat_en = ("supply", "holders", "holder", "last activity", "market cap", "circulating")
+    stat_ru = ("выпуск", "держател", "холдер", "последн", "активност", "капитализац")
+    stat_terms = stat_ru if user_lang == "ru" else stat_en
+
+    filtered = []
+    for part in parts:
+        lower = part.lower()
+        if any(term in lower for term in stat_terms):
+            continue
+        filtered.append(part.strip())
+
+    # If we stripped too aggressively, keep original so we don't return empty output.
+    cleaned = " ".join(p for p in filtered if p).strip()
+    return cleaned or text
+
+
+def _is_generic_ton_boilerplate(text: str, user_lang: str) -> bool:
+    t = (text or "").lower()
+    if not t:
+        return False
+    if user_lang == "ru":
+        markers = (
+            "экосистем", "блокчейн", "децентрализ", "цифров", "nft", "defi", "технолог",
+        )
+    else:
+        markers = (
+            "ton ecosystem", "blockchain technology", "digital asset", "decentralized finance", "defi", "nft",
+        )
+    hit_count = sum(1 for m in markers if m in t)
+    return hit_count >= 2
+
+
+def _is_utility_boilerplate(text: str, user_lang: str) -> bool:
+    t = (text or "").lower()
+    if not t:
+        return False
+    if user_lang == "ru":
+        markers = (
+            "использует", "используется", "для транзакц", "dapp", "децентрализ", "цифровой актив",
+        )
+    else:
+        markers = (
+            "used for transactions", "used in transactions", "decentralized applications",
+            "digital asset", "utility token", "dapp", "defi projects",
+        )
+    return sum(1 for m in markers if m in t) >= 1
+
+
+def _has_excessive_latin_in_ru(text: str) -> bool:
+    """Detect RU narratives polluted by long English fragments."""
+    if not text:
+        return False
+    cyr = len(re.findall(r"[А-Яа-яЁё]", text))
+    lat = len(re.findall(r"[A-Za-z]", text))
+    if lat == 0:
+        return False
+    # Allow token symbols/TON names, but reject mixed-language paragraphs.
+    if cyr == 0:
+        return True
+    return (lat / max(cyr, 1)) > 0.35
+
+
+def vet_ticker_narrative(narrative, user_lang, token_name, token_symbol, ton_only, fallback):
+    """The checks ``_combine_ticker_output`` ran inline, with every fallback
+    replaced by the precomputed ``fallback`` text."""
+    narrative_clean = _sanitize_ticker_narrative(narrative, user_lang)
+    narrative_clean = _strip_stat_repetition(narrative_clean, user_lang)
+    if _contains_plain_fallback_phrase(narrative_clean, user_lang):
+        narrative_clean = fallback
+    narrative_clean = _ensure_ticker_identity_in_narrative(narrative_clean, token_name, token_symbol, user_lang)
+    if _is_generic_ton_boilerplate(narrative_clean, user_lang):
+        narrative_clean = fallback
+    if _is_utility_boilerplate(narrative_clean, user_lang):
+        narrative_clean = fallback
+    if user_lang == "ru" and _has_excessive_latin_in_ru(narrative_clean):
+        narrative_clean = fallback
+    if ton_only:
+        non_ton_chain = re.search(
+            r"\b(bitcoin|ethereum|dogecoin|solana|tron|bsc|binance\s+smart\s+chain|polygon|avalanche|доджкоин|доге|доги|эфириум|биткоин|солана|трон)\b",
+            narrative_clean,
+            flags=re.IGNORECASE,
+        )
+        if non_ton_chain:
+            narrative_clean = fallback
+    if not narrative_clean.strip():
+        narrative_clean = fallback
+    if _contains_plain_fallback_phrase(narrative_clean, user_lang):
+        narrative_clean = fallback
+    return narrative_clean
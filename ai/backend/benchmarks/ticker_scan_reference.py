@@ -0,0 +1,206 @@
+"""Pre-``ticker_scan`` ticker helpers, kept verbatim as the parity/benchmark baseline.
+
+Do not "fix" anything here: tests compare ``ticker_scan.scan_ticker_text``
+against these functions output-for-output.
+"""
+import re
+from typing import List
+
+# Regex for candidate extraction (alphanumeric 2-10 chars)
+TICKER_RE = re.compile(r"\b[a-zA-Z0-9]{2,10}\b")
+
+# Common non-ticker words to filter out (expand as needed)
+COMMON_WORDS = {
+    "THE", "WHAT", "THIS", "THAT", "HAVE", "WITH", "FROM", "THEY", "BEEN",
+    "WERE", "SAID", "EACH", "WHICH", "THEIR", "ABOUT", "WOULD", "THESE",
+    "OTHER", "COULD", "SOME", "THAN", "THEN", "THEM", "INTO", "ALSO",
+    "YOUR", "JUST", "LIKE", "MORE", "VERY", "WHEN", "MAKE", "TIME",
+    "YEAR", "OVER", "ONLY", "SUCH", "WELL", "BACK", "GOOD", "MUCH",
+    "HTTP", "HTTPS", "WWW", "API", "URL", "COM", "ORG", "NET", "HTML",
+    "JSON", "XML", "JPEG", "PNG", "GIF", "PDF", "DOC", "TXT", "CSV",
+    "AND", "FOR", "ARE", "BUT", "NOT", "YOU", "ALL", "CAN", "HER",
+    "WAS", "ONE", "OUR", "OUT", "DAY", "GET", "HAS", "HIM", "HIS",
+    "HOW", "MAN", "NEW", "NOW", "OLD", "SEE", "TWO", "WAY", "WHO",
+    "BOY", "DID", "ITS", "LET", "PUT", "SAY", "SHE", "TOO", "USE",
+}
+
+# Ticker context keywords (signals this is likely about crypto/tokens)
+TICKER_CONTEXT_EN = {
+    "token", "coin", "crypto", "price", "supply", "market", "cap",
+    "contract", "address", "blockchain", "wallet", "exchange",
+    "trading", "buy", "sell", "hodl", "moon", "lambo", "dip",
+    "pump", "dump", "whale", "airdrop", "mint", "burn", "stake",
+}
+
+TICKER_CONTEXT_RU = {
+    "токен", "монета", "крипто", "цена", "саплай", "капитализация",
+    "контракт", "адрес", "блокчейн", "кошелёк", "биржа", "обмен",
+    "торговля", "купить", "продать", "холдить", "луна", "памп",
+    "дамп", "кит", "аирдроп", "минт", "сжигание", "стейкинг",
+}
+
+
+def _extract_ticker_candidates(text: str) -> List[str]:
+    """
+    Extract and prioritize potential ticker symbols from text.
+    Returns ordered list: uppercase + context-near candidates first.
+    """
+    if not text:
+        return []
+    
+    # Extract all alphanumeric tokens
+    raw_tokens = TICKER_RE.findall(text)
+    if not raw_tokens:
+        return []
+    
+    text_lower = text.lower()
+    has_ticker_context = any(
+        word in text_lower 
+        for word in (TICKER_CONTEXT_EN | TICKER_CONTEXT_RU)
+    )
+    
+    candidates = []
+    seen = set()
+    
+    # Single-word queries like "dogs" should still be eligible as ticker intent.
+    text_stripped = text.strip()
+    normalized_tokens = [t.lower() for t in raw_tokens]
+
+    # Phase 1: Prioritize obvious ticker patterns
+    for token in raw_tokens:
+        symbol = token.upper()
+        
+        # Skip if already seen
+        if symbol in seen:
+            continue
+        
+        # Filter: Skip all-digit tokens
+        if symbol.isdigit():
+            continue
+        
+        # Filter: Skip common words
+        if symbol in COMMON_WORDS:
+            continue
+        
+        has_dollar_signal = re.search(
+            rf"\$\s*{re.escape(token)}\b",
+            text,
+            flags=re.IGNORECASE,
+        ) is not None
+        is_standalone_symbol_query = (
+            len(raw_tokens) == 1
+            and normalized_tokens[0] == token.lower()
+            and text_stripped.lower() == token.lower()
+        )
+
+        # Filter: Skip mostly lowercase without context/symbol signal
+        if token.islower() and not has_ticker_context and not has_dollar_signal and not is_standalone_symbol_query:
+            continue
+        
+        # Filter: Skip very short tokens without uppercase or context
+        if len(symbol) < 3 and not (token.isupper() or has_ticker_context):
+            continue
+        
+        seen.add(symbol)
+        
+        # Priority scoring
+        score = 0
+        
+        # +10: Preceded by $ (strong ticker signal)
+        if f"${token}" in text or f"$ {token}" in text:
+            score += 10
+        
+        # +5: All uppercase in original text
+        if token.isupper():
+            score += 5
+        
+        # +3: Has meaningful uppercase signal (not just sentence TitleCase like "Tell")
+        elif any(c.isupper() for c in token):
+            is_titlecase_word = (
+                len(token) > 1
+                and token[0].isupper()
+                and token[1:].islower()
+            )
+            if not is_titlecase_word:
+                score += 3
+        
+        # +2: Near ticker context words
+        if has_ticker_context:
+            score += 2
+        
+        # +1: Wrapped in punctuation (e.g., "DOGS?" or "(MCOM)")
+        if any(f"{p}{token}{q}" in text for p in "([{\"'" for q in ")]}\"'?!.,;"):
+            score += 1
+        
+        candidates.append((score, symbol))
+    
+    # Sort by score (descending), then alphabetically
+    candidates.sort(key=lambda x: (-x[0], x[1]))
+    
+    # Return top 8 candidates max (prevent RAG spam)
+    return [sym for _, sym in candidates[:8]]
+
+
+def _is_ticker_context_strong(text: str) -> bool:
+    """
+    Check if message has strong ticker/crypto context signals.
+    This helps distinguish:
+    - "DOGS token price" (strong) vs "I love dogs" (weak)
+    - "что такое DOGS токен" (strong) vs "что такое dogs" (weak)
+    """
+    if not text:
+        return False
+    
+    text_lower = text.lower()
+    
+    # Strong signals
+    if "$" in text:
+        return True
+    
+    # Uppercase ticker-like token is also a strong signal (e.g., "что такое DOGS")
+    if re.search(r"\b[A-Z0-9]{3,10}\b", text):
+        return True
+    
+    # Context words alone are not enough, they create false positives.
+    # Keep this helper strict: only explicit ticker/symbol clues count.
+    return False
+
+
+def _has_explicit_ticker_signal(text: str) -> bool:
+    """
+    Return True only when the user message contains an explicit ticker-like cue.
+    This prevents generic prompts (e.g., wallet/profit questions) from being
+    misrouted into ticker mode.
+    """
+    if not text:
+        return False
+
+    text_lower = text.lower()
+
+    # Strong universal signals
+    if "$" in text:
+        return True
+    if re.search(r"\b[A-Z0-9]{2,10}(USDT|USD|TON)\b", text):
+        return True
+
+    # Single standalone token symbol: e.g., "dogs"
+    text_stripped = text.strip()
+    one_token = re.fullmatch(r"[a-zA-Z0-9]{2,10}", text_stripped)
+    if one_token:
+        symbol = text_stripped.upper()
+        if not symbol.isdigit() and symbol not in COMMON_WORDS:
+            return True
+
+    # English explicit forms: "dogs token", "token dogs", "ticker dogs"
+    if re.search(r"\b[a-z0-9]{2,10}\s+(token|coin|jetton|ticker)\b", text_lower):
+        return True
+    if re.search(r"\b(token|coin|jetton|ticker)\s+[a-z0-9]{2,10}\b", text_lower):
+        return True
+
+    # Russian explicit forms: "dogs токен", "токен dogs", etc.
+    if re.search(r"\b[a-z0-9]{2,10}\s+(токен|монета|тикер|джеттон)\b", text_lower):
+        return True
+    if re.search(r"\b(токен|монета|тикер|джеттон)\s+[a-z0-9]{2,10}\b", text_lower):
+        return True
+
+    return False
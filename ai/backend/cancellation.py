@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, Optional, Tuple, TypeVar
+
+import anyio
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+_T = TypeVar("_T")
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away before the response was ready."""
+
+
+class DisconnectWatcher:
+    """Watch an ASGI ``receive`` channel for ``http.disconnect``.
+
+    Used while a request is still being prepared (ticker detection, RAG):
+    :meth:`run` races a piece of work against the disconnect and cancels the
+    work as soon as the client is gone. The request body must already have
+    been read, so the next message can only be the disconnect.
+    """
+
+    def __init__(self, receive: Receive) -> None:
+        self._receive = receive
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _watch(self) -> None:
+        while True:
+            message = await self._receive()
+            if message.get("type") == "http.disconnect":
+                return
+
+    def start(self) -> "DisconnectWatcher":
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        return self
+
+    @property
+    def disconnected(self) -> bool:
+        return self._task is not None and self._task.done() and not self._task.cancelled()
+
+    async def run(self, work: Awaitable[_T]) -> _T:
+        """Await ``work``; cancel it and raise :class:`ClientDisconnected` if the client leaves first."""
+        task = asyncio.ensure_future(work)
+        if self._task is None:
+            return await task
+        if self.disconnected:
+            task.cancel()
+            raise ClientDisconnected()
+        try:
+            await asyncio.wait([task, self._task], return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if not task.done():
+            task.cancel()
+            raise ClientDisconnected()
+        return task.result()
+
+    def stop(self) -> None:
+        """Stop watching (the streaming response listens for the disconnect itself)."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that always closes its body iterator when it ends.
+
+    Starlette cancels the send loop when the client disconnects, but leaves
+    an async generator body suspended until garbage collection, and with it
+    the upstream LLM stream it is reading. Closing it right away runs the
+    generator's cleanup, which closes the upstream request and frees its
+    admission slot.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                with anyio.CancelScope(shield=True):
+                    await aclose()
+
+
+class CancellationStats:
+    """Generations cut short by client disconnects, and the tokens that saved.
+
+    Saved tokens are an estimate: the request's own token limit when it set
+    one, else the mean length of recent completed generations of the same
+    provider and model, minus what was generated before the cancel.
+    """
+
+    def __init__(self, window: int = 100) -> None:
+        self.window = window
+        self._completed: Dict[Tuple[str, str], Deque[int]] = {}
+        self.cancelled: Dict[str, int] = {}
+        self.generated_tokens = 0
+        self.saved_tokens = 0
+
+    def record_completed(self, provider: str, model: str, tokens: int) -> None:
+        lengths = self._completed.get((provider, model))
+        if lengths is None:
+            lengths = self._completed[(provider, model)] = deque(maxlen=self.window)
+        lengths.append(tokens)
+
+    def expected_tokens(self, provider: str, model: str, limit: Optional[int] = None) -> Optional[int]:
+        if limit is not None and limit > 0:
+            return limit
+        lengths = self._completed.get((provider, model))
+        if not lengths:
+            return None
+        return round(sum(lengths) / len(lengths))
+
+    def record_cancelled(
+        self,
+        stage: str,
+        provider: str,
+        model: str,
+        generated: int = 0,
+        limit: Optional[int] = None,
+    ) -> int:
+        """Count one cancelled request; returns the estimated tokens saved."""
+        self.cancelled[stage] = self.cancelled.get(stage, 0) + 1
+        self.generated_tokens += generated
+        expected = self.expected_tokens(provider, model, limit)
+        saved = max(0, expected - generated) if expected is not None else 0
+        self.saved_tokens += saved
+        return saved
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cancelled": dict(self.cancelled),
+            "generated_tokens": self.generated_tokens,
+            "saved_tokens_estimate": self.saved_tokens,
+        }
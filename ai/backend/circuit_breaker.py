@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Dict, Iterable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe.
+
+    ``failure_threshold`` consecutive failures open the circuit; while open,
+    :meth:`allow` rejects calls until ``reset_timeout_s`` has passed. Then one
+    probe call is let through (half-open): its success closes the circuit,
+    its failure re-opens it for another ``reset_timeout_s``. Successes of
+    calls still in flight while the circuit is open are ignored.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    def _reset_elapsed(self) -> bool:
+        return self._clock() - self.opened_at >= self.reset_timeout_s
+
+    def available(self) -> bool:
+        """Whether :meth:`allow` would currently let a call through (does not take the probe)."""
+        if self.state == OPEN:
+            return self._reset_elapsed()
+        if self.state == HALF_OPEN:
+            return not self._probe_in_flight
+        return True
+
+    def allow(self) -> bool:
+        """Admit a call; in half-open state only the first caller (the probe) is admitted."""
+        if self.state == OPEN:
+            if not self._reset_elapsed():
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        # A call admitted before the trip may finish after it; only the
+        # half-open probe may close an open circuit.
+        if self.state == OPEN:
+            return
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self.opened_at = self._clock()
+        self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Call ended without an outcome (e.g. cancelled); frees the half-open probe slot."""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.reset_timeout_s - (self._clock() - self.opened_at)), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in_s": retry_in,
+        }
+
+
+class CircuitBreakers:
+    """One breaker per upstream name."""
+
+    def __init__(self, breakers: Iterable[CircuitBreaker]) -> None:
+        self._breakers = {b.name: b for b in breakers}
+
+    def get(self, name: str) -> CircuitBreaker:
+        return self._breakers[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, TypeVar
+
+_T = TypeVar("_T")
+
+QUEUE_DEPTH = "queue_depth"
+CIRCUIT_OPEN = "circuit_open"
+TTFT_DEADLINE = "ttft_deadline"
+
+
+class FirstTokenLate(Exception):
+    """The provider produced no content before the request's TTFT deadline."""
+
+    def __init__(self, deadline_s: float) -> None:
+        self.deadline_s = deadline_s
+        super().__init__(f"no first token within {deadline_s:.1f}s")
+
+
+async def first_within(items: AsyncIterator[_T], deadline_s: Optional[float]) -> AsyncIterator[_T]:
+    """Yield from ``items``, raising :class:`FirstTokenLate` if the first item misses ``deadline_s``.
+
+    The pending read is cancelled on timeout, which stops the upstream call.
+    ``None`` or ``0`` means no deadline.
+    """
+    if deadline_s:
+        try:
+            first = await asyncio.wait_for(items.__anext__(), deadline_s)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise FirstTokenLate(deadline_s) from None
+        yield first
+    async for item in items:
+        yield item
+
+
+class DegradationController:
+    """Decide when answers that can be built without an LLM should skip it.
+
+    Before a call, :meth:`shed_reason` reports why the providers should be
+    spared: every usable provider already has ``queue_depth`` or more
+    generations waiting (``queue_depth``), or none is usable because their
+    circuits are open (``circuit_open``). During a call, ``ttft_deadline_s``
+    bounds the wait for the first token (``ttft_deadline``). Callers record
+    each decision they act on.
+    """
+
+    def __init__(
+        self,
+        queued: Callable[[str], int],
+        available: Callable[[str], bool],
+        queue_depth: int = 8,
+        ttft_deadline_s: float = 6.0,
+        enabled: bool = True,
+    ) -> None:
+        self._queued = queued
+        self._available = available
+        self.queue_depth = queue_depth
+        self.ttft_deadline_s = ttft_deadline_s
+        self.enabled = enabled
+        self.decisions: Dict[str, int] = {}
+
+    def shed_reason(self, providers: Sequence[str]) -> Optional[str]:
+        if not self.enabled:
+            return None
+        usable = [name for name in providers if self._available(name)]
+        if not usable:
+            return CIRCUIT_OPEN
+        if self.queue_depth > 0 and all(self._queued(name) >= self.queue_depth for name in usable):
+            return QUEUE_DEPTH
+        return None
+
+    @property
+    def first_token_deadline_s(self) -> Optional[float]:
+        return self.ttft_deadline_s if self.enabled and self.ttft_deadline_s > 0 else None
+
+    def record(self, reason: str) -> None:
+        self.decisions[reason] = self.decisions.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self.queue_depth,
+            "ttft_deadline_ms": int(self.ttft_deadline_s * 1000),
+            "degraded": dict(self.decisions),
+        }
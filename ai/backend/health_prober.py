@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# A dependency check returns a status dict with at least "status" and,
+# when it reached the upstream, "latency_ms".
+Check = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class HealthProber:
+    """Run dependency checks in the background and keep the latest results.
+
+    ``snapshot`` is served without touching upstreams; ``refresh`` runs every
+    check now (concurrent callers share one run). Each dependency also keeps
+    its last ``history`` results for latency/availability trends.
+    """
+
+    def __init__(
+        self,
+        checks: Mapping[str, Check],
+        interval_s: float = 15.0,
+        history: int = 20,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._checks = dict(checks)
+        self.interval_s = interval_s
+        self._clock = clock
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._history: Dict[str, Deque[Tuple[float, str, Optional[int]]]] = {
+            name: deque(maxlen=max(1, history)) for name in self._checks
+        }
+        self.checked_at: Optional[float] = None
+        self.probes = 0
+        self._flight: SingleFlight[Dict[str, Dict[str, Any]]] = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _probe(self) -> Dict[str, Dict[str, Any]]:
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._checks[name]() for name in names), return_exceptions=True)
+        now = self._clock()
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                result = {"status": "error", "error": str(result)}
+            self._latest[name] = result
+            self._history[name].append((now, str(result.get("status")), result.get("latency_ms")))
+        self.checked_at = now
+        self.probes += 1
+        return dict(self._latest)
+
+    async def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """Check every dependency now and return the results."""
+        return await self._flight.call("probe", self._probe)
+
+    def age_s(self) -> Optional[float]:
+        return None if self.checked_at is None else self._clock() - self.checked_at
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def is_fresh(self) -> bool:
+        """The background loop is running and its snapshot has not fallen far behind."""
+        age = self.age_s()
+        return self.running and age is not None and age <= max(3 * self.interval_s, 5.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._latest)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[HEALTH] background probe failed: {e}")
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> None:
+        if self.interval_s > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def history(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, samples in self._history.items():
+            latencies = sorted(ms for _, _, ms in samples if ms is not None)
+            ok = sum(1 for _, status, _ in samples if status in ("ok", "skipped"))
+            out[name] = {
+                "samples": len(samples),
+                "ok_ratio": round(ok / len(samples), 3) if samples else None,
+                "latency_p50_ms": latencies[(len(latencies) - 1) // 2] if latencies else None,
+                "latency_max_ms": latencies[-1] if latencies else None,
+                "recent": [
+                    {"at": round(at, 1), "status": status, "latency_ms": ms} for at, status, ms in samples
+                ],
+            }
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.age_s()
+        return {
+            "interval_s": self.interval_s,
+            "running": self.running,
+            "probes": self.probes,
+            "checked_at": round(self.checked_at, 1) if self.checked_at is not None else None,
+            "age_s": round(age, 1) if age is not None else None,
+            "history": self.history(),
+        }
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# One keep-alive pool per upstream; names are used as env prefixes and stats keys.
+UPSTREAMS = ("ollama", "openai", "cocoon", "rag")
+
+
+def _env_int(name: str, default: int) -> int:
+    raw = (os.getenv(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("[HTTP] invalid integer for %s=%r; using %s", name, raw, default)
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = (os.getenv(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logger.warning("[HTTP] invalid number for %s=%r; using %s", name, raw, default)
+        return default
+
+
+def _env_switch(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes")
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _pool_counters(client: httpx.AsyncClient) -> Optional[Dict[str, int]]:
+    """Connection counts read from httpcore's pool internals.
+
+    httpx exposes no public pool counters, so this relies on private
+    attributes (httpx 0.27 / httpcore 1.x) and returns None when they are
+    missing or shaped differently, e.g. after an upgrade or for a mock transport.
+    """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    requests = getattr(pool, "_requests", None)
+    if connections is None or requests is None:
+        return None
+    try:
+        active = sum(1 for c in connections if not c.is_idle())
+        queued = sum(1 for r in requests if r.is_queued())
+        total = len(connections)
+    except (AttributeError, TypeError):
+        return None
+    return {"connections": total, "active": active, "idle": total - active, "queued": queued}
+
+
+class UpstreamClients:
+    """Process-wide registry of pooled ``httpx.AsyncClient`` instances.
+
+    Clients are created lazily on first use (so code paths that never hit the
+    startup hook, e.g. tests, still work) and closed together on shutdown.
+    Pool limits come from ``HTTP_POOL_*`` env vars and can be overridden per
+    upstream, e.g. ``OLLAMA_POOL_MAX_CONNECTIONS``.
+    """
+
+    def __init__(self) -> None:
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._limits: Dict[str, httpx.Limits] = {}
+        self._http2: Optional[bool] = None
+        self._pool_counters_missing = False
+
+    @property
+    def http2(self) -> bool:
+        # Resolved on first use so values from .env (loaded after import) apply.
+        if self._http2 is None:
+            requested = _env_switch("HTTP2_SWITCH")
+            self._http2 = requested and _http2_available()
+            if requested and not self._http2:
+                logger.warning("[HTTP] HTTP2_SWITCH=1 but the 'h2' package is not installed; using HTTP/1.1")
+        return self._http2
+
+    def _limits_for(self, name: str) -> httpx.Limits:
+        prefix = name.upper()
+        max_connections = _env_int(
+            f"{prefix}_POOL_MAX_CONNECTIONS", _env_int("HTTP_POOL_MAX_CONNECTIONS", 100)
+        )
+        max_keepalive = _env_int(
+            f"{prefix}_POOL_MAX_KEEPALIVE", _env_int("HTTP_POOL_MAX_KEEPALIVE", 20)
+        )
+        keepalive_expiry = _env_float(
+            f"{prefix}_POOL_KEEPALIVE_EXPIRY", _env_float("HTTP_POOL_KEEPALIVE_EXPIRY", 30.0)
+        )
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(max_keepalive, max_connections),
+            keepalive_expiry=keepalive_expiry,
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the shared client for an upstream, creating it on first use."""
+        if name not in UPSTREAMS:
+            raise ValueError(f"unknown upstream: {name}")
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            limits = self._limits_for(name)
+            client = httpx.AsyncClient(
+                # Callers pass per-request timeouts; this is only the ceiling.
+                timeout=httpx.Timeout(60.0, connect=_env_float("HTTP_CONNECT_TIMEOUT", 5.0)),
+                limits=limits,
+                http2=self.http2,
+            )
+            self._clients[name] = client
+            self._limits[name] = limits
+        return client
+
+    def open(self) -> None:
+        for name in UPSTREAMS:
+            self.get(name)
+        logger.info(
+            "[HTTP] upstream pools ready: %s http2=%s",
+            ", ".join(f"{n}(max={self._limits[n].max_connections})" for n in UPSTREAMS),
+            self.http2,
+        )
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning("[HTTP] failed to close upstream client: %s", e)
+
+    def _pool_stats(self, name: str, client: httpx.AsyncClient) -> Dict[str, Any]:
+        limits = self._limits.get(name)
+        max_connections: Optional[int] = limits.max_connections if limits else None
+        stats: Dict[str, Any] = {
+            "max_connections": max_connections,
+            "max_keepalive": limits.max_keepalive_connections if limits else None,
+            "closed": client.is_closed,
+        }
+        counters = _pool_counters(client)
+        if counters is None:
+            if not self._pool_counters_missing:
+                self._pool_counters_missing = True
+                logger.warning("[HTTP] connection pool internals not found; pool usage is not reported")
+            stats["counters"] = "unavailable"
+            stats.update(dict.fromkeys(("connections", "active", "idle", "queued", "saturation")))
+            return stats
+        stats.update(counters)
+        stats["saturation"] = round(counters["active"] / max_connections, 3) if max_connections else None
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: self._pool_stats(name, client)
+            for name, client in self._clients.items()
+        }
+
+
+upstream_clients = UpstreamClients()
@@ -1,9 +1,9 @@
 from __future__ import annotations
-from fastapi import FastAPI, HTTPException, Header, Depends
+from fastapi import FastAPI, HTTPException, Header, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any, Union, Literal, Tuple
+from typing import Optional, List, Dict, Any, Union, Literal, Tuple, AsyncIterator, Awaitable, Callable, TypeVar
 import httpx
 import os
 import json
@@ -13,9 +13,44 @@ import asyncio
 import urllib.parse
 import logging
 import hashlib
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
-from prompt_i18n import localize_prompt_with_model
+from admission import (
+    API,
+    BACKGROUND,
+    AdmissionControl,
+    AdmissionLimiter,
+    AdmissionRejected,
+    parse_priority,
+    run_preemptible,
+    until_preempted,
+)
+from cancellation import CancellationStats, ClientDisconnected, ClosingStreamingResponse, DisconnectWatcher
+from circuit_breaker import CircuitBreaker, CircuitBreakers
+from degradation import DegradationController, FirstTokenLate, first_within
+from health_prober import HealthProber
+from http_clients import upstream_clients
+from message_analysis import MessageAnalyzer
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Histogram, MetricsRegistry
+from narrative_checks import NarrativeValidator, NarrativeVerdict
+from ndjson_stream import NDJSONFrameWriter, StreamStats, flush_ticks
+from ollama_keepalive import OllamaKeepAlive, parse_active_hours
+from prompt_budget import BudgetStats, assemble_prompt
+from prompt_i18n import (
+    cancel_background_fills,
+    configure_prompt_catalog,
+    localize_prompt_nowait,
+    prompt_catalog_stats,
+    set_translation_gate,
+    warm_prompt_catalog,
+)
+from provider_router import ProviderRouter, RoutedStream
+from shared_stream import SharedStreams
+from singleflight import SingleFlight
+from ticker_scan import TickerScan
+from trending import FRESH, WARMED, NarrativeWarmer, TrendingSymbols
+from ttl_cache import TTLCache
 from wallet.repo import InMemoryWalletRepository
 from wallet.repo_postgres import PostgresConfig, PostgresWalletRepository
 from wallet.service import WalletService, serialize_wallet_machine
@@ -23,7 +58,17 @@ from wallet.service import WalletService, serialize_wallet_machine
 logger = logging.getLogger(__name__)
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
-app = FastAPI()
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    await _on_startup()
+    try:
+        yield
+    finally:
+        await _on_shutdown()
+
+
+app = FastAPI(lifespan=_lifespan)
 
 # CORS middleware to allow Flutter app to call this API
 app.add_middleware(
@@ -54,12 +99,50 @@ OPENAI_KEY = (os.getenv("OPENAI_KEY") or os.getenv("OPENAI_API_KEY") or "").stri
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
 # Cocoon client (OpenAI-compatible API; for local or Railway client)
 COCOON_CLIENT_URL = _normalize_url(os.getenv("COCOON_CLIENT_URL", ""), "http://127.0.0.1:10000")
+# Cocoon only backs up other providers when its client URL is set explicitly.
+COCOON_CONFIGURED = bool(os.getenv("COCOON_CLIENT_URL", "").strip())
 COCOON_MODEL = os.getenv("COCOON_MODEL", "default")
 RAG_URL = _normalize_url(os.getenv("RAG_URL", ""), "http://127.0.0.1:8001")
 RESPONSE_FORMAT_VERSION = "facts_analysis_v2"
 INNER_CALLS_KEY = (os.getenv("INNER_CALLS_KEY") or os.getenv("API_KEY") or "").strip()
 WALLET_REPO = (os.getenv("WALLET_REPO") or "memory").strip().lower()
 DATABASE_URL = (os.getenv("DATABASE_URL") or "").strip()
+# Localized prompt catalog: persisted (empty path = memory only) and warmed at
+# startup for these output languages with the primary provider's model.
+PROMPT_CATALOG_PATH = os.getenv(
+    "PROMPT_CATALOG_PATH", str(Path(__file__).resolve().parent / ".cache" / "prompt_catalog.json")
+).strip()
+PROMPT_WARM_LANGS = [
+    lang.strip().lower() for lang in os.getenv("PROMPT_WARM_LANGS", "ru").split(",") if lang.strip()
+]
+
+# Prompt token budget: history and RAG context are fitted into it (oldest
+# turns go first, duplicate snippets are dropped). 0 disables the assembler.
+# PROMPT_TOKEN_BUDGETS="model=tokens,..." sets it per model.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+PROMPT_TOKEN_BUDGETS = {
+    name.strip(): int(tokens)
+    for name, _, tokens in (
+        entry.rpartition("=") for entry in os.getenv("PROMPT_TOKEN_BUDGETS", "").split(",") if "=" in entry
+    )
+}
+PROMPT_CONTEXT_SHARE = float(os.getenv("PROMPT_CONTEXT_SHARE", "0.5"))
+_budget_stats = BudgetStats()
+
+# Per-upstream circuit breakers: CIRCUIT_FAILURE_THRESHOLD consecutive
+# failures/timeouts open a circuit for CIRCUIT_RESET_SECONDS, then a single
+# probe request decides whether it closes again. <NAME>_CIRCUIT_* overrides
+# one upstream (OLLAMA, OPENAI, COCOON, RAG).
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+_circuits = CircuitBreakers(
+    CircuitBreaker(
+        name,
+        failure_threshold=int(os.getenv(f"{name.upper()}_CIRCUIT_FAILURE_THRESHOLD", str(CIRCUIT_FAILURE_THRESHOLD))),
+        reset_timeout_s=float(os.getenv(f"{name.upper()}_CIRCUIT_RESET_SECONDS", str(CIRCUIT_RESET_SECONDS))),
+    )
+    for name in ("ollama", "openai", "cocoon", "rag")
+)
 
 
 def _mask_secret(value: str, visible: int = 4) -> str:
@@ -95,6 +178,47 @@ def _ollama_fallback_enabled() -> bool:
     return _primary_provider() == "openai" and OLLAMA_SWITCH
 
 
+def _fallback_providers(primary: str) -> List[str]:
+    """Providers that may take over (or be hedged to) when ``primary`` is slow or failing."""
+    enabled = {
+        "openai": OPENAI_SWITCH and bool(OPENAI_KEY),
+        "ollama": OLLAMA_SWITCH,
+        "cocoon": COCOON_CONFIGURED,
+    }
+    return [name for name, on in enabled.items() if on and name != primary]
+
+
+def _default_model(provider: str) -> str:
+    if provider == "openai":
+        return OPENAI_MODEL
+    if provider == "cocoon":
+        return COCOON_MODEL
+    return OLLAMA_MODEL
+
+
+def _prompt_token_budget(provider: str, model: str, options: Dict[str, Any]) -> int:
+    """Prompt tokens allowed for ``model``: PROMPT_TOKEN_BUDGETS entry, else the
+    Ollama context window (num_ctx - num_predict), else PROMPT_TOKEN_BUDGET."""
+    if model in PROMPT_TOKEN_BUDGETS:
+        return PROMPT_TOKEN_BUDGETS[model]
+    if provider == "ollama" and options.get("num_ctx"):
+        num_predict = options.get("num_predict") or 0
+        return max(0, int(options["num_ctx"]) - max(0, int(num_predict)))
+    return PROMPT_TOKEN_BUDGET
+
+
+def _chain_token_budget(provider: str, model: str, options: Dict[str, Any]) -> int:
+    """Smallest prompt budget among ``provider`` and its fallbacks (0 = no trimming).
+
+    The same messages go to whichever provider takes over or is hedged to,
+    so they must fit the smallest context window in the chain.
+    """
+    budgets = [_prompt_token_budget(provider, model, options)] + [
+        _prompt_token_budget(name, _default_model(name), options) for name in _fallback_providers(provider)
+    ]
+    return min((budget for budget in budgets if budget > 0), default=0)
+
+
 def _log_runtime_env_snapshot() -> None:
     provider = _primary_provider()
     logger.info("[ENV][AI] runtime configuration snapshot")
@@ -119,69 +243,138 @@ def _inner_calls_headers() -> Dict[str, str]:
         return {}
     return {"X-API-Key": INNER_CALLS_KEY}
 
-# ============================================================================
-# TICKER DETECTION - PRODUCTION GRADE
-# ============================================================================
 
-# Regex for candidate extraction (alphanumeric 2-10 chars)
-TICKER_RE = re.compile(r"\b[a-zA-Z0-9]{2,10}\b")
-
-# Common non-ticker words to filter out (expand as needed)
-COMMON_WORDS = {
-    "THE", "WHAT", "THIS", "THAT", "HAVE", "WITH", "FROM", "THEY", "BEEN",
-    "WERE", "SAID", "EACH", "WHICH", "THEIR", "ABOUT", "WOULD", "THESE",
-    "OTHER", "COULD", "SOME", "THAN", "THEN", "THEM", "INTO", "ALSO",
-    "YOUR", "JUST", "LIKE", "MORE", "VERY", "WHEN", "MAKE", "TIME",
-    "YEAR", "OVER", "ONLY", "SUCH", "WELL", "BACK", "GOOD", "MUCH",
-    "HTTP", "HTTPS", "WWW", "API", "URL", "COM", "ORG", "NET", "HTML",
-    "JSON", "XML", "JPEG", "PNG", "GIF", "PDF", "DOC", "TXT", "CSV",
-    "AND", "FOR", "ARE", "BUT", "NOT", "YOU", "ALL", "CAN", "HER",
-    "WAS", "ONE", "OUR", "OUT", "DAY", "GET", "HAS", "HIM", "HIS",
-    "HOW", "MAN", "NEW", "NOW", "OLD", "SEE", "TWO", "WAY", "WHO",
-    "BOY", "DID", "ITS", "LET", "PUT", "SAY", "SHE", "TOO", "USE",
-}
+_T = TypeVar("_T")
 
-# Ticker context keywords (signals this is likely about crypto/tokens)
-TICKER_CONTEXT_EN = {
-    "token", "coin", "crypto", "price", "supply", "market", "cap",
-    "contract", "address", "blockchain", "wallet", "exchange",
-    "trading", "buy", "sell", "hodl", "moon", "lambo", "dip",
-    "pump", "dump", "whale", "airdrop", "mint", "burn", "stake",
-}
 
-TICKER_CONTEXT_RU = {
-    "токен", "монета", "крипто", "цена", "саплай", "капитализация",
-    "контракт", "адрес", "блокчейн", "кошелёк", "биржа", "обмен",
-    "торговля", "купить", "продать", "холдить", "луна", "памп",
-    "дамп", "кит", "аирдроп", "минт", "сжигание", "стейкинг",
-}
+async def _rag_guarded(call: Callable[[], Awaitable[_T]], rejected: _T, is_failure: Callable[[_T], bool]) -> _T:
+    """Run a RAG call through the rag circuit; ``rejected`` is returned at once while it is open."""
+    breaker = _circuits.get("rag")
+    if not breaker.allow():
+        return rejected
+    try:
+        result = await call()
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    if is_failure(result):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return result
 
-# Simple in-memory cache for ticker verification
-# Format: {symbol: (is_valid: bool, data: dict|None, expires_at: float)}
-_ticker_cache: Dict[str, Tuple[bool, Optional[dict], float]] = {}
-CACHE_TTL_SECONDS = 600  # 10 minutes
 
+def _rag_outcome_failed(result: Tuple[str, Optional[dict]]) -> bool:
+    return result[0] in ("timeout", "unavailable")
 
-def _is_cache_valid(symbol: str) -> bool:
-    """Check if cached ticker data is still valid"""
-    if symbol not in _ticker_cache:
-        return False
-    _, _, expires = _ticker_cache[symbol]
-    return time.time() < expires
+
+def _rag_batch_failed(results: Optional[Dict[str, Tuple[str, Optional[dict]]]]) -> bool:
+    # None = no batch endpoint, which still means RAG answered.
+    return bool(results) and all(_rag_outcome_failed(r) for r in results.values())
+
+# ============================================================================
+# TICKER DETECTION - PRODUCTION GRADE
+# ============================================================================
+
+# Bounded ticker verification cache: symbol -> (is_valid, data).
+# Positive results stay servable as stale for TICKER_STALE_TTL_SECONDS after
+# they expire and are refreshed in the background meanwhile, so hot symbols
+# never block a chat on RAG. Negative results use a shorter TTL and no stale
+# window so one-off spam tokens age out quickly.
+CACHE_TTL_SECONDS = int(os.getenv("TICKER_CACHE_TTL_SECONDS", "600"))  # 10 minutes
+NEGATIVE_CACHE_TTL_SECONDS = int(os.getenv("TICKER_NEGATIVE_TTL_SECONDS", "300"))
+STALE_CACHE_TTL_SECONDS = int(os.getenv("TICKER_STALE_TTL_SECONDS", "3600"))
+TICKER_CACHE_MAX_ENTRIES = int(os.getenv("TICKER_CACHE_MAX_ENTRIES", "2048"))
+# Max concurrent RAG lookups per message while verifying ticker candidates
+TICKER_LOOKUP_CONCURRENCY = int(os.getenv("TICKER_LOOKUP_CONCURRENCY", "4"))
+_ticker_cache: TTLCache[Tuple[bool, Optional[dict]]] = TTLCache(TICKER_CACHE_MAX_ENTRIES)
+_ticker_refresh_tasks: Dict[str, asyncio.Task] = {}
+# In-flight RAG verifications by symbol, shared by concurrent requests
+_ticker_flights: SingleFlight[Tuple[str, Optional[dict]]] = SingleFlight()
+
+# Vetted ticker-mode answers (facts block + narrative). Keyed by the facts
+# fingerprint, so changed RAG data misses instead of serving an old answer.
+# TICKER_RESPONSE_CACHE_TTL_SECONDS=0 disables the cache.
+TICKER_RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("TICKER_RESPONSE_CACHE_TTL_SECONDS", "900"))
+TICKER_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("TICKER_RESPONSE_CACHE_MAX_ENTRIES", "512"))
+_ticker_response_cache: TTLCache[str] = TTLCache(TICKER_RESPONSE_CACHE_MAX_ENTRIES)
+
+# Memoized per-message analysis (language, output-language instruction,
+# ticker scan), keyed by content hash.
+_message_analyzer = MessageAnalyzer(int(os.getenv("MESSAGE_ANALYSIS_CACHE_MAX_ENTRIES", "4096")))
 
 
 def _get_cached_ticker(symbol: str) -> Optional[Tuple[bool, Optional[dict]]]:
-    """Get cached ticker validation result"""
-    if not _is_cache_valid(symbol):
+    """Get cached ticker validation result; stale hits schedule a refresh."""
+    hit = _ticker_cache.get(symbol)
+    if hit is None:
         return None
-    is_valid, data, _ = _ticker_cache[symbol]
-    return (is_valid, data)
+    if hit.stale:
+        _schedule_ticker_refresh(symbol)
+    return hit.value
 
 
 def _cache_ticker(symbol: str, is_valid: bool, data: Optional[dict] = None):
     """Cache ticker validation result"""
-    expires = time.time() + CACHE_TTL_SECONDS
-    _ticker_cache[symbol] = (is_valid, data, expires)
+    if is_valid:
+        _ticker_cache.set(symbol, (True, data), CACHE_TTL_SECONDS, STALE_CACHE_TTL_SECONDS)
+    else:
+        _ticker_cache.set(symbol, (False, None), NEGATIVE_CACHE_TTL_SECONDS)
+
+
+def _schedule_ticker_refresh(symbol: str) -> None:
+    """Revalidate a stale ticker entry in the background (at most one per symbol)."""
+    if not RAG_URL or symbol in _ticker_refresh_tasks:
+        return
+    try:
+        task = asyncio.get_running_loop().create_task(_refresh_ticker(symbol))
+    except RuntimeError:
+        return
+    _ticker_refresh_tasks[symbol] = task
+    task.add_done_callback(lambda _t: _ticker_refresh_tasks.pop(symbol, None))
+
+
+async def _refresh_ticker(symbol: str) -> None:
+    outcome, _ = await _ticker_flights.call(
+        symbol,
+        lambda: _rag_guarded(
+            lambda: _verify_ticker_symbol(
+                upstream_clients.get("rag"),
+                symbol,
+                RAG_URL,
+                timeout_s=5.0,
+            ),
+            ("unavailable", None),
+            _rag_outcome_failed,
+        ),
+    )
+    if outcome in ("timeout", "unavailable"):
+        # Keep serving the stale entry; the next stale hit retries.
+        logger.info(f"Ticker refresh for {symbol} failed: {outcome}")
+
+
+def _ticker_response_key(
+    symbol: str,
+    user_lang: str,
+    provider: str,
+    model: str,
+    reference_facts: str,
+    facts_text: str,
+    ton_only: bool,
+) -> Tuple[str, str, str, str, str]:
+    """
+    Cache key for a ticker-mode answer.
+
+    The fingerprint covers REFERENCE_FACTS plus the rendered facts block and
+    TON-scope flag, i.e. everything the cached answer was built from.
+    """
+    fingerprint = hashlib.sha256(
+        f"{int(ton_only)}\n{reference_facts}\n{facts_text}".encode("utf-8")
+    ).hexdigest()
+    return symbol.upper(), user_lang, provider, model, fingerprint
 
 
 def _extract_ticker_candidates(text: str) -> List[str]:
@@ -189,100 +382,186 @@ def _extract_ticker_candidates(text: str) -> List[str]:
     Extract and prioritize potential ticker symbols from text.
     Returns ordered list: uppercase + context-near candidates first.
     """
-    if not text:
-        return []
-    
-    # Extract all alphanumeric tokens
-    raw_tokens = TICKER_RE.findall(text)
-    if not raw_tokens:
-        return []
-    
-    text_lower = text.lower()
-    has_ticker_context = any(
-        word in text_lower 
-        for word in (TICKER_CONTEXT_EN | TICKER_CONTEXT_RU)
-    )
-    
-    candidates = []
-    seen = set()
-    
-    # Single-word queries like "dogs" should still be eligible as ticker intent.
-    text_stripped = text.strip()
-    normalized_tokens = [t.lower() for t in raw_tokens]
+    return list(_message_analyzer.analyze(text).scan.candidates)
 
-    # Phase 1: Prioritize obvious ticker patterns
-    for token in raw_tokens:
-        symbol = token.upper()
-        
-        # Skip if already seen
-        if symbol in seen:
-            continue
-        
-        # Filter: Skip all-digit tokens
-        if symbol.isdigit():
-            continue
-        
-        # Filter: Skip common words
-        if symbol in COMMON_WORDS:
-            continue
-        
-        has_dollar_signal = re.search(
-            rf"\$\s*{re.escape(token)}\b",
-            text,
-            flags=re.IGNORECASE,
-        ) is not None
-        is_standalone_symbol_query = (
-            len(raw_tokens) == 1
-            and normalized_tokens[0] == token.lower()
-            and text_stripped.lower() == token.lower()
-        )
 
-        # Filter: Skip mostly lowercase without context/symbol signal
-        if token.islower() and not has_ticker_context and not has_dollar_signal and not is_standalone_symbol_query:
-            continue
-        
-        # Filter: Skip very short tokens without uppercase or context
-        if len(symbol) < 3 and not (token.isupper() or has_ticker_context):
-            continue
-        
-        seen.add(symbol)
-        
-        # Priority scoring
-        score = 0
-        
-        # +10: Preceded by $ (strong ticker signal)
-        if f"${token}" in text or f"$ {token}" in text:
-            score += 10
-        
-        # +5: All uppercase in original text
-        if token.isupper():
-            score += 5
-        
-        # +3: Has meaningful uppercase signal (not just sentence TitleCase like "Tell")
-        elif any(c.isupper() for c in token):
-            is_titlecase_word = (
-                len(token) > 1
-                and token[0].isupper()
-                and token[1:].islower()
+async def _verify_ticker_symbol(
+    client: httpx.AsyncClient,
+    symbol: str,
+    rag_url: str,
+    timeout_s: float = 2.0,
+    max_retries: int = 2,
+    retry_delay_s: float = 0.2,
+) -> Tuple[str, Optional[dict]]:
+    """
+    Verify one candidate symbol via RAG and record the result in the ticker cache.
+
+    Returns:
+        (outcome, ticker_data)
+
+        outcome can be:
+        - "valid": Ticker exists, ticker_data holds the RAG payload
+        - "invalid": RAG says the ticker does not exist (negative-cached)
+        - "skip": Inconclusive answer for this symbol, try the next candidate
+        - "timeout": RAG service timeout
+        - "unavailable": RAG service error
+    """
+    last_transport_error = None
+    r = None
+    for attempt in range(max_retries + 1):
+        try:
+            r = await client.get(
+                f"{rag_url.rstrip('/')}/tokens/{symbol}",
+                headers=_inner_calls_headers(),
+                timeout=timeout_s,
             )
-            if not is_titlecase_word:
-                score += 3
-        
-        # +2: Near ticker context words
-        if has_ticker_context:
-            score += 2
-        
-        # +1: Wrapped in punctuation (e.g., "DOGS?" or "(MCOM)")
-        if any(f"{p}{token}{q}" in text for p in "([{\"'" for q in ")]}\"'?!.,;"):
-            score += 1
-        
-        candidates.append((score, symbol))
-    
-    # Sort by score (descending), then alphabetically
-    candidates.sort(key=lambda x: (-x[0], x[1]))
-    
-    # Return top 8 candidates max (prevent RAG spam)
-    return [sym for _, sym in candidates[:8]]
+            last_transport_error = None
+            break
+        except (httpx.TimeoutException, httpx.RequestError) as e:
+            last_transport_error = e
+            if attempt < max_retries:
+                await asyncio.sleep(retry_delay_s)
+                continue
+            r = None
+            break
+
+    if r is None:
+        if isinstance(last_transport_error, httpx.TimeoutException):
+            return "timeout", None
+        return "unavailable", None
+
+    try:
+        # 404 = not a valid ticker, cache and continue
+        if r.status_code == 404:
+            _cache_ticker(symbol, False)
+            return "invalid", None
+
+        # 5xx = upstream issue, do not mark ticker invalid
+        if r.status_code >= 500:
+            logger.warning(f"RAG upstream error for {symbol}: status={r.status_code}")
+            return "unavailable", None
+
+        # Success
+        if r.status_code == 200:
+            try:
+                data = r.json()
+
+                # Validate response structure
+                if not isinstance(data, dict):
+                    logger.warning(f"RAG returned non-dict payload for {symbol}")
+                    return "unavailable", None
+
+                # Check for error field
+                if data.get("error"):
+                    # Do not negative-cache generic upstream errors
+                    err_text = str(data.get("error", "")).lower()
+                    if "not found" in err_text or "not_found" in err_text:
+                        _cache_ticker(symbol, False)
+                        return "invalid", None
+                    return "skip", None
+
+                # Valid ticker found - cache and return
+                _cache_ticker(symbol, True, data)
+                return "valid", data
+
+            except (json.JSONDecodeError, ValueError):
+                # Malformed response from upstream - do not mark ticker invalid
+                logger.warning(f"RAG returned malformed JSON for {symbol}")
+                return "unavailable", None
+
+        # Other non-200 codes: try next candidate, no negative cache.
+        return "skip", None
+
+    except Exception as e:
+        # Other errors - log and continue to next candidate
+        logger.warning(f"RAG verification failed for {symbol}: {e}")
+        return "skip", None
+
+
+# Set when RAG has no /tokens/batch endpoint (older deployment); retried later.
+_rag_batch_unsupported_until = 0.0
+RAG_BATCH_RETRY_SECONDS = 600
+
+
+async def _verify_ticker_batch(
+    client: httpx.AsyncClient,
+    symbols: List[str],
+    rag_url: str,
+    timeout_s: float = 2.0,
+    max_retries: int = 2,
+    retry_delay_s: float = 0.2,
+) -> Optional[Dict[str, Tuple[str, Optional[dict]]]]:
+    """
+    Verify several candidate symbols in one RAG round trip (POST /tokens/batch).
+
+    Returns {symbol: (outcome, ticker_data)} with the same outcomes as
+    _verify_ticker_symbol, or None when the batch endpoint cannot be used and
+    the caller should fall back to per-symbol lookups.
+    """
+    global _rag_batch_unsupported_until
+    if time.monotonic() < _rag_batch_unsupported_until:
+        return None
+
+    last_transport_error = None
+    r = None
+    for attempt in range(max_retries + 1):
+        try:
+            r = await client.post(
+                f"{rag_url.rstrip('/')}/tokens/batch",
+                json={"symbols": symbols},
+                headers=_inner_calls_headers(),
+                timeout=timeout_s,
+            )
+            last_transport_error = None
+            break
+        except (httpx.TimeoutException, httpx.RequestError) as e:
+            last_transport_error = e
+            if attempt < max_retries:
+                await asyncio.sleep(retry_delay_s)
+                continue
+            r = None
+            break
+
+    if r is None:
+        outcome = "timeout" if isinstance(last_transport_error, httpx.TimeoutException) else "unavailable"
+        return {symbol: (outcome, None) for symbol in symbols}
+
+    if r.status_code in (404, 405):
+        _rag_batch_unsupported_until = time.monotonic() + RAG_BATCH_RETRY_SECONDS
+        logger.info(f"RAG has no batch token endpoint (status={r.status_code}); using per-symbol lookups")
+        return None
+    if r.status_code in (400, 422):
+        return None
+    if r.status_code >= 500:
+        logger.warning(f"RAG upstream error for batch {symbols}: status={r.status_code}")
+        return {symbol: ("unavailable", None) for symbol in symbols}
+    if r.status_code != 200:
+        return {symbol: ("skip", None) for symbol in symbols}
+
+    try:
+        payload = r.json()
+    except (json.JSONDecodeError, ValueError):
+        payload = None
+    results = payload.get("results") if isinstance(payload, dict) else None
+    if not isinstance(results, dict):
+        logger.warning(f"RAG returned malformed batch payload for {symbols}")
+        return {symbol: ("unavailable", None) for symbol in symbols}
+
+    outcomes: Dict[str, Tuple[str, Optional[dict]]] = {}
+    for symbol in symbols:
+        entry = results.get(symbol)
+        status = entry.get("status") if isinstance(entry, dict) else None
+        data = entry.get("data") if isinstance(entry, dict) else None
+        if status == "ok" and isinstance(data, dict):
+            _cache_ticker(symbol, True, data)
+            outcomes[symbol] = ("valid", data)
+        elif status == "not_found":
+            _cache_ticker(symbol, False)
+            outcomes[symbol] = ("invalid", None)
+        else:
+            # Per-symbol upstream trouble: inconclusive, no negative cache.
+            outcomes[symbol] = ("skip", None)
+    return outcomes
 
 
 async def detect_ticker_via_rag(
@@ -291,9 +570,12 @@ async def detect_ticker_via_rag(
     timeout_s: float = 2.0,
     max_retries: int = 2,
     retry_delay_s: float = 0.2,
+    scan: Optional[TickerScan] = None,
 ) -> Tuple[Optional[str], Optional[dict], Optional[str]]:
     """
     Detect and verify ticker symbol via RAG service.
+
+    ``scan`` lets callers that already scanned ``user_text`` skip a rescan.
     
     Returns:
         (ticker_symbol, ticker_data, error_code)
@@ -304,126 +586,126 @@ async def detect_ticker_via_rag(
         - "timeout": RAG service timeout
         - "unavailable": RAG service error
     """
-    candidates = _extract_ticker_candidates(user_text)
+    candidates = list((scan or _message_analyzer.analyze(user_text).scan).candidates)
     
     if not candidates:
         return None, None, "not_found"
     
-    async with httpx.AsyncClient(timeout=timeout_s) as client:
-        for symbol in candidates:
-            # Check cache first
-            cached = _get_cached_ticker(symbol)
-            if cached is not None:
-                is_valid, data = cached
-                if is_valid:
-                    return symbol, data, None
-                continue  # Try next candidate if this one is cached as invalid
-            
-            # Verify via RAG
-            last_transport_error = None
-            r = None
-            for attempt in range(max_retries + 1):
-                try:
-                    r = await client.get(
-                        f"{rag_url.rstrip('/')}/tokens/{symbol}",
-                        headers=_inner_calls_headers(),
-                    )
-                    last_transport_error = None
-                    break
-                except (httpx.TimeoutException, httpx.RequestError) as e:
-                    last_transport_error = e
-                    if attempt < max_retries:
-                        await asyncio.sleep(retry_delay_s)
-                        continue
-                    r = None
-                    break
+    # Check cache first. Candidates below the first cached-valid one can never
+    # win, so only higher-priority uncached candidates need a RAG lookup.
+    cached_winner: Optional[Tuple[str, Optional[dict]]] = None
+    to_verify: List[str] = []
+    for symbol in candidates:
+        cached = _get_cached_ticker(symbol)
+        if cached is None:
+            to_verify.append(symbol)
+            continue
+        is_valid, data = cached
+        if is_valid:
+            cached_winner = (symbol, data)
+            break
+        # Cached as invalid: skip this candidate
+
+    if not to_verify:
+        if cached_winner:
+            return cached_winner[0], cached_winner[1], None
+        return None, None, "not_found"
 
-            if r is None:
-                if isinstance(last_transport_error, httpx.TimeoutException):
-                    return None, None, "timeout"
-                return None, None, "unavailable"
-            
+    client = upstream_clients.get("rag")
+    fan_out = asyncio.Semaphore(max(1, TICKER_LOOKUP_CONCURRENCY))
+
+    async def _lookup(symbol: str) -> Tuple[str, Optional[dict]]:
+        async with fan_out:
             try:
-                
-                # 404 = not a valid ticker, cache and continue
-                if r.status_code == 404:
-                    _cache_ticker(symbol, False)
-                    continue
-                
-                # 5xx = upstream issue, do not mark ticker invalid
-                if r.status_code >= 500:
-                    logger.warning(f"RAG upstream error for {symbol}: status={r.status_code}")
-                    return None, None, "unavailable"
-                
-                # Success
-                if r.status_code == 200:
-                    try:
-                        data = r.json()
-                        
-                        # Validate response structure
-                        if not isinstance(data, dict):
-                            logger.warning(f"RAG returned non-dict payload for {symbol}")
-                            return None, None, "unavailable"
-                        
-                        # Check for error field
-                        if data.get("error"):
-                            # Do not negative-cache generic upstream errors
-                            err_text = str(data.get("error", "")).lower()
-                            if "not found" in err_text or "ticker not found" in err_text:
-                                _cache_ticker(symbol, False)
-                            continue
-                        
-                        # Valid ticker found - cache and return
-                        _cache_ticker(symbol, True, data)
-                        return symbol, data, None
-                    
-                    except (json.JSONDecodeError, ValueError):
-                        # Malformed response from upstream - do not mark ticker invalid
-                        logger.warning(f"RAG returned malformed JSON for {symbol}")
-                        return None, None, "unavailable"
-                
-                # Other non-200 codes: try next candidate, no negative cache.
-                
+                return await _rag_guarded(
+                    lambda: _verify_ticker_symbol(
+                        client,
+                        symbol,
+                        rag_url,
+                        timeout_s=timeout_s,
+                        max_retries=max_retries,
+                        retry_delay_s=retry_delay_s,
+                    ),
+                    ("unavailable", None),
+                    _rag_outcome_failed,
+                )
             except Exception as e:
-                # Other errors - log and continue to next candidate
                 logger.warning(f"RAG verification failed for {symbol}: {e}")
-                continue
-    
+                return "unavailable", None
+
+    async def _lookup_batch(symbols: List[str]) -> Optional[Dict[str, Tuple[str, Optional[dict]]]]:
+        try:
+            return await _rag_guarded(
+                lambda: _verify_ticker_batch(
+                    client,
+                    symbols,
+                    rag_url,
+                    timeout_s=timeout_s,
+                    max_retries=max_retries,
+                    retry_delay_s=retry_delay_s,
+                ),
+                {s: ("unavailable", None) for s in symbols},
+                _rag_batch_failed,
+            )
+        except Exception as e:
+            logger.warning(f"RAG batch verification failed for {symbols}: {e}")
+            return {s: ("unavailable", None) for s in symbols}
+
+    def _lookup_each(symbols: List[str]) -> Dict[str, "asyncio.Future"]:
+        return {s: _ticker_flights.call(s, lambda s=s: _lookup(s)) for s in symbols}
+
+    # Concurrent requests for the same symbol share one in-flight lookup
+    # (batch or per-symbol), which also fills the cache exactly once.
+    if time.monotonic() >= _rag_batch_unsupported_until:
+        lookups = _ticker_flights.call_many(to_verify, _lookup_batch)
+    else:
+        # RAG without /tokens/batch: per-symbol lookups, bounded fan-out.
+        lookups = _lookup_each(to_verify)
+
+    # Consume results in score order so the highest-priority valid symbol
+    # wins; lookups still pending once it resolves are cancelled (unless
+    # another request is waiting on them too).
+    try:
+        for i, symbol in enumerate(to_verify):
+            result = await lookups[symbol]
+            if result is None:
+                # Batch endpoint turned out to be missing: switch to per-symbol.
+                unresolved = [
+                    s for s in to_verify[i:]
+                    if lookups[s].done() and not lookups[s].cancelled() and lookups[s].result() is None
+                ]
+                lookups.update(_lookup_each(unresolved))
+                result = await lookups[symbol]
+            outcome, data = result
+            if outcome == "valid":
+                return symbol, data, None
+            if outcome in ("timeout", "unavailable"):
+                return None, None, outcome
+    finally:
+        for waiter in lookups.values():
+            if not waiter.done():
+                waiter.cancel()
+
+    if cached_winner:
+        return cached_winner[0], cached_winner[1], None
+
     # No valid ticker found in any candidate
     return None, None, "not_found"
 
 
 def _detect_language(text: str) -> str:
-    """Detect if text is primarily Russian or English"""
-    if not text:
-        return "en"
-    
-    # Count Cyrillic characters
-    cyrillic_count = sum(1 for c in text if '\u0400' <= c <= '\u04FF')
-    total_alpha = sum(1 for c in text if c.isalpha())
-    
-    if total_alpha == 0:
-        return "en"
-    
-    # If >30% Cyrillic, consider it Russian
-    return "ru" if (cyrillic_count / total_alpha) > 0.3 else "en"
+    """Detect if text is primarily Russian or English (>30% Cyrillic letters = Russian)."""
+    return _message_analyzer.analyze(text).lang
 
 
 def _detect_requested_output_language(messages: List["ChatMessage"], fallback_lang: str) -> str:
     """Detect explicit language request from upstream system prompts."""
     for msg in messages:
-        try:
-            if msg.role != "system":
-                continue
-            content = (msg.content or "").lower()
-            if not content:
-                continue
-            if ("strictly in russian" in content) or ("только на русском" in content) or ("строго на русском" in content):
-                return "ru"
-            if ("strictly in english" in content) or ("only in english" in content):
-                return "en"
-        except Exception:
+        if msg.role != "system" or not msg.content:
             continue
+        requested = _message_analyzer.analyze(msg.content).requested_lang
+        if requested:
+            return requested
     return fallback_lang
 
 
@@ -577,31 +859,8 @@ def _build_ticker_facts_block(ticker_data: Dict[str, Any], ticker_symbol: Option
     return "\n".join(lines)
 
 
-_CJK_RE = re.compile(r"[\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF]")
-
-
-def _narrative_fallback(user_lang: str) -> str:
-    return "Недостаточно данных для анализа." if user_lang == "ru" else "Insufficient data for analysis."
-
-
-def _contains_plain_fallback_phrase(text: str, user_lang: str) -> bool:
-    raw = (text or "").strip().lower()
-    if not raw:
-        return True
-    if user_lang == "ru":
-        return "недостаточно данных для анализа" in raw
-    return "insufficient data for analysis" in raw
-
-
-def _sanitize_ticker_narrative(narrative: str, user_lang: str) -> str:
-    text = re.sub(r"\s+", " ", (narrative or "").strip())
-    if not text:
-        return _narrative_fallback(user_lang)
-    # Keep narrative permissive so model can use available facts imaginatively.
-    # Only block obvious malformed/mixed-script garbage.
-    if _CJK_RE.search(text):
-        return _narrative_fallback(user_lang)
-    return text
+# Declarative checks every ticker-mode LLM narrative passes before it is shown.
+_narrative_validator = NarrativeValidator()
 
 
 def _normalize_paragraph_spacing(text: str) -> str:
@@ -611,48 +870,6 @@ def _normalize_paragraph_spacing(text: str) -> str:
     return cleaned.strip()
 
 
-def _ensure_ticker_identity_in_narrative(narrative: str, token_name: str, token_symbol: str, user_lang: str) -> str:
-    """Guarantee narrative explicitly references token identity (name/symbol)."""
-    text = (narrative or "").strip()
-    if not text:
-        return text
-
-    lower = text.lower()
-    name_present = bool(token_name and token_name.strip() and token_name.strip().lower() in lower)
-    symbol_present = bool(token_symbol and token_symbol.strip() and token_symbol.strip().lower() in lower)
-    if name_present or symbol_present:
-        return text
-
-    if user_lang == "ru":
-        prefix = f"Для {token_name or token_symbol} ({token_symbol}) этот нарратив связан с мемной идентичностью сообщества в TON."
-    else:
-        prefix = f"For {token_name or token_symbol} ({token_symbol}), this narrative centers on meme identity and community culture in TON."
-    return f"{prefix} {text}"
-
-
-def _strip_stat_repetition(narrative: str, user_lang: str) -> str:
-    """Remove narrative sentences that just repeat stats already shown above."""
-    text = (narrative or "").strip()
-    if not text:
-        return text
-
-    parts = re.split(r"(?<=[.!?])\s+", text)
-    stat_en = ("supply", "holders", "holder", "last activity", "market cap", "circulating")
-    stat_ru = ("выпуск", "держател", "холдер", "последн", "активност", "капитализац")
-    stat_terms = stat_ru if user_lang == "ru" else stat_en
-
-    filtered = []
-    for part in parts:
-        lower = part.lower()
-        if any(term in lower for term in stat_terms):
-            continue
-        filtered.append(part.strip())
-
-    # If we stripped too aggressively, keep original so we don't return empty output.
-    cleaned = " ".join(p for p in filtered if p).strip()
-    return cleaned or text
-
-
 def _descriptive_narrative_fallback(name: str, symbol: str, user_lang: str, description: str = "") -> str:
     token_label = name or symbol or "This token"
     token_upper = f"{name} {symbol}".upper()
@@ -724,52 +941,6 @@ def _descriptive_narrative_fallback(name: str, symbol: str, user_lang: str, desc
     )
 
 
-def _is_generic_ton_boilerplate(text: str, user_lang: str) -> bool:
-    t = (text or "").lower()
-    if not t:
-        return False
-    if user_lang == "ru":
-        markers = (
-            "экосистем", "блокчейн", "децентрализ", "цифров", "nft", "defi", "технолог",
-        )
-    else:
-        markers = (
-            "ton ecosystem", "blockchain technology", "digital asset", "decentralized finance", "defi", "nft",
-        )
-    hit_count = sum(1 for m in markers if m in t)
-    return hit_count >= 2
-
-
-def _is_utility_boilerplate(text: str, user_lang: str) -> bool:
-    t = (text or "").lower()
-    if not t:
-        return False
-    if user_lang == "ru":
-        markers = (
-            "использует", "используется", "для транзакц", "dapp", "децентрализ", "цифровой актив",
-        )
-    else:
-        markers = (
-            "used for transactions", "used in transactions", "decentralized applications",
-            "digital asset", "utility token", "dapp", "defi projects",
-        )
-    return sum(1 for m in markers if m in t) >= 1
-
-
-def _has_excessive_latin_in_ru(text: str) -> bool:
-    """Detect RU narratives polluted by long English fragments."""
-    if not text:
-        return False
-    cyr = len(re.findall(r"[А-Яа-яЁё]", text))
-    lat = len(re.findall(r"[A-Za-z]", text))
-    if lat == 0:
-        return False
-    # Allow token symbols/TON names, but reject mixed-language paragraphs.
-    if cyr == 0:
-        return True
-    return (lat / max(cyr, 1)) > 0.35
-
-
 def _build_deterministic_ticker_overview(ticker_data: Dict[str, Any], user_lang: str) -> str:
     token_type = str(ticker_data.get("type") or "token").lower()
     is_jetton = token_type == "jetton"
@@ -782,93 +953,585 @@ def _build_deterministic_ticker_overview(ticker_data: Dict[str, Any], user_lang:
     return f"{first} {second}"
 
 
+def _ticker_prompt_template(user_lang: str, ton_only: bool) -> str:
+    """English ticker-narrative instructions for one output language and TON scope."""
+    ton_scope_rule_en = (
+        "- Treat this asset strictly as part of the TON ecosystem.\n"
+        "- DO NOT claim or imply that it belongs to any non-TON blockchain."
+        if ton_only
+        else "- Keep blockchain context consistent with REFERENCE_FACTS."
+    )
+    language_name = {
+        "en": "English",
+        "ru": "Russian",
+    }.get(user_lang, user_lang)
+    return (
+        f"Reply ONLY in {language_name}.\n"
+        "Write a concise 2-4 sentence narrative.\n"
+        "\n"
+        "NARRATIVE RULES:\n"
+        "- These rules apply only to the Narrative section; do not rewrite or alter the facts/stats block.\n"
+        "- Use REFERENCE_FACTS as the primary anchor.\n"
+        "- You may use general model knowledge for qualitative context, but do not fabricate specific factual claims.\n"
+        "- Start from token identity: interpret the token name/symbol and description cues.\n"
+        "- Mention token name or symbol naturally in the narrative.\n"
+        "- If description exists in REFERENCE_FACTS, incorporate it explicitly in the first 1-2 sentences.\n"
+        "- Do NOT restate supply/holders/last activity or other numeric stats already shown in the stats block.\n"
+        "- Focus on the descriptive story: what the meme identity is, why this token likely appeared, and what community narrative it represents.\n"
+        "- Prefer cultural/semiotic interpretation: what the symbol means figuratively, why this meme resonates socially, and what philosophy of community participation it signals.\n"
+        "- It is acceptable to use soft hypothesis language (for example: likely, may, often) for narrative framing.\n"
+        "- Do NOT claim transaction/payment utility unless REFERENCE_FACTS description explicitly says so.\n"
+        "- Avoid investment advice, guaranteed outcomes, or hard predictions.\n"
+        f"{ton_scope_rule_en}\n"
+        "\n"
+        "Always provide a narrative using available reference facts.\n"
+        "Keep it concise and grounded; avoid fabricated specifics.\n"
+    )
+
+
 def _is_ticker_context_strong(text: str) -> bool:
     """
     Check if message has strong ticker/crypto context signals.
     This helps distinguish:
     - "DOGS token price" (strong) vs "I love dogs" (weak)
     - "что такое DOGS токен" (strong) vs "что такое dogs" (weak)
+
+    Only explicit ticker/symbol clues count ("$" or an uppercase ticker-like
+    token); context words alone create false positives.
     """
-    if not text:
+    return _message_analyzer.analyze(text).strong_ticker_context
+
+
+def _has_explicit_ticker_signal(text: str) -> bool:
+    """
+    Return True only when the user message contains an explicit ticker-like cue.
+    This prevents generic prompts (e.g., wallet/profit questions) from being
+    misrouted into ticker mode.
+    """
+    return _message_analyzer.analyze(text).explicit_ticker_signal
+
+
+def _strip_ticker_turns_from_history(messages: List["ChatMessage"]) -> List["ChatMessage"]:
+    """
+    Remove prior ticker-oriented turns from history.
+    This prevents old ticker conversations from biasing a new general query.
+    """
+    cleaned: List["ChatMessage"] = []
+    skip_turn = False
+
+    for msg in messages:
+        if msg.role == "user":
+            skip_turn = _has_explicit_ticker_signal(msg.content)
+            if skip_turn:
+                continue
+            cleaned.append(msg)
+            continue
+
+        if skip_turn and msg.role in {"assistant", "tool"}:
+            continue
+
+        cleaned.append(msg)
+
+    return cleaned
+
+
+# ============================================================================
+# LLM PROVIDER STREAMS
+# ============================================================================
+
+# Token frames are coalesced: one NDJSON line per STREAM_FLUSH_INTERVAL_MS or
+# STREAM_FLUSH_CHARS of content, whichever comes first (0/1 = every token).
+STREAM_FLUSH_INTERVAL_MS = int(os.getenv("STREAM_FLUSH_INTERVAL_MS", "30"))
+STREAM_FLUSH_CHARS = int(os.getenv("STREAM_FLUSH_CHARS", "64"))
+_stream_stats = StreamStats()
+
+# Per-stage chat timings, exported on GET /metrics in Prometheus text format.
+# mode = ticker | rag | plain; outcome is stage-specific (ok, error, ...).
+_metrics = MetricsRegistry()
+_CHAT_LABELS = ("provider", "model", "mode", "outcome")
+_rag_lookup_seconds = _metrics.histogram(
+    "ai_chat_rag_lookup_seconds", "General RAG /query round trip.", _CHAT_LABELS
+)
+_ticker_detection_seconds = _metrics.histogram(
+    "ai_chat_ticker_detection_seconds", "Ticker candidate verification via cache/RAG.", _CHAT_LABELS
+)
+_prompt_localization_seconds = _metrics.histogram(
+    "ai_chat_prompt_localization_seconds", "Ticker prompt localization lookup.", _CHAT_LABELS
+)
+_stream_open_seconds = _metrics.histogram(
+    "ai_chat_stream_open_seconds", "LLM request sent until response headers.", _CHAT_LABELS
+)
+_ttft_seconds = _metrics.histogram(
+    "ai_chat_ttft_seconds", "Generation start until the first content token.", _CHAT_LABELS
+)
+_generation_seconds = _metrics.histogram(
+    "ai_chat_generation_seconds", "Generation start until the stream ends.", _CHAT_LABELS
+)
+
+# Client disconnects: requests dropped before generation (stage=preprocess)
+# or mid-stream (stage=generation), and the completion tokens that spared.
+_cancelled_total = _metrics.counter(
+    "ai_chat_cancelled_total", "Chat requests abandoned by the client.", ("provider", "model", "mode", "stage")
+)
+_cancelled_saved_tokens = _metrics.counter(
+    "ai_chat_cancelled_saved_tokens_total",
+    "Estimated completion tokens not generated because the client left.",
+    ("provider", "model", "mode"),
+)
+_cancellations = CancellationStats()
+
+# NDJSON output per streamed chat response (the totals in /health "streams").
+_STREAM_LABELS = ("provider", "mode")
+_stream_responses_total = _metrics.counter(
+    "ai_chat_stream_responses_total", "Streamed chat responses.", _STREAM_LABELS
+)
+_stream_tokens_total = _metrics.counter(
+    "ai_chat_stream_tokens_total", "Content tokens received for streamed chat responses.", _STREAM_LABELS
+)
+_stream_frames_total = _metrics.counter(
+    "ai_chat_stream_frames_total", "NDJSON frames written to chat clients.", _STREAM_LABELS
+)
+_stream_bytes_total = _metrics.counter(
+    "ai_chat_stream_bytes_total", "NDJSON bytes written to chat clients.", _STREAM_LABELS
+)
+
+
+def _record_stream(writer: NDJSONFrameWriter, provider: str, mode: str) -> None:
+    _stream_stats.record(writer)
+    _stream_responses_total.inc(provider=provider, mode=mode)
+    _stream_tokens_total.inc(writer.tokens, provider=provider, mode=mode)
+    _stream_frames_total.inc(writer.frames, provider=provider, mode=mode)
+    _stream_bytes_total.inc(writer.bytes, provider=provider, mode=mode)
+
+# Hedged routing: if the primary has no first token by its learned TTFT
+# percentile (HEDGE_DEFAULT_DELAY_MS until HEDGE_MIN_SAMPLES are collected),
+# the next provider is started as well and the first to produce tokens wins.
+HEDGE_SWITCH = (os.getenv("HEDGE_SWITCH", "1").strip().lower() in ("1", "true", "yes"))
+_provider_router = ProviderRouter(
+    hedging=HEDGE_SWITCH,
+    percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+    min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20")),
+    default_delay_s=int(os.getenv("HEDGE_DEFAULT_DELAY_MS", "2000")) / 1000.0,
+    min_delay_s=int(os.getenv("HEDGE_MIN_DELAY_MS", "250")) / 1000.0,
+    max_delay_s=int(os.getenv("HEDGE_MAX_DELAY_MS", "8000")) / 1000.0,
+)
+
+
+# Per-provider admission control: at most <NAME>_MAX_CONCURRENCY generations
+# in flight, up to <NAME>_MAX_QUEUE more waiting at most <NAME>_MAX_QUEUE_WAIT_MS
+# for a slot; beyond that chat replies "busy" at once (or fails over).
+# Waiters are served by priority class (interactive, api, background).
+# Background work (ticker warming, prompt translation) leaves
+# LLM_BACKGROUND_RESERVE slots to live requests, waits while any live request
+# waited longer than LLM_QUEUE_WAIT_SLO_MS in the last 30s, and is preempted
+# when a live request has to queue.
+_ADMISSION_DEFAULT_CONCURRENCY = {"ollama": 4, "openai": 32, "cocoon": 4}
+_admission = AdmissionControl(
+    AdmissionLimiter(
+        name,
+        max_concurrent=int(os.getenv(f"{name.upper()}_MAX_CONCURRENCY", str(concurrency))),
+        max_queue=int(os.getenv(f"{name.upper()}_MAX_QUEUE", os.getenv("LLM_MAX_QUEUE", "32"))),
+        max_wait_s=int(os.getenv(f"{name.upper()}_MAX_QUEUE_WAIT_MS", os.getenv("LLM_MAX_QUEUE_WAIT_MS", "15000")))
+        / 1000.0,
+        background_reserve=int(os.getenv("LLM_BACKGROUND_RESERVE", "1")),
+        slo_wait_s=int(os.getenv("LLM_QUEUE_WAIT_SLO_MS", "1000")) / 1000.0,
+    )
+    for name, concurrency in _ADMISSION_DEFAULT_CONCURRENCY.items()
+)
+# Requests without a valid X-Request-Priority header get this class.
+DEFAULT_REQUEST_PRIORITY = parse_priority(os.getenv("DEFAULT_REQUEST_PRIORITY"), API)
+_admission_wait_seconds = _metrics.histogram(
+    "ai_admission_queue_wait_seconds", "Wait for a provider admission slot.", ("provider", "priority")
+)
+
+
+# Load shedding for ticker mode: the facts block plus the descriptive narrative
+# fallback is a complete answer that needs no model call. It is served at once
+# when every usable provider has DEGRADE_QUEUE_DEPTH generations queued (0 =
+# never) or all their circuits are open, and replaces the LLM narrative when no
+# token arrives within TICKER_TTFT_DEADLINE_MS (0 = no deadline).
+DEGRADE_SWITCH = (os.getenv("DEGRADE_SWITCH", "1").strip().lower() in ("1", "true", "yes"))
+_degradation = DegradationController(
+    # Only live requests count; queued background work is not shed for.
+    lambda name: _admission.get(name).queued - _admission.get(name).queued_for(BACKGROUND),
+    lambda name: _circuits.get(name).available(),
+    queue_depth=int(os.getenv("DEGRADE_QUEUE_DEPTH", "8")),
+    ttft_deadline_s=int(os.getenv("TICKER_TTFT_DEADLINE_MS", "6000")) / 1000.0,
+    enabled=DEGRADE_SWITCH,
+)
+_degraded_total = _metrics.counter(
+    "ai_chat_degraded_total", "Ticker answers served without the LLM.", ("provider", "model", "reason")
+)
+
+
+# Ticker narrative warmer: every TICKER_WARM_INTERVAL_SECONDS the
+# TICKER_WARM_TOP most-requested symbols (decayed request count of at least
+# TICKER_WARM_MIN_REQUESTS, half-life TICKER_TRENDING_HALF_LIFE_SECONDS) get
+# their RAG facts refreshed and a vetted answer generated into the ticker
+# response cache for each of TICKER_WARM_LANGS. It only works while the
+# primary provider is idle (nothing queued, under half its slots busy).
+TICKER_WARM_SWITCH = (os.getenv("TICKER_WARM_SWITCH", "1").strip().lower() in ("1", "true", "yes"))
+TICKER_WARM_LANGS = [
+    lang.strip().lower() for lang in os.getenv("TICKER_WARM_LANGS", "en,ru").split(",") if lang.strip()
+]
+# Output-language instructions the chat handler recognizes (see _detect_requested_output_language).
+_WARM_LANG_INSTRUCTIONS = {"en": "Answer strictly in English.", "ru": "Answer strictly in Russian."}
+_trending = TrendingSymbols(half_life_s=float(os.getenv("TICKER_TRENDING_HALF_LIFE_SECONDS", "3600")))
+
+
+def _providers_idle() -> bool:
+    limiter = _admission.get(_primary_provider())
+    if limiter.queued:
         return False
-    
-    text_lower = text.lower()
-    
-    # Strong signals
-    if "$" in text:
-        return True
-    
-    # Uppercase ticker-like token is also a strong signal (e.g., "что такое DOGS")
-    if re.search(r"\b[A-Z0-9]{3,10}\b", text):
-        return True
-    
-    # Context words alone are not enough, they create false positives.
-    # Keep this helper strict: only explicit ticker/symbol clues count.
-    return False
+    return limiter.max_concurrent == 0 or limiter.active * 2 < limiter.max_concurrent
+
+
+async def _warm_ticker_narrative(symbol: str, lang: str) -> str:
+    """Generate and cache the ticker answer for ``symbol`` in ``lang`` unless a fresh one is cached."""
+    instruction = _WARM_LANG_INSTRUCTIONS.get(lang)
+    if instruction is None:
+        return "unsupported_lang"
+    request = ChatRequest(
+        messages=[
+            ChatMessage(role="system", content=instruction),
+            ChatMessage(role="user", content=f"${symbol}"),
+        ]
+    )
+    response, ticker_key = await _chat_with_ticker_key(request, background=True)
+    if response.status_code == 204:
+        return FRESH
+    if response.status_code != 200:
+        return "busy" if response.status_code == 503 else "not_ticker"
+    # Draining the stream runs the generation; its vetted answer lands in the cache.
+    async for _frame in response.body_iterator:
+        pass
+    # No fresh entry means the generation failed, was preempted or was rejected.
+    return WARMED if _ticker_response_cache.fresh_for(ticker_key) > 0 else "failed"
+
+
+_narrative_warmer = NarrativeWarmer(
+    _trending,
+    _refresh_ticker,
+    _warm_ticker_narrative,
+    _providers_idle,
+    languages=[lang for lang in TICKER_WARM_LANGS if lang in _WARM_LANG_INSTRUCTIONS],
+    top_n=int(os.getenv("TICKER_WARM_TOP", "10")),
+    min_score=float(os.getenv("TICKER_WARM_MIN_REQUESTS", "3")),
+    interval_s=float(os.getenv("TICKER_WARM_INTERVAL_SECONDS", "60")),
+)
+
+# Ollama model residency: the configured models are preloaded at startup and
+# re-pinged every OLLAMA_KEEPALIVE_INTERVAL_SECONDS during OLLAMA_ACTIVE_HOURS
+# (UTC, e.g. "7-23"; empty = always). Chat requests without their own
+# keep_alive get OLLAMA_KEEP_ALIVE during active hours.
+OLLAMA_WARMUP = (os.getenv("OLLAMA_WARMUP", "1").strip().lower() in ("1", "true", "yes"))
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip()
+_ollama_keepalive = OllamaKeepAlive(
+    lambda: upstream_clients.get("ollama"),
+    OLLAMA_URL,
+    [OLLAMA_MODEL] + [m.strip() for m in os.getenv("OLLAMA_WARM_MODELS", "").split(",") if m.strip()],
+    keep_alive=OLLAMA_KEEP_ALIVE,
+    interval_s=float(os.getenv("OLLAMA_KEEPALIVE_INTERVAL_SECONDS", "300")),
+    active_hours=parse_active_hours(os.getenv("OLLAMA_ACTIVE_HOURS", "")),
+)
+
+
+class UpstreamError(Exception):
+    """Non-200 reply from an LLM provider."""
+
+    def __init__(self, provider: str, status_code: int, detail: str, message: Optional[str] = None):
+        label = {"ollama": "Ollama", "openai": "OpenAI", "cocoon": "Cocoon"}.get(provider, provider)
+        self.provider = provider
+        self.status_code = status_code
+        self.detail = detail
+        # Client-facing error text (NDJSON ``error`` frame outside ticker mode)
+        self.message = message or f"{label} error: {detail}"
+        super().__init__(self.message)
+
+
+def _openai_error_detail(payload: Any, status_code: int) -> str:
+    error_detail = str(status_code)
+    try:
+        error_data = json.loads(payload) if isinstance(payload, (bytes, str)) else payload
+        if isinstance(error_data, dict):
+            error_obj = error_data.get("error", {})
+            error_detail = error_obj.get("message", error_detail)
+    except Exception:
+        pass
+    return error_detail
+
+
+async def _ollama_content(
+    ollama_request: Dict[str, Any], mode: str = "plain", observe: bool = True
+) -> AsyncIterator[str]:
+    """Yield content pieces from an Ollama /api/chat stream (``observe=False``: no stream-open metric)."""
+    inference_start = time.perf_counter()
+    client = upstream_clients.get("ollama")
+    async with client.stream(
+        "POST",
+        f"{OLLAMA_URL}/api/chat",
+        json=ollama_request,
+        timeout=60.0,
+    ) as response:
+        stream_open_s = time.perf_counter() - inference_start
+        logger.info(f"Ollama stream opened: {int(stream_open_s * 1000)}ms, model={ollama_request.get('model')}")
+        if observe:
+            _stream_open_seconds.observe(
+                stream_open_s,
+                provider="ollama",
+                model=ollama_request.get("model"),
+                mode=mode,
+                outcome="ok" if response.status_code == 200 else "error",
+            )
+
+        if response.status_code != 200:
+            error_detail = "Unknown error"
+            try:
+                error_text = await response.aread()
+                error_data = json.loads(error_text)
+                error_detail = error_data.get("error", str(error_text))
+            except Exception:
+                error_detail = str(response.status_code)
+            raise UpstreamError("ollama", response.status_code, error_detail)
+
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Failed to parse JSON line: {line[:100]}")
+                continue
+
+            # Ollama /api/chat streaming format
+            if "message" in data and isinstance(data["message"], dict):
+                content = data["message"].get("content", "")
+                if content:
+                    yield content
+            if data.get("done", False):
+                return
+
+
+async def _openai_compatible_content(
+    provider: str,
+    url: str,
+    headers: Dict[str, str],
+    body: Dict[str, Any],
+    stream: bool,
+    mode: str = "plain",
+    observe: bool = True,
+) -> AsyncIterator[str]:
+    """Yield content pieces from an OpenAI-compatible chat completions API (OpenAI, Cocoon)."""
+    inference_start = time.perf_counter()
+    client = upstream_clients.get(provider)
+    if stream:
+        async with client.stream("POST", url, headers=headers, json=body, timeout=60.0) as response:
+            stream_open_s = time.perf_counter() - inference_start
+            label = "OpenAI" if provider == "openai" else "Cocoon"
+            logger.info(f"{label} stream opened: {int(stream_open_s * 1000)}ms, model={body.get('model')}")
+            if observe:
+                _stream_open_seconds.observe(
+                    stream_open_s,
+                    provider=provider,
+                    model=body.get("model"),
+                    mode=mode,
+                    outcome="ok" if response.status_code == 200 else "error",
+                )
+
+            if response.status_code != 200:
+                raise UpstreamError(
+                    provider, response.status_code, _openai_error_detail(await response.aread(), response.status_code)
+                )
+
+            async for line in response.aiter_lines():
+                if not line or not line.startswith("data: "):
+                    continue
+                data_str = line[6:].strip()
+                if data_str == "[DONE]":
+                    return
+                try:
+                    data = json.loads(data_str)
+                except json.JSONDecodeError:
+                    continue
+                choices = data.get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta") or {}
+                content = delta.get("content")
+                if content:
+                    yield content
+        return
+
+    response = await client.post(url, headers=headers, json=body, timeout=60.0)
+    if observe:
+        _stream_open_seconds.observe(
+            time.perf_counter() - inference_start,
+            provider=provider,
+            model=body.get("model"),
+            mode=mode,
+            outcome="ok" if response.status_code == 200 else "error",
+        )
+    if response.status_code != 200:
+        raise UpstreamError(provider, response.status_code, _openai_error_detail(response.content, response.status_code))
+    data = response.json()
+    choices = data.get("choices") or []
+    if choices:
+        message = choices[0].get("message") or {}
+        content = message.get("content", "") or ""
+        if content:
+            yield content
+
+
+async def _openai_content(
+    openai_request: Dict[str, Any], stream: bool, mode: str = "plain", observe: bool = True
+) -> AsyncIterator[str]:
+    if not OPENAI_KEY:
+        raise UpstreamError("openai", 0, "missing key", message="OPENAI_KEY is required when using OpenAI")
+    headers = {
+        "Authorization": f"Bearer {OPENAI_KEY}",
+        "Content-Type": "application/json",
+    }
+    async for content in _openai_compatible_content(
+        "openai", "https://api.openai.com/v1/chat/completions", headers, openai_request, stream, mode, observe
+    ):
+        yield content
+
+
+def _cocoon_content(
+    openai_request: Dict[str, Any], stream: bool, mode: str = "plain", observe: bool = True
+) -> AsyncIterator[str]:
+    return _openai_compatible_content(
+        "cocoon",
+        f"{COCOON_CLIENT_URL}/v1/chat/completions",
+        {"Content-Type": "application/json"},
+        openai_request,
+        stream,
+        mode,
+        observe,
+    )
+
+
+class ProviderBusy(UpstreamError):
+    """Our own admission limit for a provider is saturated (the upstream itself is fine)."""
 
+    def __init__(self, provider: str, reason: str):
+        label = {"ollama": "Ollama", "openai": "OpenAI", "cocoon": "Cocoon"}.get(provider, provider)
+        super().__init__(
+            provider, 503, reason, message=f"{label} is busy right now, please try again in a moment"
+        )
 
-def _has_explicit_ticker_signal(text: str) -> bool:
-    """
-    Return True only when the user message contains an explicit ticker-like cue.
-    This prevents generic prompts (e.g., wallet/profit questions) from being
-    misrouted into ticker mode.
-    """
-    if not text:
-        return False
 
-    text_lower = text.lower()
+@asynccontextmanager
+async def _admission_slot(name: str, priority: str = API, preempt: Optional[asyncio.Event] = None):
+    """Hold one of ``name``'s admission slots; raises ProviderBusy when none is granted."""
+    limiter = _admission.get(name)
+    try:
+        waited = await limiter.acquire(priority, preempt)
+    except AdmissionRejected as e:
+        logger.warning(
+            f"[ADMISSION] {name} rejected {priority}: {e.reason}, active={limiter.active} queued={limiter.queued}"
+        )
+        raise ProviderBusy(name, e.reason) from None
+    _admission_wait_seconds.observe(waited, provider=name, priority=priority)
+    if waited >= 0.05:
+        logger.info(f"[ADMISSION] {name} {priority} queued {int(waited * 1000)}ms")
+    try:
+        yield
+    finally:
+        limiter.release(preempt)
 
-    # Strong universal signals
-    if "$" in text:
-        return True
-    if re.search(r"\b[A-Z0-9]{2,10}(USDT|USD|TON)\b", text):
-        return True
 
-    # Single standalone token symbol: e.g., "dogs"
-    text_stripped = text.strip()
-    one_token = re.fullmatch(r"[a-zA-Z0-9]{2,10}", text_stripped)
-    if one_token:
-        symbol = text_stripped.upper()
-        if not symbol.isdigit() and symbol not in COMMON_WORDS:
-            return True
+# Opt-in dedup of identical concurrent generations (e.g. everyone sending
+# "$DOGS" after a viral post): requests whose final provider request (model,
+# messages, options) matches one in flight subscribe to its stream instead of
+# starting another, replaying what they missed. Background work never shares.
+CHAT_DEDUP_SWITCH = (os.getenv("CHAT_DEDUP_SWITCH", "0").strip().lower() in ("1", "true", "yes"))
+_shared_streams: SharedStreams[str] = SharedStreams()
 
-    # English explicit forms: "dogs token", "token dogs", "ticker dogs"
-    if re.search(r"\b[a-z0-9]{2,10}\s+(token|coin|jetton|ticker)\b", text_lower):
-        return True
-    if re.search(r"\b(token|coin|jetton|ticker)\s+[a-z0-9]{2,10}\b", text_lower):
-        return True
 
-    # Russian explicit forms: "dogs токен", "токен dogs", etc.
-    if re.search(r"\b[a-z0-9]{2,10}\s+(токен|монета|тикер|джеттон)\b", text_lower):
-        return True
-    if re.search(r"\b(токен|монета|тикер|джеттон)\s+[a-z0-9]{2,10}\b", text_lower):
-        return True
+def _shared_stream_key(name: str, mode: str, body: Dict[str, Any]) -> str:
+    payload = json.dumps([name, mode, body], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-    return False
 
+async def _translation_slot(provider: str, translate: Callable[[], Awaitable[str]]) -> str:
+    # Prompt translations fill the catalog in the background: nobody waits on
+    # them, so they give their slot up as soon as a live request needs it.
+    name = "openai" if provider == "openai" else "ollama"
+    preempt = asyncio.Event()
+    async with _admission_slot(name, BACKGROUND, preempt):
+        try:
+            return await run_preemptible(name, translate(), preempt)
+        except AdmissionRejected as e:
+            logger.info(f"[ADMISSION] {name} prompt translation preempted")
+            raise ProviderBusy(name, e.reason) from None
+
+
+set_translation_gate(_translation_slot)
+
+
+async def _admitted(
+    name: str, content: Callable[[], AsyncIterator[str]], priority: str = API
+) -> AsyncIterator[str]:
+    """Hold one of ``name``'s admission slots for the whole generation."""
+    if priority != BACKGROUND:
+        async with _admission_slot(name, priority):
+            async for piece in content():
+                yield piece
+        return
+    # Background generations give their slot up as soon as a live request needs it.
+    preempt = asyncio.Event()
+    async with _admission_slot(name, priority, preempt):
+        try:
+            async for piece in until_preempted(name, content(), preempt):
+                yield piece
+        except AdmissionRejected as e:
+            logger.info(f"[ADMISSION] {name} background generation preempted")
+            raise ProviderBusy(name, e.reason) from None
 
-def _strip_ticker_turns_from_history(messages: List["ChatMessage"]) -> List["ChatMessage"]:
-    """
-    Remove prior ticker-oriented turns from history.
-    This prevents old ticker conversations from biasing a new general query.
-    """
-    cleaned: List["ChatMessage"] = []
-    skip_turn = False
 
-    for msg in messages:
-        if msg.role == "user":
-            skip_turn = _has_explicit_ticker_signal(msg.content)
-            if skip_turn:
-                continue
-            cleaned.append(msg)
-            continue
+def _is_provider_outage(exc: BaseException) -> bool:
+    """Errors that count against a provider's circuit (other 4xx replies mean it is up)."""
+    if isinstance(exc, UpstreamError):
+        return exc.status_code >= 500 or exc.status_code in (408, 429)
+    return isinstance(exc, (httpx.TimeoutException, httpx.RequestError))
 
-        if skip_turn and msg.role in {"assistant", "tool"}:
-            continue
 
-        cleaned.append(msg)
+async def _circuit_guarded(name: str, content: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+    """Run a provider content stream through that provider's circuit breaker.
 
-    return cleaned
+    While the circuit is open this fails immediately, so the router moves on
+    to the next provider without waiting on a dead upstream. The first piece
+    (or a clean empty finish) closes it; outages count as failures.
+    """
+    breaker = _circuits.get(name)
+    if not breaker.allow():
+        label = {"ollama": "Ollama", "openai": "OpenAI", "cocoon": "Cocoon"}.get(name, name)
+        raise UpstreamError(name, 503, "circuit open", message=f"{label} is temporarily unavailable (circuit open)")
+    recorded = False
+    try:
+        async for piece in content():
+            if not recorded:
+                breaker.record_success()
+                recorded = True
+            yield piece
+        if not recorded:
+            breaker.record_success()
+            recorded = True
+    except ProviderBusy:
+        raise
+    except Exception as e:
+        if _is_provider_outage(e):
+            breaker.record_failure()
+            recorded = True
+        elif not recorded and isinstance(e, UpstreamError) and e.status_code:
+            breaker.record_success()
+            recorded = True
+        raise
+    finally:
+        if not recorded:
+            # Cancelled (hedge loser, client gone) before any verdict.
+            breaker.release()
 
 
 # ============================================================================
@@ -957,9 +1620,57 @@ class WalletAllocateRequest(BaseModel):
 # ============================================================================
 
 
-@app.on_event("startup")
-async def _on_startup_log_env() -> None:
+_prompt_warm_task: Optional[asyncio.Task] = None
+
+
+async def _warm_prompts() -> None:
+    provider = _primary_provider()
+    templates = [
+        (_ticker_prompt_template(lang, ton_only), lang)
+        for lang in PROMPT_WARM_LANGS
+        for ton_only in (True, False)
+    ]
+    try:
+        filled = await warm_prompt_catalog(
+            templates,
+            provider=provider,
+            ollama_url=OLLAMA_URL,
+            ollama_model=OLLAMA_MODEL,
+            openai_api_key=OPENAI_KEY,
+            openai_model=OPENAI_MODEL,
+            client=upstream_clients.get("openai" if provider == "openai" else "ollama"),
+        )
+        logger.info(f"[I18N] prompt catalog warm-up done: {filled} translated, langs={PROMPT_WARM_LANGS}")
+    except Exception as e:
+        logger.warning(f"[I18N] prompt catalog warm-up failed: {e}")
+
+
+async def _on_startup() -> None:
+    global _prompt_warm_task
     _log_runtime_env_snapshot()
+    upstream_clients.open()
+    loaded = configure_prompt_catalog(PROMPT_CATALOG_PATH)
+    logger.info(f"[I18N] prompt catalog: {loaded} entries loaded from {PROMPT_CATALOG_PATH or '(memory only)'}")
+    if PROMPT_WARM_LANGS:
+        # Runs in the background: chat requests serve English until filled.
+        _prompt_warm_task = asyncio.create_task(_warm_prompts())
+    _health_prober.start()
+    if OLLAMA_SWITCH and OLLAMA_WARMUP:
+        _ollama_keepalive.start()
+    if TICKER_WARM_SWITCH and RAG_URL and TICKER_RESPONSE_CACHE_TTL_SECONDS > 0:
+        _narrative_warmer.start()
+
+
+async def _on_shutdown() -> None:
+    await _health_prober.stop()
+    await _ollama_keepalive.stop()
+    await _narrative_warmer.stop()
+    if _prompt_warm_task is not None and not _prompt_warm_task.done():
+        _prompt_warm_task.cancel()
+    await cancel_background_fills()
+    await upstream_clients.aclose()
+
+
 
 @app.get("/")
 async def root():
@@ -985,11 +1696,12 @@ async def _check_rag_health(timeout_s: float = 2.0) -> Dict[str, Any]:
 
     started = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            r = await client.get(
-                f"{RAG_URL.rstrip('/')}/health",
-                headers=_inner_calls_headers(),
-            )
+        client = upstream_clients.get("rag")
+        r = await client.get(
+            f"{RAG_URL.rstrip('/')}/health",
+            headers=_inner_calls_headers(),
+            timeout=timeout_s,
+        )
         elapsed_ms = int((time.perf_counter() - started) * 1000)
         if r.status_code == 200:
             return {
@@ -1032,11 +1744,12 @@ async def _check_llm_health(provider: str, timeout_s: float = 2.0) -> Dict[str,
             }
 
         try:
-            async with httpx.AsyncClient(timeout=timeout_s) as client:
-                r = await client.get(
-                    f"https://api.openai.com/v1/models/{OPENAI_MODEL}",
-                    headers={"Authorization": f"Bearer {OPENAI_KEY}"},
-                )
+            client = upstream_clients.get("openai")
+            r = await client.get(
+                f"https://api.openai.com/v1/models/{OPENAI_MODEL}",
+                headers={"Authorization": f"Bearer {OPENAI_KEY}"},
+                timeout=timeout_s,
+            )
             elapsed_ms = int((time.perf_counter() - started) * 1000)
             if r.status_code == 200:
                 return {
@@ -1069,9 +1782,9 @@ async def _check_llm_health(provider: str, timeout_s: float = 2.0) -> Dict[str,
 
     if provider == "cocoon":
         try:
-            async with httpx.AsyncClient(timeout=timeout_s) as client:
-                # Reachability check (base URL; client may not expose /stats)
-                r = await client.get(COCOON_CLIENT_URL)
+            client = upstream_clients.get("cocoon")
+            # Reachability check (base URL; client may not expose /stats)
+            r = await client.get(COCOON_CLIENT_URL, timeout=timeout_s)
             elapsed_ms = int((time.perf_counter() - started) * 1000)
             # Any response means the client is reachable (200, 404, 405 are common for GET /)
             if r.status_code < 500:
@@ -1108,8 +1821,8 @@ async def _check_llm_health(provider: str, timeout_s: float = 2.0) -> Dict[str,
 
     # ollama
     try:
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            r = await client.get(f"{OLLAMA_URL.rstrip('/')}/api/tags")
+        client = upstream_clients.get("ollama")
+        r = await client.get(f"{OLLAMA_URL.rstrip('/')}/api/tags", timeout=timeout_s)
         elapsed_ms = int((time.perf_counter() - started) * 1000)
 
         if r.status_code != 200:
@@ -1171,13 +1884,28 @@ async def _check_llm_health(provider: str, timeout_s: float = 2.0) -> Dict[str,
         }
 
 
+# Dependency checks run in the background every HEALTH_PROBE_INTERVAL_SECONDS
+# and /health serves the latest snapshot; 0 disables the prober (every
+# /health call checks live, as does ?fresh=1).
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "15"))
+_health_prober = HealthProber(
+    {
+        "rag": _check_rag_health,
+        "llm": lambda: _check_llm_health(_normalize_provider()),
+    },
+    interval_s=HEALTH_PROBE_INTERVAL_SECONDS,
+    history=int(os.getenv("HEALTH_PROBE_HISTORY", "20")),
+)
+
+
 @app.get("/health")
-async def health():
+async def health(fresh: bool = False):
     provider = _normalize_provider()
-    rag_check, llm_check = await asyncio.gather(
-        _check_rag_health(),
-        _check_llm_health(provider),
-    )
+    if fresh or not _health_prober.is_fresh():
+        checks, source = await _health_prober.refresh(), "live"
+    else:
+        checks, source = _health_prober.snapshot(), "cache"
+    rag_check, llm_check = checks["rag"], checks["llm"]
 
     llm_ok = llm_check.get("status") == "ok"
     rag_ok = rag_check.get("status") in {"ok", "skipped"}
@@ -1196,11 +1924,64 @@ async def health():
             "rag": rag_check,
             "llm": llm_check,
         },
+        "http_pools": upstream_clients.stats(),
+        "caches": {
+            "ticker": _ticker_cache.stats(),
+            "prompts": prompt_catalog_stats(),
+            "ticker_responses": _ticker_response_cache.stats(),
+            "message_analysis": _message_analyzer.stats(),
+        },
+        "coalescing": {
+            "ticker_lookups": _ticker_flights.stats(),
+            "chat_streams": {"enabled": CHAT_DEDUP_SWITCH, **_shared_streams.stats()},
+        },
+        "streams": _stream_stats.stats(),
+        "prompt_budget": _budget_stats.stats(),
+        "narrative_validation": _narrative_validator.stats(),
+        "cancellations": _cancellations.stats(),
+        "degradation": _degradation.stats(),
+        "ticker_warmer": _narrative_warmer.stats(),
+        "routing": _provider_router.stats(),
+        "circuits": _circuits.stats(),
+        "admission": _admission.stats(),
+        "health_probe": {"source": source, **_health_prober.stats()},
     }
 
     return JSONResponse(content=payload, status_code=200 if overall_ok else 503)
 
 
+def _build_capabilities_payload() -> Dict[str, Any]:
+    """Static feature/config summary plus live upstream availability (no upstream calls)."""
+    provider = _normalize_provider()
+    circuits = _circuits.stats()
+    chain = [provider] + _fallback_providers(provider)
+    return {
+        "service": "ai-backend",
+        "response_format_version": RESPONSE_FORMAT_VERSION,
+        "provider": provider,
+        "fallbacks": _fallback_providers(provider),
+        "models": {name: _default_model(name) for name in chain},
+        "features": {
+            "streaming": True,
+            "ticker_mode": bool(RAG_URL),
+            "rag": bool(RAG_URL),
+            "hedging": HEDGE_SWITCH,
+            "prompt_languages": ["en"] + [lang for lang in PROMPT_WARM_LANGS if lang != "en"],
+        },
+        "available": {
+            name: circuits[name]["state"] != "open"
+            for name in chain + (["rag"] if RAG_URL else [])
+        },
+        "circuits": circuits,
+        "ollama": _ollama_keepalive.stats() if OLLAMA_SWITCH else None,
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(content=_metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/capabilities")
 async def capabilities():
     return JSONResponse(content=_build_capabilities_payload(), status_code=200)
@@ -1275,11 +2056,56 @@ def wallet_activate(wallet_id: str):
 
 
 @app.post("/api/chat")
-async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
+async def chat(
+    request: ChatRequest,
+    http_request: Request,
+    api_key: str = Depends(verify_api_key),
+    x_request_priority: Optional[str] = Header(None, alias="X-Request-Priority"),
+):
     """
     Generate a chat message following Ollama API spec
     Requires valid API key in X-API-Key header
+    Optional X-Request-Priority header: interactive | api | background
+    """
+    priority = parse_priority(x_request_priority, DEFAULT_REQUEST_PRIORITY)
+    # Until the response starts streaming, a client disconnect cancels
+    # whatever the request is waiting on (ticker detection, RAG).
+    disconnect = DisconnectWatcher(http_request.receive).start()
+    try:
+        return await _chat(request, disconnect, priority=priority)
+    except ClientDisconnected:
+        # Nobody is left to read a reply (499 = client closed request).
+        return Response(status_code=499)
+    finally:
+        disconnect.stop()
+
+
+async def _chat(request: ChatRequest, disconnect: Optional[DisconnectWatcher] = None, priority: str = API):
+    """Chat handler body; ``priority`` is the admission class of its provider calls."""
+    response, _ticker_key = await _chat_with_ticker_key(request, disconnect, priority=priority)
+    return response
+
+
+async def _chat_with_ticker_key(
+    request: ChatRequest,
+    disconnect: Optional[DisconnectWatcher] = None,
+    background: bool = False,
+    priority: str = API,
+) -> Tuple[Response, Optional[Tuple[str, str, str, str, str]]]:
+    """
+    Run the chat handler; returns the response and, in ticker mode with the
+    response cache on, the cache key of the answer.
+
+    ``background`` marks a ticker pre-generation run (the narrative warmer,
+    admitted as background work): it only produces a stream when a ticker
+    answer needs generating, and answers 204 when a fresh one is already
+    cached, 503 when the providers are overloaded, and 404 outside ticker mode.
     """
+    if background:
+        priority = BACKGROUND
+    # Warm runs stay out of the latency metrics and router samples: they
+    # would skew the live SLO histograms and the learned hedge deadlines.
+    observe = not background
     if not request.messages or len(request.messages) == 0:
         raise HTTPException(status_code=400, detail="Messages array cannot be empty")
     
@@ -1291,12 +2117,65 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
     else:
         model = request.model or OLLAMA_MODEL
 
+    if request.options:
+        # Convert ModelOptions to dict, excluding None values
+        options_dict = request.options.model_dump(exclude_none=True)
+    else:
+        # Default options for backward compatibility with existing clients
+        options_dict = {
+            "num_ctx": 2048,
+            "num_predict": 256,
+            "temperature": 0.3,
+            "top_p": 0.9,
+            "repeat_penalty": 1.1,
+            "num_thread": 2,
+        }
+
+    def _record_cancelled(stage: str, mode: str, served_by: str, served_model: str, generated: int = 0) -> None:
+        saved = _cancellations.record_cancelled(
+            stage, served_by, served_model, generated, options_dict.get("num_predict")
+        )
+        _cancelled_total.inc(provider=served_by, model=served_model, mode=mode, stage=stage)
+        _cancelled_saved_tokens.inc(saved, provider=served_by, model=served_model, mode=mode)
+        logger.info(
+            f"[CANCEL] client left during {stage}: provider={served_by} mode={mode} "
+            f"generated={generated} saved~{saved} tokens"
+        )
+
     def stream_text_response(text: str):
         async def _gen():
             if text:
                 yield json.dumps({"token": text, "done": False}) + "\n"
             yield json.dumps({"response": text, "done": True}) + "\n"
-        return StreamingResponse(_gen(), media_type="application/x-ndjson")
+        return ClosingStreamingResponse(_gen(), media_type="application/x-ndjson")
+
+    def ticker_text_response(text: str):
+        # Same framing as a live ticker answer: facts prefix, then the vetted response.
+        prefix = _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n")
+
+        async def _gen():
+            yield json.dumps({"token": prefix, "done": False}) + "\n"
+            yield json.dumps({"response": text, "done": True}) + "\n"
+        return ClosingStreamingResponse(_gen(), media_type="application/x-ndjson")
+
+    def _deterministic_ticker_output() -> str:
+        """Facts block plus the descriptive narrative fallback: a full ticker answer without the LLM."""
+        narrative = _descriptive_narrative_fallback(
+            ticker_name_for_narrative,
+            str(ticker_symbol or ""),
+            user_lang,
+            ticker_description_for_narrative,
+        )
+        return _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n{narrative}")
+
+    def _record_degraded(reason: str, served_by: str) -> None:
+        _degradation.record(reason)
+        served_model = model if served_by == provider else _default_model(served_by)
+        _degraded_total.inc(provider=served_by, model=served_model, reason=reason)
+        logger.info(
+            f"[DEGRADE] {ticker_symbol}: deterministic ticker answer, reason={reason} provider={served_by} "
+            f"queued={_admission.get(served_by).queued} circuit={_circuits.get(served_by).state}"
+        )
     
     # ========================================================================
     # TICKER DETECTION + RAG GROUNDING
@@ -1311,29 +2190,138 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
     ton_only_narrative = False
     ticker_name_for_narrative = ""
     ticker_description_for_narrative = ""
+    ticker_response_key = None
+
+    # (histogram, seconds, outcome) per finished stage; observed once the
+    # request's mode (ticker / rag / plain) is known.
+    stage_timings: List[Tuple[Histogram, float, str]] = []
+
+    def _record_stages(mode: str) -> None:
+        if not observe:
+            stage_timings.clear()
+            return
+        for histogram, seconds, outcome in stage_timings:
+            histogram.observe(seconds, provider=provider, model=model, mode=mode, outcome=outcome)
+        stage_timings.clear()
     
     # Get last user message
     user_last = next((m.content for m in reversed(request.messages) if m.role == "user"), "")
     
     # Detect language for response formatting.
     # Respect explicit upstream system language instructions (EN/RU buttons).
-    user_lang = _detect_language(user_last)
-    user_lang = _detect_requested_output_language(request.messages, user_lang)
+    # Per-message analysis (language, ticker scan) is memoized by content, so
+    # history the client resends every turn is only analyzed once.
+    last_analysis = _message_analyzer.analyze(user_last)
+    user_lang = _detect_requested_output_language(request.messages, last_analysis.lang)
     
+    def _localize_ticker_prompt(ton_only: bool, count: bool = True) -> str:
+        # Cached translation or the English template; misses fill in the background.
+        return localize_prompt_nowait(
+            template_en=_ticker_prompt_template(user_lang, ton_only),
+            target_lang=user_lang,
+            provider=provider,
+            ollama_url=OLLAMA_URL,
+            ollama_model=OLLAMA_MODEL,
+            openai_api_key=OPENAI_KEY,
+            openai_model=OPENAI_MODEL,
+            client=upstream_clients.get("openai" if provider == "openai" else "ollama"),
+            count=count,
+        )
+
+    async def _general_rag_query() -> Tuple[Optional[list], Optional[list], str, float]:
+        """General RAG /query: (context, sources, outcome, seconds)."""
+        rag_start = time.perf_counter()
+        context, sources, outcome = None, None, "error"
+        try:
+            client = upstream_clients.get("rag")
+            encoded_query = urllib.parse.quote(user_last)
+            r = await _rag_guarded(
+                lambda: client.get(
+                    f"{RAG_URL.rstrip('/')}/query?q={encoded_query}",
+                    headers=_inner_calls_headers(),
+                    timeout=5.0,
+                ),
+                None,
+                lambda resp: resp.status_code >= 500,
+            )
+            if r is None:
+                outcome = "skipped"
+                logger.info("RAG query skipped: rag circuit open")
+            else:
+                if r.status_code == 200:
+                    try:
+                        data = r.json()
+                        if isinstance(data, dict):
+                            context = data.get("context", [])
+                            sources = data.get("sources", [])
+                    except Exception:
+                        pass
+                    outcome = "ok" if context else "empty"
+                rag_elapsed_ms = int((time.perf_counter() - rag_start) * 1000)
+                logger.info(f"RAG query: {rag_elapsed_ms}ms, status={r.status_code}")
+        except Exception:
+            pass
+        return context, sources, outcome, time.perf_counter() - rag_start
+
+    message_scan = last_analysis.scan
+    explicit_ticker_signal = message_scan.explicit_signal
+    strong_ticker_context = message_scan.strong_context
+
+    # The general RAG query is speculative: it runs alongside ticker detection
+    # and is dropped if ticker mode wins (or the request ends early).
+    rag_task: Optional["asyncio.Task"] = None
+    if RAG_URL and user_last and not background:
+        rag_task = asyncio.create_task(_general_rag_query())
+
+    def _drop_rag_task() -> None:
+        nonlocal rag_task
+        if rag_task is not None and not rag_task.done():
+            rag_task.cancel()
+            stage_timings.append((_rag_lookup_seconds, 0.0, "cancelled"))
+        rag_task = None
+
+    async def _until_disconnect(work: Awaitable[_T], mode: str) -> _T:
+        if disconnect is None:
+            return await work
+        # Client gone: drop every pending lookup and skip generation entirely.
+        try:
+            return await disconnect.run(work)
+        except ClientDisconnected:
+            _drop_rag_task()
+            _record_stages(mode)
+            _record_cancelled("preprocess", mode, provider, model)
+            raise
+
     # STEP 1: Try ticker detection if RAG is available
-    explicit_ticker_signal = _has_explicit_ticker_signal(user_last)
-    strong_ticker_context = _is_ticker_context_strong(user_last)
     if RAG_URL and user_last and explicit_ticker_signal:
-        ticker_symbol, ticker_data, error_code = await detect_ticker_via_rag(
-            user_last, 
-            RAG_URL, 
-            timeout_s=5.0
+        # Start translating the ticker prompt now (both source variants; the
+        # data source is only known after detection) so it is ready sooner.
+        # Only the lookup that picks the prompt counts in the catalog stats.
+        for ton_only in (True, False):
+            _localize_ticker_prompt(ton_only, count=False)
+        detect_start = time.perf_counter()
+        ticker_symbol, ticker_data, error_code = await _until_disconnect(
+            detect_ticker_via_rag(
+                user_last,
+                RAG_URL,
+                timeout_s=5.0,
+                scan=message_scan,
+            ),
+            "ticker",
         )
+        stage_timings.append((_ticker_detection_seconds, time.perf_counter() - detect_start, error_code or "found"))
         
         if ticker_symbol and ticker_data:
             # Valid ticker found - enter ticker mode
             ticker_mode = True
+            _drop_rag_task()
             logger.info(f"Ticker mode activated: {ticker_symbol}")
+            if not background:
+                _trending.record(str(ticker_symbol))
+
+        elif background:
+            _record_stages("ticker")
+            return Response(status_code=404 if error_code == "not_found" else 503), ticker_response_key
         
         elif error_code == "timeout":
             # RAG timeout - return helpful error
@@ -1342,7 +2330,9 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
                 if user_lang == "ru"
                 else "Cannot verify ticker right now — service timeout. Try again in a minute."
             )
-            return stream_text_response(msg)
+            _drop_rag_task()
+            _record_stages("ticker")
+            return stream_text_response(msg), ticker_response_key
         
         elif error_code == "not_found" and strong_ticker_context:
             # Strong ticker context but no verified ticker found
@@ -1354,7 +2344,9 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
                 else "I couldn't find verified data for that ticker. "
                 "Please send the exact symbol (Latin letters) or contract address."
             )
-            return stream_text_response(msg)
+            _drop_rag_task()
+            _record_stages("ticker")
+            return stream_text_response(msg), ticker_response_key
         
         # If error_code == "not_found" but context is NOT strong,
         # fall through to normal LLM answer (user might be asking about something else)
@@ -1364,34 +2356,25 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
     if ticker_mode and ticker_data:
         ticker_facts_text = _build_ticker_facts_block(ticker_data, ticker_symbol, user_lang)
 
-    # STEP 2: Try general RAG query if not in ticker mode
-    if RAG_URL and not ticker_mode and user_last:
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                rag_start = time.perf_counter()
-                encoded_query = urllib.parse.quote(user_last)
-                r = await client.get(
-                    f"{RAG_URL.rstrip('/')}/query?q={encoded_query}",
-                    headers=_inner_calls_headers(),
-                )
-                if r.status_code == 200:
-                    try:
-                        data = r.json()
-                        if isinstance(data, dict):
-                            rag_context = data.get("context", [])
-                            rag_sources = data.get("sources", [])
-                    except:
-                        pass
-                rag_elapsed_ms = int((time.perf_counter() - rag_start) * 1000)
-                logger.info(f"RAG query: {rag_elapsed_ms}ms, status={r.status_code}")
-        except:
-            pass
+    # STEP 2: Use the general RAG query (already in flight) if not in ticker mode
+    if rag_task is not None:
+        rag_context, rag_sources, rag_outcome, rag_seconds = await _until_disconnect(rag_task, "rag")
+        stage_timings.append((_rag_lookup_seconds, rag_seconds, rag_outcome))
+
+    chat_mode = "ticker" if ticker_mode else ("rag" if rag_context else "plain")
+    _record_stages(chat_mode)
+    if background and not ticker_mode:
+        return Response(status_code=404), ticker_response_key
     
     # ========================================================================
     # BUILD MESSAGES FOR OLLAMA
     # ========================================================================
     
+    # System messages we add are always kept; RAG snippets and history turns
+    # are fitted into the model's token budget when the provider request is built.
     messages_dict = []
+    history_dicts: List[Dict[str, Any]] = []
+    render_rag_context: Optional[Callable[[List[str]], Dict[str, Any]]] = None
     
     if ticker_mode and ticker_data:
         # Ticker mode: facts are rendered deterministically; LLM writes narrative.
@@ -1413,47 +2396,16 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
         ton_only_narrative = ton_only_from_source
         ticker_name_for_narrative = str(ticker_data.get("name") or ticker_symbol or "")
         ticker_description_for_narrative = str(ticker_data.get("description") or "")
-        ton_scope_rule_en = (
-            "- Treat this asset strictly as part of the TON ecosystem.\n"
-            "- DO NOT claim or imply that it belongs to any non-TON blockchain."
-            if ton_only_from_source
-            else "- Keep blockchain context consistent with REFERENCE_FACTS."
-        )
-        language_name = {
-            "en": "English",
-            "ru": "Russian",
-        }.get(user_lang, user_lang)
-        ticker_prompt_en = (
-            f"Reply ONLY in {language_name}.\n"
-            "Write a concise 2-4 sentence narrative.\n"
-            "\n"
-            "NARRATIVE RULES:\n"
-            "- These rules apply only to the Narrative section; do not rewrite or alter the facts/stats block.\n"
-            "- Use REFERENCE_FACTS as the primary anchor.\n"
-            "- You may use general model knowledge for qualitative context, but do not fabricate specific factual claims.\n"
-            "- Start from token identity: interpret the token name/symbol and description cues.\n"
-            "- Mention token name or symbol naturally in the narrative.\n"
-            "- If description exists in REFERENCE_FACTS, incorporate it explicitly in the first 1-2 sentences.\n"
-            "- Do NOT restate supply/holders/last activity or other numeric stats already shown in the stats block.\n"
-            "- Focus on the descriptive story: what the meme identity is, why this token likely appeared, and what community narrative it represents.\n"
-            "- Prefer cultural/semiotic interpretation: what the symbol means figuratively, why this meme resonates socially, and what philosophy of community participation it signals.\n"
-            "- It is acceptable to use soft hypothesis language (for example: likely, may, often) for narrative framing.\n"
-            "- Do NOT claim transaction/payment utility unless REFERENCE_FACTS description explicitly says so.\n"
-            "- Avoid investment advice, guaranteed outcomes, or hard predictions.\n"
-            f"{ton_scope_rule_en}\n"
-            "\n"
-            "Always provide a narrative using available reference facts.\n"
-            "Keep it concise and grounded; avoid fabricated specifics.\n"
-        )
-        ticker_prompt = await localize_prompt_with_model(
-            template_en=ticker_prompt_en,
-            target_lang=user_lang,
-            provider=provider,
-            ollama_url=OLLAMA_URL,
-            ollama_model=OLLAMA_MODEL,
-            openai_api_key=OPENAI_KEY,
-            openai_model=OPENAI_MODEL,
-        )
+        localize_start = time.perf_counter()
+        ticker_prompt = _localize_ticker_prompt(ton_only_from_source)
+        if observe:
+            _prompt_localization_seconds.observe(
+                time.perf_counter() - localize_start,
+                provider=provider,
+                model=model,
+                mode=chat_mode,
+                outcome="english" if ticker_prompt == _ticker_prompt_template(user_lang, ton_only_from_source) else "localized",
+            )
 
         reference_facts = (
             "<REFERENCE_FACTS>\n"
@@ -1461,26 +2413,57 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
             + "\n</REFERENCE_FACTS>"
         )
         
+        if TICKER_RESPONSE_CACHE_TTL_SECONDS > 0:
+            ticker_response_key = _ticker_response_key(
+                str(ticker_symbol),
+                user_lang,
+                provider,
+                model,
+                reference_facts,
+                ticker_facts_text or "",
+                ton_only_from_source,
+            )
+            if background:
+                # Re-generate only answers that would expire before the next warm cycles.
+                if _ticker_response_cache.fresh_for(ticker_response_key) > TICKER_RESPONSE_CACHE_TTL_SECONDS / 3:
+                    return Response(status_code=204), ticker_response_key
+                cached_response = None
+            else:
+                cached_response = _ticker_response_cache.get(ticker_response_key)
+            if cached_response is not None:
+                logger.info(f"Ticker response cache hit: {ticker_symbol} lang={user_lang} model={model}")
+                return ticker_text_response(cached_response.value), ticker_response_key
+
+        # Under overload the deterministic answer is served at once; the
+        # providers are left to requests that need a model.
+        shed_reason = _degradation.shed_reason([provider] + _fallback_providers(provider))
+        if shed_reason is not None and background:
+            return Response(status_code=503), ticker_response_key
+        if shed_reason is not None:
+            _record_degraded(shed_reason, provider)
+            return ticker_text_response(_deterministic_ticker_output()), ticker_response_key
+
         messages_dict.append({"role": "system", "content": ticker_prompt})
         messages_dict.append({"role": "system", "content": reference_facts})
     
     elif rag_context:
         # General RAG mode: inject context for broader queries
-        context_block = "\n\n---\n\n".join(rag_context)
-        sys_msg = (
-            "You are an AI assistant for TON/token analysis.\n"
-            "Use ONLY the context below. If the context is insufficient, say you don't have enough data.\n"
-            "Avoid hard price predictions; provide scenarios and risks instead.\n\n"
-            f"CONTEXT:\n{context_block}"
-        )
-        messages_dict.append({"role": "system", "content": sys_msg})
+        def render_rag_context(snippets: List[str]) -> Dict[str, Any]:
+            context_block = "\n\n---\n\n".join(snippets)
+            sys_msg = (
+                "You are an AI assistant for TON/token analysis.\n"
+                "Use ONLY the context below. If the context is insufficient, say you don't have enough data.\n"
+                "Avoid hard price predictions; provide scenarios and risks instead.\n\n"
+                f"CONTEXT:\n{context_block}"
+            )
+            return {"role": "system", "content": sys_msg}
     
     # Add user messages.
     # In ticker mode, isolate generation from upstream bot system/history prompts:
     # use only current user query + ticker system context.
     if ticker_mode:
         if user_last:
-            messages_dict.append({"role": "user", "content": user_last})
+            history_dicts.append({"role": "user", "content": user_last})
     else:
         history_messages = request.messages
         if not explicit_ticker_signal:
@@ -1501,25 +2484,32 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
                 msg_dict["images"] = msg.images
             if msg.tool_calls:
                 msg_dict["tool_calls"] = msg.tool_calls
-            messages_dict.append(msg_dict)
+            history_dicts.append(msg_dict)
     
     # ========================================================================
     # BUILD PROVIDER REQUEST
     # ========================================================================
 
-    if request.options:
-        # Convert ModelOptions to dict, excluding None values
-        options_dict = request.options.model_dump(exclude_none=True)
+    token_budget = _chain_token_budget(provider, model, options_dict)
+    if token_budget > 0:
+        messages_dict, budget_report = assemble_prompt(
+            messages_dict,
+            history_dicts,
+            token_budget,
+            context=[str(snippet) for snippet in rag_context or []] if render_rag_context else (),
+            render_context=render_rag_context,
+            context_share=PROMPT_CONTEXT_SHARE,
+        )
+        _budget_stats.record(budget_report)
+        logger.info(
+            f"[BUDGET] {budget_report.used}/{budget_report.budget} tokens model={model} "
+            f"turns={budget_report.turns_kept}/{budget_report.turns_in} truncated={budget_report.turns_truncated} "
+            f"snippets={budget_report.snippets_kept}/{budget_report.snippets_in} deduped={budget_report.snippets_deduped}"
+        )
     else:
-        # Default options for backward compatibility with existing clients
-        options_dict = {
-            "num_ctx": 2048,
-            "num_predict": 256,
-            "temperature": 0.3,
-            "top_p": 0.9,
-            "repeat_penalty": 1.1,
-            "num_thread": 2,
-        }
+        if render_rag_context:
+            messages_dict.append(render_rag_context([str(snippet) for snippet in rag_context]))
+        messages_dict.extend(history_dicts)
 
     ollama_request = {
         "model": model,
@@ -1536,6 +2526,8 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
         ollama_request["think"] = request.think
     if request.keep_alive is not None:
         ollama_request["keep_alive"] = request.keep_alive
+    elif OLLAMA_WARMUP and _ollama_keepalive.in_active_hours():
+        ollama_request["keep_alive"] = OLLAMA_KEEP_ALIVE
     if request.logprobs is not None:
         ollama_request["logprobs"] = request.logprobs
     if request.top_logprobs is not None:
@@ -1566,430 +2558,173 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
     # STREAM RESPONSE FROM LLM PROVIDER
     # ========================================================================
 
-    def _combine_ticker_output(narrative: str) -> str:
+    def _combine_ticker_output(narrative: str) -> Tuple[str, NarrativeVerdict]:
+        """The ticker answer for ``narrative`` and the validator's verdict on it."""
         if not ticker_facts_text:
-            return narrative
-        narrative_clean = _sanitize_ticker_narrative(narrative, user_lang)
-        narrative_clean = _strip_stat_repetition(narrative_clean, user_lang)
-        if _contains_plain_fallback_phrase(narrative_clean, user_lang):
-            narrative_clean = _descriptive_narrative_fallback(
-                ticker_name_for_narrative,
-                str(ticker_symbol or ""),
-                user_lang,
-                ticker_description_for_narrative,
-            )
-        narrative_clean = _ensure_ticker_identity_in_narrative(
-            narrative_clean,
+            return narrative, NarrativeVerdict(narrative)
+        verdict = _narrative_validator.vet(
+            narrative,
+            user_lang,
             ticker_name_for_narrative,
             str(ticker_symbol or ""),
-            user_lang,
+            ton_only=ton_only_narrative,
         )
-        if _is_generic_ton_boilerplate(narrative_clean, user_lang):
-            narrative_clean = _descriptive_narrative_fallback(
-                ticker_name_for_narrative,
-                str(ticker_symbol or ""),
-                user_lang,
-                ticker_description_for_narrative,
-            )
-        if _is_utility_boilerplate(narrative_clean, user_lang):
-            narrative_clean = _descriptive_narrative_fallback(
-                ticker_name_for_narrative,
-                str(ticker_symbol or ""),
-                user_lang,
-                ticker_description_for_narrative,
-            )
-        if user_lang == "ru" and _has_excessive_latin_in_ru(narrative_clean):
-            narrative_clean = _descriptive_narrative_fallback(
-                ticker_name_for_narrative,
-                str(ticker_symbol or ""),
-                user_lang,
-                ticker_description_for_narrative,
-            )
-        if ton_only_narrative:
-            non_ton_chain = re.search(
-                r"\b(bitcoin|ethereum|dogecoin|solana|tron|bsc|binance\s+smart\s+chain|polygon|avalanche|доджкоин|доге|доги|эфириум|биткоин|солана|трон)\b",
-                narrative_clean,
-                flags=re.IGNORECASE,
-            )
-            if non_ton_chain:
-                narrative_clean = _descriptive_narrative_fallback(
-                    ticker_name_for_narrative,
-                    str(ticker_symbol or ""),
-                    user_lang,
-                    ticker_description_for_narrative,
-                )
-        if not narrative_clean.strip():
-            narrative_clean = _descriptive_narrative_fallback(
-                ticker_name_for_narrative,
-                str(ticker_symbol or ""),
-                user_lang,
-                ticker_description_for_narrative,
-            )
-        # Final safety net: never ship plain fallback phrase in ticker narrative.
-        if _contains_plain_fallback_phrase(narrative_clean, user_lang):
-            narrative_clean = _descriptive_narrative_fallback(
-                ticker_name_for_narrative,
-                str(ticker_symbol or ""),
-                user_lang,
-                ticker_description_for_narrative,
-            )
-        response_text = f"{ticker_facts_text}\n\n{narrative_clean}"
-        return _normalize_paragraph_spacing(response_text)
-
-    async def generate_ollama_response():
+        if not verdict.ok:
+            logger.info(f"[TICKER] narrative rejected by {verdict.rejected_by}; using descriptive fallback")
+            return _deterministic_ticker_output(), verdict
+        response_text = f"{ticker_facts_text}\n\n{verdict.text}"
+        return _normalize_paragraph_spacing(response_text), verdict
+
+    def _finish_ticker_output(narrative: str, served_by: str) -> str:
+        """Vet a completed LLM narrative; cache it when the primary provider wrote an accepted one."""
+        response_text, verdict = _combine_ticker_output(narrative)
+        # A rejected narrative's fallback is not cached, so the next request tries the model again.
+        if ticker_response_key is not None and served_by == provider and verdict.ok and narrative.strip():
+            _ticker_response_cache.set(ticker_response_key, response_text, TICKER_RESPONSE_CACHE_TTL_SECONDS)
+        return response_text
+
+    def _provider_model(name: str) -> str:
+        # Fallback/hedge providers run their own default model, not the primary's.
+        return model if name == provider else _default_model(name)
+
+    def _provider_content(name: str) -> Callable[[], AsyncIterator[str]]:
+        provider_model = _provider_model(name)
+        if name == "openai":
+            body = {**openai_request, "model": provider_model}
+            content = lambda: _openai_content(body, request.stream, chat_mode, observe)
+        elif name == "cocoon":
+            body = {**openai_request, "model": provider_model}
+            content = lambda: _cocoon_content(body, request.stream, chat_mode, observe)
+        else:
+            body = {**ollama_request, "model": provider_model}
+            content = lambda: _ollama_content(body, chat_mode, observe)
+        guarded = lambda: _circuit_guarded(name, lambda: _admitted(name, content, priority))
+        if not CHAT_DEDUP_SWITCH or priority == BACKGROUND:
+            return guarded
+        # Identical concurrent requests share one upstream generation.
+        return lambda: _shared_streams.subscribe(_shared_stream_key(name, chat_mode, body), guarded)
+
+    async def render_provider_stream(stream: RoutedStream):
+        """Render upstream content as NDJSON frames (ticker prefix, tokens, final response)."""
+        writer = NDJSONFrameWriter(STREAM_FLUSH_INTERVAL_MS / 1000.0, STREAM_FLUSH_CHARS)
         inference_start = time.perf_counter()
         first_token_logged = False
-        prefix_sent = False
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        outcome = "error"
+        pieces = stream.__aiter__()
+        try:
             if ticker_facts_text:
-                prefix = _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n")
-                yield json.dumps({"token": prefix, "done": False}) + "\n"
-                prefix_sent = True
-            async with client.stream(
-                "POST",
-                f"{OLLAMA_URL}/api/chat",
-                json=ollama_request
-            ) as response:
-                stream_open_ms = int((time.perf_counter() - inference_start) * 1000)
-                logger.info(f"Ollama stream opened: {stream_open_ms}ms, model={model}")
-
-                if response.status_code != 200:
-                    error_detail = "Unknown error"
-                    try:
-                        error_text = await response.aread()
-                        error_data = json.loads(error_text)
-                        error_detail = error_data.get("error", str(error_text))
-                    except Exception:
-                        error_detail = str(response.status_code)
-
-                    if ticker_facts_text:
-                        logger.error(
-                            "Ticker fallback due to Ollama non-200. status=%s detail=%s provider=%s model=%s rag_url=%s inner_key=%s",
-                            response.status_code,
-                            error_detail,
-                            provider,
-                            model,
-                            RAG_URL,
-                            _mask_secret(INNER_CALLS_KEY),
-                        )
-                        fallback = _combine_ticker_output(
-                            "Анализ недоступен в данный момент."
-                            if user_lang == "ru"
-                            else "Analysis is unavailable right now."
-                        )
-                        if not prefix_sent:
-                            yield json.dumps({"token": _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n"), "done": False}) + "\n"
-                        yield json.dumps({"response": fallback, "done": True}) + "\n"
-                    else:
-                        yield json.dumps({"error": f"Ollama error: {error_detail}"}) + "\n"
-                    return
-
-                full_response = ""
-                async for line in response.aiter_lines():
-                    if not line:
-                        continue
-                    try:
-                        data = json.loads(line)
-
-                        # Ollama /api/chat streaming format
-                        if "message" in data and isinstance(data["message"], dict):
-                            content = data["message"].get("content", "")
-                            if content:
-                                if not first_token_logged:
-                                    ttft_ms = int((time.perf_counter() - inference_start) * 1000)
-                                    logger.info(f"First token: {ttft_ms}ms, model={model}")
-                                    first_token_logged = True
-
-                                full_response += content
-                                # In ticker mode, buffer narrative and emit only vetted final output.
-                                if not ticker_facts_text:
-                                    # Keep token chunks non-terminal so clients wait for final `response` payload.
-                                    yield json.dumps({"token": content, "done": False}) + "\n"
-
-                        if data.get("done", False):
-                            total_ms = int((time.perf_counter() - inference_start) * 1000)
-                            logger.info(f"Total time: {total_ms}ms, model={model}")
-                            yield json.dumps({"response": _combine_ticker_output(full_response), "done": True}) + "\n"
-                            break
-
-                    except json.JSONDecodeError:
-                        logger.warning(f"Failed to parse JSON line: {line[:100]}")
+                yield writer.token_frame(_normalize_paragraph_spacing(f"{ticker_facts_text}\n\n"))
+            # Ticker answers have a deterministic fallback, so a late first token is not waited out.
+            # Nobody waits on a background run, so it gets no deadline.
+            first_deadline_s = _degradation.first_token_deadline_s if ticker_facts_text and not background else None
+            try:
+                # None: the upstream is silent past the flush interval; send what is buffered.
+                async for piece in flush_ticks(first_within(pieces, first_deadline_s), writer):
+                    if piece is None:
+                        frame = writer.flush()
+                        if frame:
+                            yield frame
                         continue
-
-    async def generate_openai_response():
-        if not OPENAI_KEY:
-            yield json.dumps({"error": "OPENAI_KEY is required when using OpenAI"}) + "\n"
-            return
-
-        inference_start = time.perf_counter()
-        first_token_logged = False
-        full_response = ""
-        prefix_sent = False
-        headers = {
-            "Authorization": f"Bearer {OPENAI_KEY}",
-            "Content-Type": "application/json",
-        }
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            if ticker_facts_text:
-                prefix = _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n")
-                yield json.dumps({"token": prefix, "done": False}) + "\n"
-                prefix_sent = True
-            if request.stream:
-                async with client.stream(
-                    "POST",
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=openai_request,
-                ) as response:
-                    stream_open_ms = int((time.perf_counter() - inference_start) * 1000)
-                    logger.info(f"OpenAI stream opened: {stream_open_ms}ms, model={model}")
-
-                    if response.status_code != 200:
-                        error_detail = str(response.status_code)
-                        try:
-                            payload = await response.aread()
-                            error_data = json.loads(payload)
-                            if isinstance(error_data, dict):
-                                error_obj = error_data.get("error", {})
-                                error_detail = error_obj.get("message", error_detail)
-                        except Exception:
-                            pass
-                        if ticker_facts_text:
-                            logger.error(
-                                "Ticker fallback due to OpenAI stream non-200. status=%s detail=%s provider=%s model=%s rag_url=%s inner_key=%s",
-                                response.status_code,
-                                error_detail,
-                                provider,
-                                model,
-                                RAG_URL,
-                                _mask_secret(INNER_CALLS_KEY),
+                    if not first_token_logged:
+                        ttft_s = time.perf_counter() - inference_start
+                        logger.info(
+                            f"First token: {int(ttft_s * 1000)}ms, provider={stream.provider}, hedged={stream.hedged}"
+                        )
+                        if observe:
+                            _ttft_seconds.observe(
+                                ttft_s,
+                                provider=stream.provider,
+                                model=_provider_model(stream.provider),
+                                mode=chat_mode,
+                                outcome="hedged" if stream.hedged else "ok",
                             )
-                            base = "Анализ недоступен в данный момент." if user_lang == "ru" else "Analysis is unavailable right now."
-                            if error_detail and str(response.status_code) != error_detail:
-                                base += " " + ("Причина: " if user_lang == "ru" else "Reason: ") + str(error_detail)
-                            fallback = _combine_ticker_output(base)
-                            if not prefix_sent:
-                                yield json.dumps({"token": _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n"), "done": False}) + "\n"
-                            yield json.dumps({"response": fallback, "done": True}) + "\n"
-                        else:
-                            yield json.dumps({"error": f"OpenAI error: {error_detail}"}) + "\n"
-                        return
-
-                    async for line in response.aiter_lines():
-                        if not line or not line.startswith("data: "):
-                            continue
-                        data_str = line[6:].strip()
-                        if data_str == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(data_str)
-                        except json.JSONDecodeError:
-                            continue
-
-                        choices = data.get("choices") or []
-                        if not choices:
-                            continue
-                        delta = choices[0].get("delta") or {}
-                        content = delta.get("content")
-                        if content:
-                            if not first_token_logged:
-                                ttft_ms = int((time.perf_counter() - inference_start) * 1000)
-                                logger.info(f"First token: {ttft_ms}ms, model={model}")
-                                first_token_logged = True
-                            full_response += content
-                            # In ticker mode, buffer narrative and emit only vetted final output.
-                            if not ticker_facts_text:
-                                yield json.dumps({"token": content, "done": False}) + "\n"
-
-                    total_ms = int((time.perf_counter() - inference_start) * 1000)
-                    logger.info(f"Total time: {total_ms}ms, model={model}")
-                    yield json.dumps({"response": _combine_ticker_output(full_response), "done": True}) + "\n"
-                    return
-
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=openai_request,
-            )
-            if response.status_code != 200:
-                error_detail = str(response.status_code)
-                try:
-                    error_data = response.json()
-                    if isinstance(error_data, dict):
-                        error_obj = error_data.get("error", {})
-                        error_detail = error_obj.get("message", error_detail)
-                except Exception:
-                    pass
-                if ticker_facts_text:
-                    logger.error(
-                        "Ticker fallback due to OpenAI non-stream non-200. status=%s detail=%s provider=%s model=%s rag_url=%s inner_key=%s",
-                        response.status_code,
-                        error_detail,
-                        provider,
-                        model,
-                        RAG_URL,
-                        _mask_secret(INNER_CALLS_KEY),
-                    )
-                    base = "Анализ недоступен в данный момент." if user_lang == "ru" else "Analysis is unavailable right now."
-                    if error_detail and str(response.status_code) != error_detail:
-                        base += " " + ("Причина: " if user_lang == "ru" else "Reason: ") + str(error_detail)
-                    fallback = _combine_ticker_output(base)
-                    if not prefix_sent:
-                        yield json.dumps({"token": _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n"), "done": False}) + "\n"
-                    yield json.dumps({"response": fallback, "done": True}) + "\n"
-                else:
-                    yield json.dumps({"error": f"OpenAI error: {error_detail}"}) + "\n"
+                        first_token_logged = True
+                    if ticker_facts_text:
+                        # In ticker mode, buffer narrative and emit only vetted final output.
+                        writer.append(piece)
+                        continue
+                    # Keep token chunks non-terminal so clients wait for final `response` payload.
+                    frame = writer.push(piece)
+                    if frame:
+                        yield frame
+            except FirstTokenLate:
+                _record_degraded("ttft_deadline", stream.provider)
+                outcome = "degraded"
+                yield writer.response_frame(_deterministic_ticker_output())
                 return
-
-            data = response.json()
-            choices = data.get("choices") or []
-            if choices:
-                message = choices[0].get("message") or {}
-                full_response = message.get("content", "") or ""
-            if full_response:
-                yield json.dumps({"token": full_response, "done": False}) + "\n"
-            yield json.dumps({"response": _combine_ticker_output(full_response), "done": True}) + "\n"
-
-    async def generate_cocoon_response():
-        inference_start = time.perf_counter()
-        first_token_logged = False
-        full_response = ""
-        prefix_sent = False
-        headers = {"Content-Type": "application/json"}
-        url = f"{COCOON_CLIENT_URL}/v1/chat/completions"
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            if ticker_facts_text:
-                prefix = _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n")
-                yield json.dumps({"token": prefix, "done": False}) + "\n"
-                prefix_sent = True
-            if request.stream:
-                async with client.stream("POST", url, headers=headers, json=openai_request) as response:
-                    stream_open_ms = int((time.perf_counter() - inference_start) * 1000)
-                    logger.info(f"Cocoon stream opened: {stream_open_ms}ms, model={model}")
-
-                    if response.status_code != 200:
-                        error_detail = str(response.status_code)
-                        try:
-                            body = await response.aread()
-                            error_data = json.loads(body)
-                            if isinstance(error_data, dict):
-                                error_obj = error_data.get("error", {})
-                                error_detail = error_obj.get("message", error_detail)
-                        except Exception:
-                            pass
-                        if ticker_facts_text:
-                            fallback = _combine_ticker_output(
-                                "Анализ недоступен в данный момент." if user_lang == "ru" else "Analysis is unavailable right now."
-                            )
-                            if not prefix_sent:
-                                yield json.dumps({"token": _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n"), "done": False}) + "\n"
-                            yield json.dumps({"response": fallback, "done": True}) + "\n"
-                        else:
-                            yield json.dumps({"error": f"Cocoon error: {error_detail}"}) + "\n"
-                        return
-
-                    async for line in response.aiter_lines():
-                        if not line or not line.startswith("data: "):
-                            continue
-                        data_str = line[6:].strip()
-                        if data_str == "[DONE]":
-                            break
-                        try:
-                            data = json.loads(data_str)
-                        except json.JSONDecodeError:
-                            continue
-                        choices = data.get("choices") or []
-                        if not choices:
-                            continue
-                        delta = choices[0].get("delta") or {}
-                        content = delta.get("content")
-                        if content:
-                            if not first_token_logged:
-                                ttft_ms = int((time.perf_counter() - inference_start) * 1000)
-                                logger.info(f"First token: {ttft_ms}ms, model={model}")
-                                first_token_logged = True
-                            full_response += content
-                            if not ticker_facts_text:
-                                yield json.dumps({"token": content, "done": False}) + "\n"
-
-                    total_ms = int((time.perf_counter() - inference_start) * 1000)
-                    logger.info(f"Total time: {total_ms}ms, model={model}")
-                    yield json.dumps({"response": _combine_ticker_output(full_response), "done": True}) + "\n"
+            except UpstreamError as e:
+                outcome = "busy" if isinstance(e, ProviderBusy) else "error"
+                if not ticker_facts_text:
+                    if isinstance(e, ProviderBusy):
+                        yield writer.busy_frame(e.message)
+                    else:
+                        yield writer.error_frame(e.message)
                     return
-
-            response = await client.post(url, headers=headers, json=openai_request)
-            if response.status_code != 200:
-                error_detail = str(response.status_code)
-                try:
-                    error_data = response.json()
-                    if isinstance(error_data, dict):
-                        error_obj = error_data.get("error", {})
-                        error_detail = error_obj.get("message", error_detail)
-                except Exception:
-                    pass
-                if ticker_facts_text:
-                    fallback = _combine_ticker_output(
-                        "Анализ недоступен в данный момент." if user_lang == "ru" else "Analysis is unavailable right now."
-                    )
-                    if not prefix_sent:
-                        yield json.dumps({"token": _normalize_paragraph_spacing(f"{ticker_facts_text}\n\n"), "done": False}) + "\n"
-                    yield json.dumps({"response": fallback, "done": True}) + "\n"
-                else:
-                    yield json.dumps({"error": f"Cocoon error: {error_detail}"}) + "\n"
+                logger.error(
+                    "Ticker fallback due to %s non-200. status=%s detail=%s provider=%s model=%s rag_url=%s inner_key=%s",
+                    e.provider,
+                    e.status_code,
+                    e.detail,
+                    provider,
+                    model,
+                    RAG_URL,
+                    _mask_secret(INNER_CALLS_KEY),
+                )
+                base = "Анализ недоступен в данный момент." if user_lang == "ru" else "Analysis is unavailable right now."
+                if e.provider == "openai" and e.detail and str(e.status_code) != e.detail:
+                    base += " " + ("Причина: " if user_lang == "ru" else "Reason: ") + str(e.detail)
+                outcome = "fallback"
+                yield writer.response_frame(_combine_ticker_output(base)[0])
                 return
 
-            data = response.json()
-            choices = data.get("choices") or []
-            if choices:
-                message = choices[0].get("message") or {}
-                full_response = message.get("content", "") or ""
-            if full_response:
-                yield json.dumps({"token": full_response, "done": False}) + "\n"
-            yield json.dumps({"response": _combine_ticker_output(full_response), "done": True}) + "\n"
-
-    def _is_error_chunk(chunk: str) -> bool:
-        try:
-            if not chunk or not chunk.strip():
-                return False
-            obj = json.loads(chunk.strip())
-            return isinstance(obj, dict) and "error" in obj
-        except Exception:
-            return False
+            frame = writer.flush()
+            if frame:
+                yield frame
+            final = writer.response_frame(_finish_ticker_output(writer.text, stream.provider))
+            total_ms = int((time.perf_counter() - inference_start) * 1000)
+            logger.info(
+                f"Total time: {total_ms}ms, provider={stream.provider}, frames={writer.frames}, bytes={writer.bytes}"
+            )
+            outcome = "ok"
+            _cancellations.record_completed(stream.provider, _provider_model(stream.provider), writer.tokens)
+            yield final
+        except (GeneratorExit, asyncio.CancelledError):
+            if outcome != "ok" and observe:
+                _record_cancelled(
+                    "generation", chat_mode, stream.provider, _provider_model(stream.provider), writer.tokens
+                )
+            outcome = "cancelled"
+            raise
+        finally:
+            # Stop the upstream generation now, not when this generator is collected.
+            await asyncio.shield(pieces.aclose())
+            if observe:
+                _record_stream(writer, stream.provider, chat_mode)
+                _generation_seconds.observe(
+                    time.perf_counter() - inference_start,
+                    provider=stream.provider,
+                    model=_provider_model(stream.provider),
+                    mode=chat_mode,
+                    outcome=outcome,
+                )
 
     async def generate_response():
+        # Primary first; fallbacks are tried on failure or hedged when the
+        # primary is slower than its learned TTFT deadline.
+        # Providers with an open circuit are skipped; if all are open the
+        # primary still gets the attempt and fails fast with a clear error.
+        chain = [provider] + _provider_router.rank(_fallback_providers(provider))
+        chain = [name for name in chain if _circuits.get(name).available()] or [provider]
+        stream = _provider_router.stream([(name, _provider_content(name)) for name in chain], sampled=observe)
         try:
-            if provider == "openai" and _ollama_fallback_enabled():
-                # Try OpenAI first; on error chunk, fall back to Ollama
-                gen = generate_openai_response()
-                first = await gen.__anext__()
-                if _is_error_chunk(first):
-                    logger.info("OpenAI failed, falling back to Ollama")
-                    async for chunk in generate_ollama_response():
-                        yield chunk
-                    return
-                yield first
-                async for chunk in gen:
-                    yield chunk
-                return
-            if provider == "openai":
-                async for chunk in generate_openai_response():
-                    yield chunk
-                return
-            if provider == "cocoon":
-                async for chunk in generate_cocoon_response():
-                    yield chunk
-                return
-            async for chunk in generate_ollama_response():
+            async for chunk in render_provider_stream(stream):
                 yield chunk
         except httpx.TimeoutException:
             yield json.dumps({"error": "Request timeout - AI model took too long to respond"}) + "\n"
         except httpx.RequestError as e:
-            if provider == "openai":
+            if stream.provider == "openai":
                 yield json.dumps({"error": f"Cannot connect to OpenAI API. Error: {str(e)}"}) + "\n"
-            elif provider == "cocoon":
+            elif stream.provider == "cocoon":
                 yield json.dumps({"error": f"Cannot connect to Cocoon at {COCOON_CLIENT_URL}. Error: {str(e)}"}) + "\n"
             else:
                 yield json.dumps({"error": f"Cannot connect to Ollama at {OLLAMA_URL}. Error: {str(e)}"}) + "\n"
@@ -1997,7 +2732,7 @@ async def chat(request: ChatRequest, api_key: str = Depends(verify_api_key)):
             logger.exception("Unexpected error in generate_response")
             yield json.dumps({"error": f"Internal server error: {str(e)}"}) + "\n"
 
-    return StreamingResponse(generate_response(), media_type="application/x-ndjson")
+    return ClosingStreamingResponse(generate_response(), media_type="application/x-ndjson"), ticker_response_key
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from ticker_scan import TickerScan, scan_ticker_text
+from ttl_cache import TTLCache
+
+_RU_OUTPUT_PHRASES = ("strictly in russian", "только на русском", "строго на русском")
+_EN_OUTPUT_PHRASES = ("strictly in english", "only in english")
+
+
+@dataclass(frozen=True)
+class MessageAnalysis:
+    """Everything the chat handler derives from one message's text."""
+
+    lang: str  # "ru" when >30% of letters are Cyrillic, else "en"
+    requested_lang: Optional[str]  # explicit output-language instruction, if any
+    scan: TickerScan
+
+    @property
+    def explicit_ticker_signal(self) -> bool:
+        return self.scan.explicit_signal
+
+    @property
+    def strong_ticker_context(self) -> bool:
+        return self.scan.strong_context
+
+
+def analyze_text(text: str) -> MessageAnalysis:
+    """Language, output-language instruction and ticker scan of ``text`` (uncached)."""
+    if not text:
+        return MessageAnalysis("en", None, scan_ticker_text(""))
+    cyrillic = 0
+    letters = 0
+    for ch in text:
+        if "\u0400" <= ch <= "\u04FF":
+            cyrillic += 1
+        if ch.isalpha():
+            letters += 1
+    lang = "ru" if letters and cyrillic / letters > 0.3 else "en"
+
+    lowered = text.lower()
+    requested: Optional[str] = None
+    if any(phrase in lowered for phrase in _RU_OUTPUT_PHRASES):
+        requested = "ru"
+    elif any(phrase in lowered for phrase in _EN_OUTPUT_PHRASES):
+        requested = "en"
+    return MessageAnalysis(lang, requested, scan_ticker_text(text))
+
+
+class MessageAnalyzer:
+    """:func:`analyze_text` memoized by content hash.
+
+    Clients resend the whole conversation every turn, so history messages
+    are analyzed once and then served from a bounded LRU cache.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl_s: float = 3600.0) -> None:
+        self._cache: TTLCache[MessageAnalysis] = TTLCache(max_entries)
+        self.ttl_s = ttl_s
+
+    def analyze(self, text: str) -> MessageAnalysis:
+        text = text or ""
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit.value
+        analysis = analyze_text(text)
+        self._cache.set(key, analysis, self.ttl_s)
+        return analysis
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Optional, Sequence, Union
+
+CJK_RE = re.compile(r"[\u3400-\u4DBF\u4E00-\u9FFF\uF900-\uFAFF]")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+CYRILLIC_RUN_RE = re.compile(r"[А-Яа-яЁё]+")
+LATIN_RUN_RE = re.compile(r"[A-Za-z]+")
+# Alternatives grouped by prefix; the lookahead lets the scanner skip positions
+# that cannot start a chain name before trying the alternation.
+NON_TON_CHAIN_RE = re.compile(
+    r"\b(?=[abdepstбдстэ])"
+    r"(?:b(?:itcoin|sc|inance\s+smart\s+chain)|ethereum|dogecoin|solana|tron|polygon|avalanche"
+    r"|до(?:джкоин|ге|ги)|эфириум|биткоин|солана|трон)\b",
+    re.IGNORECASE,
+)
+
+PLAIN_FALLBACK_PHRASES = {
+    "ru": "недостаточно данных для анализа",
+    "en": "insufficient data for analysis",
+}
+STAT_TERMS = {
+    "ru": ("выпуск", "держател", "холдер", "последн", "активност", "капитализац"),
+    "en": ("supply", "holders", "holder", "last activity", "market cap", "circulating"),
+}
+GENERIC_TON_MARKERS = {
+    "ru": ("экосистем", "блокчейн", "децентрализ", "цифров", "nft", "defi", "технолог"),
+    "en": ("ton ecosystem", "blockchain technology", "digital asset", "decentralized finance", "defi", "nft"),
+}
+UTILITY_MARKERS = {
+    "ru": ("использует", "используется", "для транзакц", "dapp", "децентрализ", "цифровой актив"),
+    "en": (
+        "used for transactions", "used in transactions", "decentralized applications",
+        "digital asset", "utility token", "dapp", "defi projects",
+    ),
+}
+# Latin letters allowed per Cyrillic letter in a RU narrative (token names, "TON").
+MAX_LATIN_RATIO_RU = 0.35
+
+
+def _lang(user_lang: str) -> str:
+    return "ru" if user_lang == "ru" else "en"
+
+
+class Narrative:
+    """Narrative text moving through the pipeline, with its lowercase form computed once."""
+
+    __slots__ = ("text", "user_lang", "token_name", "token_symbol", "_lower")
+
+    def __init__(self, text: str, user_lang: str, token_name: str = "", token_symbol: str = "") -> None:
+        self.text = text
+        self.user_lang = _lang(user_lang)
+        self.token_name = token_name
+        self.token_symbol = token_symbol
+        self._lower: Optional[str] = None
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    def replace(self, text: str, lower: Optional[str] = None) -> None:
+        self.text = text
+        self._lower = lower
+
+
+# ----------------------------------------------------------------------------
+# Transforms (rewrite the narrative) and checks (True = reject it)
+# ----------------------------------------------------------------------------
+
+def is_empty(n: Narrative) -> bool:
+    return not n.text or n.text.isspace()
+
+
+def collapse_whitespace(n: Narrative) -> None:
+    n.replace(" ".join(n.text.split()))
+
+
+def has_cjk(n: Narrative) -> bool:
+    return CJK_RE.search(n.text) is not None
+
+
+def strip_stat_repetition(n: Narrative) -> None:
+    """Drop sentences that just repeat the stats shown above the narrative."""
+    terms = STAT_TERMS[n.user_lang]
+    if not any(term in n.lower for term in terms):
+        return
+    kept = [part.strip() for part in SENTENCE_SPLIT_RE.split(n.text) if not any(t in part.lower() for t in terms)]
+    cleaned = " ".join(p for p in kept if p).strip()
+    # Stripping everything would leave nothing to show: keep the original.
+    if cleaned:
+        n.replace(cleaned)
+
+
+def ensure_identity(n: Narrative) -> None:
+    """Prefix the narrative with the token name/symbol when it mentions neither."""
+    name = (n.token_name or "").strip().lower()
+    symbol = (n.token_symbol or "").strip().lower()
+    if (name and name in n.lower) or (symbol and symbol in n.lower):
+        return
+    if n.user_lang == "ru":
+        prefix = f"Для {n.token_name or n.token_symbol} ({n.token_symbol}) этот нарратив связан с мемной идентичностью сообщества в TON."
+    else:
+        prefix = f"For {n.token_name or n.token_symbol} ({n.token_symbol}), this narrative centers on meme identity and community culture in TON."
+    n.replace(f"{prefix} {n.text}", f"{prefix.lower()} {n.lower}")
+
+
+def has_plain_fallback_phrase(n: Narrative) -> bool:
+    return PLAIN_FALLBACK_PHRASES[n.user_lang] in n.lower
+
+
+def is_utility_boilerplate(n: Narrative) -> bool:
+    lower = n.lower
+    return any(marker in lower for marker in UTILITY_MARKERS[n.user_lang])
+
+
+def is_generic_ton_boilerplate(n: Narrative) -> bool:
+    lower = n.lower
+    hits = 0
+    for marker in GENERIC_TON_MARKERS[n.user_lang]:
+        if marker in lower:
+            hits += 1
+            if hits >= 2:
+                return True
+    return False
+
+
+def has_excessive_latin(n: Narrative) -> bool:
+    """RU narratives polluted by long English fragments."""
+    latin = sum(map(len, LATIN_RUN_RE.findall(n.text)))
+    if latin == 0:
+        return False
+    cyrillic = sum(map(len, CYRILLIC_RUN_RE.findall(n.text)))
+    return cyrillic == 0 or latin / cyrillic > MAX_LATIN_RATIO_RU
+
+
+def mentions_non_ton_chain(n: Narrative) -> bool:
+    return NON_TON_CHAIN_RE.search(n.text) is not None
+
+
+# ----------------------------------------------------------------------------
+# Pipeline
+# ----------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Stage:
+    """One pipeline step: a ``transform`` rewrites the narrative, a ``check`` may reject it.
+
+    ``langs`` limits the stage to those output languages; ``ton_only`` stages
+    run only when the narrative must stay within the TON ecosystem.
+    """
+
+    name: str
+    kind: str  # "transform" | "check"
+    fn: Callable[[Narrative], Union[bool, None]]
+    langs: Optional[FrozenSet[str]] = None
+    ton_only: bool = False
+
+    def applies(self, user_lang: str, ton_only: bool) -> bool:
+        return (self.langs is None or user_lang in self.langs) and (ton_only or not self.ton_only)
+
+
+# Transforms run where the old checks saw their output. Checks short-circuit,
+# so within a phase the cheap substring tests and the likeliest rejections
+# (utility phrasing is the most common LLM filler) come before regex scans.
+TICKER_NARRATIVE_STAGES: Sequence[Stage] = (
+    Stage("empty", "check", is_empty),
+    Stage("cjk", "check", has_cjk),
+    Stage("collapse_whitespace", "transform", collapse_whitespace),
+    Stage("strip_stats", "transform", strip_stat_repetition),
+    Stage("identity", "transform", ensure_identity),
+    Stage("plain_fallback", "check", has_plain_fallback_phrase),
+    Stage("utility_boilerplate", "check", is_utility_boilerplate),
+    Stage("generic_ton_boilerplate", "check", is_generic_ton_boilerplate),
+    Stage("latin_in_ru", "check", has_excessive_latin, langs=frozenset({"ru"})),
+    Stage("non_ton_chain", "check", mentions_non_ton_chain, ton_only=True),
+)
+
+
+@dataclass(frozen=True)
+class NarrativeVerdict:
+    text: str  # vetted narrative; empty when rejected
+    rejected_by: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.rejected_by is None
+
+
+class NarrativeValidator:
+    """Run a narrative through ``stages``, stopping at the first failed check.
+
+    Keeps per-stage call/rejection counts and cumulative time so ``/health``
+    can show where validation time goes.
+    """
+
+    def __init__(self, stages: Sequence[Stage] = TICKER_NARRATIVE_STAGES) -> None:
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError("stage names must be unique")
+        self.stages = tuple(stages)
+        self.runs = 0
+        self.rejected = 0
+        self._calls = dict.fromkeys(names, 0)
+        self._rejections = dict.fromkeys(names, 0)
+        self._seconds = dict.fromkeys(names, 0.0)
+
+    def vet(
+        self,
+        narrative: str,
+        user_lang: str,
+        token_name: str = "",
+        token_symbol: str = "",
+        ton_only: bool = False,
+    ) -> NarrativeVerdict:
+        n = Narrative(narrative or "", user_lang, token_name, token_symbol)
+        self.runs += 1
+        clock = time.perf_counter
+        for stage in self.stages:
+            if not stage.applies(n.user_lang, ton_only):
+                continue
+            started = clock()
+            result = stage.fn(n)
+            self._seconds[stage.name] += clock() - started
+            self._calls[stage.name] += 1
+            if stage.kind == "check" and result:
+                self._rejections[stage.name] += 1
+                self.rejected += 1
+                return NarrativeVerdict("", stage.name)
+        return NarrativeVerdict(n.text)
+
+    def stats(self) -> Dict[str, Any]:
+        stages: Dict[str, Dict[str, Any]] = {}
+        for name in self._calls:
+            calls = self._calls[name]
+            stages[name] = {
+                "calls": calls,
+                "rejected": self._rejections[name],
+                "avg_us": round(self._seconds[name] / calls * 1e6, 2) if calls else None,
+            }
+        return {"runs": self.runs, "rejected": self.rejected, "stages": stages}
+
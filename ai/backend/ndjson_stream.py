@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from json.encoder import encode_basestring_ascii
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+# Byte templates matching json.dumps({...}) output (default separators,
+# ensure_ascii), so frames are byte-identical to the previous per-token lines.
+_TOKEN_HEAD = b'{"token": '
+_TOKEN_TAIL = b', "done": false}\n'
+_RESPONSE_HEAD = b'{"response": '
+_RESPONSE_TAIL = b', "done": true}\n'
+_ERROR_HEAD = b'{"error": '
+_ERROR_TAIL = b"}\n"
+_BUSY_TAIL = b', "busy": true}\n'
+
+
+def _encode(head: bytes, text: str, tail: bytes) -> bytes:
+    return head + encode_basestring_ascii(text).encode("ascii") + tail
+
+
+class NDJSONFrameWriter:
+    """Coalesce streamed tokens into NDJSON ``token`` frames.
+
+    ``push`` buffers content and returns an encoded frame once ``flush_chars``
+    characters are pending or ``flush_interval_s`` has passed since the last
+    frame (the first token is always sent immediately). ``push`` only sees the
+    clock when a token arrives, so callers drive the interval flush for a
+    silent upstream with :func:`flush_ticks`. The full text is kept in a list
+    buffer and joined once via :attr:`text`.
+    """
+
+    def __init__(
+        self,
+        flush_interval_s: float = 0.03,
+        flush_chars: int = 64,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.flush_interval_s = flush_interval_s
+        self.flush_chars = flush_chars
+        self._clock = clock
+        self._parts: List[str] = []
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        self._last_flush: Optional[float] = None
+        self.tokens = 0
+        self.frames = 0
+        self.bytes = 0
+
+    @property
+    def text(self) -> str:
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def _count(self, frame: bytes) -> bytes:
+        self.frames += 1
+        self.bytes += len(frame)
+        return frame
+
+    def append(self, content: str) -> None:
+        """Record content without streaming it (e.g. buffered ticker narrative)."""
+        self._parts.append(content)
+        self.tokens += 1
+
+    def push(self, content: str) -> Optional[bytes]:
+        """Record and stream ``content``; returns a frame when one is due."""
+        self.append(content)
+        self._pending.append(content)
+        self._pending_chars += len(content)
+        now = self._clock()
+        if (
+            self._last_flush is None
+            or self._pending_chars >= self.flush_chars
+            or now - self._last_flush >= self.flush_interval_s
+        ):
+            return self.flush(now)
+        return None
+
+    def flush_due_in(self) -> Optional[float]:
+        """Seconds until pending content is due for a frame (None when nothing is pending)."""
+        if not self._pending:
+            return None
+        if self._last_flush is None:
+            return 0.0
+        return max(0.0, self._last_flush + self.flush_interval_s - self._clock())
+
+    def flush(self, now: Optional[float] = None) -> Optional[bytes]:
+        """Return a frame for any pending content (None when nothing is pending)."""
+        if not self._pending:
+            return None
+        pending = "".join(self._pending)
+        self._pending.clear()
+        self._pending_chars = 0
+        self._last_flush = self._clock() if now is None else now
+        return self.token_frame(pending)
+
+    def token_frame(self, text: str) -> bytes:
+        return self._count(_encode(_TOKEN_HEAD, text, _TOKEN_TAIL))
+
+    def response_frame(self, text: str) -> bytes:
+        return self._count(_encode(_RESPONSE_HEAD, text, _RESPONSE_TAIL))
+
+    def error_frame(self, message: str) -> bytes:
+        return self._count(_encode(_ERROR_HEAD, message, _ERROR_TAIL))
+
+    def busy_frame(self, message: str) -> bytes:
+        """Error frame flagged ``"busy": true`` so clients can retry instead of failing."""
+        return self._count(_encode(_ERROR_HEAD, message, _BUSY_TAIL))
+
+
+async def flush_ticks(items: AsyncIterator[str], writer: NDJSONFrameWriter) -> AsyncIterator[Optional[str]]:
+    """Yield from ``items``, plus ``None`` whenever ``writer``'s pending content
+    comes due while the next item is still outstanding.
+
+    Callers answer ``None`` with ``writer.flush()``, so buffered content goes
+    out on time even if the upstream stalls. The pending read is never
+    cancelled by a tick; it is only cancelled if the caller stops iterating.
+    """
+    items = items.__aiter__()
+    while True:
+        due = writer.flush_due_in()
+        if due is None:
+            try:
+                item = await items.__anext__()
+            except StopAsyncIteration:
+                return
+            yield item
+            continue
+        pending = asyncio.ensure_future(items.__anext__())
+        try:
+            while not (await asyncio.wait((pending,), timeout=due))[0]:
+                yield None
+                due = writer.flush_due_in()
+        finally:
+            if not pending.done():
+                pending.cancel()
+                try:
+                    await pending
+                except (asyncio.CancelledError, Exception):
+                    pass
+        try:
+            item = pending.result()
+        except StopAsyncIteration:
+            return
+        yield item
+
+
+class StreamStats:
+    """Process-wide totals of frames and bytes written per chat response."""
+
+    def __init__(self) -> None:
+        self.responses = 0
+        self.tokens = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def record(self, writer: NDJSONFrameWriter) -> None:
+        self.responses += 1
+        self.tokens += writer.tokens
+        self.frames += writer.frames
+        self.bytes += writer.bytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "responses": self.responses,
+            "tokens": self.tokens,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "frames_per_response": round(self.frames / self.responses, 2) if self.responses else None,
+            "bytes_per_response": round(self.bytes / self.responses, 1) if self.responses else None,
+        }
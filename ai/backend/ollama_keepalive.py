@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def parse_active_hours(value: str) -> Optional[Tuple[int, int]]:
+    """Parse "8-23" (UTC hours, end exclusive; "22-6" wraps midnight). Empty = always active."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    start_s, sep, end_s = value.partition("-")
+    if not sep:
+        raise ValueError(f"active hours must look like 8-23, got {value!r}")
+    start, end = int(start_s), int(end_s)
+    if not (0 <= start <= 24 and 0 <= end <= 24):
+        raise ValueError(f"active hours out of range: {value!r}")
+    return start % 24, end % 24
+
+
+def keep_alive_seconds(value: str) -> Optional[float]:
+    """Seconds for an Ollama keep_alive ("30m", "1h", "300", "300s"); None if negative (forever) or unparsable."""
+    value = str(value).strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600}
+    try:
+        seconds = float(value[:-1]) * units[value[-1]] if value and value[-1] in units else float(value)
+    except (ValueError, KeyError):
+        return None
+    return None if seconds < 0 else seconds
+
+
+class OllamaKeepAlive:
+    """Preload Ollama models at startup and keep them resident during active hours.
+
+    ``warm`` sends an empty /api/generate for a model, which makes Ollama load
+    it and hold it for ``keep_alive``. The background loop repeats that every
+    ``interval_s`` while inside ``active_hours`` (UTC), so the first chat after
+    a quiet spell does not pay the model load time. Outside active hours
+    models are left to expire.
+    """
+
+    def __init__(
+        self,
+        client: Callable[[], httpx.AsyncClient],
+        base_url: str,
+        models: Sequence[str],
+        keep_alive: str = "30m",
+        interval_s: float = 300.0,
+        active_hours: Optional[Tuple[int, int]] = None,
+        timeout_s: float = 120.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self._client = client
+        self.base_url = base_url.rstrip("/")
+        self.models: List[str] = list(dict.fromkeys(m for m in models if m))
+        self.keep_alive = keep_alive
+        self.interval_s = interval_s
+        self.active_hours = active_hours
+        self.timeout_s = timeout_s
+        self._clock = clock
+        self._state: Dict[str, Dict[str, Any]] = {m: {"state": "cold"} for m in self.models}
+        self.pings = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def model_state(self, model: str) -> str:
+        """cold | loading | loaded | expired | error ("expired" = keep_alive has run out since the last ping)."""
+        state = self._state.get(model, {})
+        current = state.get("state", "cold")
+        hold = keep_alive_seconds(self.keep_alive)
+        if current == "loaded" and hold is not None and self._clock() - state.get("loaded_at", 0.0) > hold:
+            return "expired"
+        return current
+
+    def in_active_hours(self, now: Optional[float] = None) -> bool:
+        if self.active_hours is None:
+            return True
+        start, end = self.active_hours
+        if start == end:
+            return True
+        hour = time.gmtime(self._clock() if now is None else now).tm_hour
+        if start < end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    async def warm(self, model: str) -> Dict[str, Any]:
+        state = self._state.setdefault(model, {"state": "cold"})
+        previous = self.model_state(model)
+        state["state"] = "loading" if previous != "loaded" else "loaded"
+        started = time.perf_counter()
+        try:
+            r = await self._client().post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "prompt": "", "stream": False, "keep_alive": self.keep_alive},
+                timeout=self.timeout_s,
+            )
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            if r.status_code != 200:
+                raise RuntimeError(f"status={r.status_code} {r.text[:200]}")
+            try:
+                load_ns = int(r.json().get("load_duration") or 0)
+            except Exception:
+                load_ns = 0
+            state.update(
+                state="loaded",
+                last_ping_ms=elapsed_ms,
+                last_load_ms=load_ns // 1_000_000,
+                loaded_at=self._clock(),
+                error=None,
+            )
+            # A multi-second ping means the model had been evicted and reloaded.
+            if previous != "loaded" or load_ns >= 1_000_000_000:
+                logger.info(f"[OLLAMA] {model} loaded in {load_ns // 1_000_000}ms (keep_alive={self.keep_alive})")
+        except asyncio.CancelledError:
+            state["state"] = previous
+            raise
+        except Exception as e:
+            state.update(state="error", error=str(e) or type(e).__name__)
+            logger.warning(f"[OLLAMA] warm-up of {model} failed: {e!r}")
+        self.pings += 1
+        return dict(state)
+
+    async def warm_all(self) -> int:
+        """Warm every model (sequentially, so they do not compete for load); returns how many loaded."""
+        loaded = 0
+        for model in self.models:
+            if (await self.warm(model)).get("state") == "loaded":
+                loaded += 1
+        return loaded
+
+    async def _run(self) -> None:
+        await self.warm_all()
+        if self.interval_s <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.interval_s)
+            if self.in_active_hours():
+                await self.warm_all()
+
+    def start(self) -> None:
+        if self.models and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keep_alive": self.keep_alive,
+            "interval_s": self.interval_s,
+            "active_hours_utc": f"{self.active_hours[0]}-{self.active_hours[1]}" if self.active_hours else None,
+            "active_now": self.in_active_hours(),
+            "running": self._task is not None and not self._task.done(),
+            "pings": self.pings,
+            "models": {
+                model: {
+                    **state,
+                    "state": self.model_state(model),
+                    "loaded_at": round(state["loaded_at"], 1) if "loaded_at" in state else None,
+                }
+                for model, state in self._state.items()
+            },
+        }
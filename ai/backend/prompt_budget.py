@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Rough per-message framing cost (role markers, separators) in chat templates.
+MESSAGE_OVERHEAD_TOKENS = 4
+# Below this many spare tokens a turn is dropped rather than cut down to a stub.
+MIN_TRUNCATED_TOKENS = 24
+TRUNCATION_MARK = "…"
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: ~4 ASCII chars per token, ~2 for other scripts (Cyrillic, CJK)."""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ch < "\x80")
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return estimate_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep: str = "tail") -> str:
+    """Cut ``text`` to about ``max_tokens``, keeping its end ("tail") or start ("head")."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    # Scale by this text's own chars-per-token, then trim until it fits.
+    n = max(1, int(len(text) * max_tokens / estimate_tokens(text)))
+    while n > 1:
+        piece = text[-n:] if keep == "tail" else text[:n]
+        if estimate_tokens(piece) + 1 <= max_tokens:
+            break
+        n = int(n * 0.9)
+    return TRUNCATION_MARK + text[-n:].lstrip() if keep == "tail" else text[:n].rstrip() + TRUNCATION_MARK
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedupe_snippets(snippets: Sequence[str], threshold: float = 0.8) -> List[str]:
+    """Drop empty, repeated and overlapping snippets, keeping first-seen order.
+
+    Two snippets overlap when most of the smaller one's word 3-grams also
+    appear in the other; the longer of the two is kept.
+    """
+    kept: List[Tuple[str, set]] = []
+    for snippet in snippets:
+        text = str(snippet or "").strip()
+        if not text:
+            continue
+        grams = _shingles(text)
+        duplicate = False
+        for i, (other, other_grams) in enumerate(kept):
+            smaller = min(len(grams), len(other_grams)) or 1
+            if len(grams & other_grams) / smaller >= threshold:
+                duplicate = True
+                if len(text) > len(other):
+                    kept[i] = (text, grams)
+                break
+        if not duplicate:
+            kept.append((text, grams))
+    return [text for text, _ in kept]
+
+
+@dataclass(frozen=True)
+class BudgetReport:
+    budget: int
+    used: int
+    system_tokens: int
+    context_tokens: int
+    history_tokens: int
+    snippets_in: int
+    snippets_kept: int
+    snippets_deduped: int
+    turns_in: int
+    turns_kept: int
+    turns_truncated: int
+
+    @property
+    def trimmed(self) -> bool:
+        return self.turns_kept < self.turns_in or self.turns_truncated > 0 or self.snippets_kept < (
+            self.snippets_in - self.snippets_deduped
+        )
+
+
+def assemble_prompt(
+    system: Sequence[Dict[str, Any]],
+    history: Sequence[Dict[str, Any]],
+    budget: int,
+    context: Sequence[str] = (),
+    render_context: Optional[Callable[[List[str]], Dict[str, Any]]] = None,
+    context_share: float = 0.5,
+) -> Tuple[List[Dict[str, Any]], BudgetReport]:
+    """Fit system messages, RAG context and chat history into ``budget`` tokens.
+
+    Priority: ``system`` messages, history system messages and the latest
+    history turn are always kept (the latest turn is truncated if it alone
+    overflows). RAG ``context`` snippets are deduplicated and added in order
+    up to ``context_share`` of the remaining budget, rendered into one message
+    by ``render_context``. Older history turns fill what is left, newest
+    first; the oldest are dropped, and the boundary turn is truncated to its
+    most recent part when enough room is left.
+    """
+    system = list(system)
+    history = list(history)
+    system_tokens = sum(message_tokens(m) for m in system)
+
+    pinned = {i for i, m in enumerate(history) if m.get("role") == "system"}
+    if history:
+        pinned.add(len(history) - 1)
+    pinned_tokens = sum(message_tokens(history[i]) for i in pinned)
+    remaining = budget - system_tokens - pinned_tokens
+
+    fitted: Dict[int, Dict[str, Any]] = {i: history[i] for i in pinned}
+    truncated = 0
+    if remaining < 0 and history and history[-1].get("role") != "system":
+        last = history[-1]
+        # Never cut the current question down to nothing, even past the budget.
+        allowed = max(MIN_TRUNCATED_TOKENS, message_tokens(last) + remaining - MESSAGE_OVERHEAD_TOKENS)
+        content = str(last.get("content") or "")
+        cut = truncate_to_tokens(content, allowed)
+        if cut != content:
+            fitted[len(history) - 1] = {**last, "content": cut}
+            truncated += 1
+        remaining = 0
+
+    unique = dedupe_snippets(context)
+    kept_snippets: List[str] = []
+    context_message: Optional[Dict[str, Any]] = None
+    context_tokens = 0
+    if unique and render_context is not None and remaining > 0:
+        context_budget = int(remaining * context_share)
+        base = message_tokens(render_context([]))
+        used = base
+        for snippet in unique:
+            cost = estimate_tokens(snippet) + 2  # separator
+            if used + cost > context_budget:
+                if not kept_snippets and context_budget - used >= MIN_TRUNCATED_TOKENS:
+                    kept_snippets.append(truncate_to_tokens(snippet, context_budget - used - 2, keep="head"))
+                break
+            kept_snippets.append(snippet)
+            used += cost
+        if kept_snippets:
+            context_message = render_context(kept_snippets)
+            context_tokens = message_tokens(context_message)
+            remaining -= context_tokens
+
+    for i in range(len(history) - 1, -1, -1):
+        if i in pinned:
+            continue
+        cost = message_tokens(history[i])
+        if cost <= remaining:
+            fitted[i] = history[i]
+            remaining -= cost
+            continue
+        if remaining - MESSAGE_OVERHEAD_TOKENS >= MIN_TRUNCATED_TOKENS:
+            content = truncate_to_tokens(str(history[i].get("content") or ""), remaining - MESSAGE_OVERHEAD_TOKENS)
+            fitted[i] = {**history[i], "content": content}
+            truncated += 1
+        break  # everything older is dropped
+
+    kept_history = [fitted[i] for i in sorted(fitted)]
+    messages = system + ([context_message] if context_message else []) + kept_history
+    history_tokens = sum(message_tokens(m) for m in kept_history)
+    report = BudgetReport(
+        budget=budget,
+        used=system_tokens + context_tokens + history_tokens,
+        system_tokens=system_tokens,
+        context_tokens=context_tokens,
+        history_tokens=history_tokens,
+        snippets_in=len(context),
+        snippets_kept=len(kept_snippets),
+        snippets_deduped=len(context) - len(unique),
+        turns_in=len(history),
+        turns_kept=len(kept_history),
+        turns_truncated=truncated,
+    )
+    return messages, report
+
+
+class BudgetStats:
+    """Process-wide prompt budget use."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.trimmed = 0
+        self.turns_dropped = 0
+        self.turns_truncated = 0
+        self.snippets_deduped = 0
+        self.snippets_dropped = 0
+        self._utilization = 0.0
+        self.max_used = 0
+
+    def record(self, report: BudgetReport) -> None:
+        self.requests += 1
+        self.trimmed += int(report.trimmed)
+        self.turns_dropped += report.turns_in - report.turns_kept
+        self.turns_truncated += report.turns_truncated
+        self.snippets_deduped += report.snippets_deduped
+        self.snippets_dropped += report.snippets_in - report.snippets_deduped - report.snippets_kept
+        self._utilization += report.used / report.budget if report.budget > 0 else 0.0
+        self.max_used = max(self.max_used, report.used)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "trimmed": self.trimmed,
+            "turns_dropped": self.turns_dropped,
+            "turns_truncated": self.turns_truncated,
+            "snippets_deduped": self.snippets_deduped,
+            "snippets_dropped": self.snippets_dropped,
+            "avg_utilization": round(self._utilization / self.requests, 3) if self.requests else None,
+            "max_used_tokens": self.max_used,
+        }
@@ -1,25 +1,54 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import json
+import logging
+import os
 import re
-from typing import Dict
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
 
 import httpx
 
-# Simple in-memory cache: key -> localized prompt text.
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Localized prompt catalog: key -> localized prompt text. Mirrored to a JSON
+# file (see configure_prompt_catalog) so restarts and sibling workers reuse
+# translations instead of paying an LLM round trip on the chat path.
 _PROMPT_CACHE: Dict[str, str] = {}
+_CATALOG_PATH: Optional[Path] = None
+_CATALOG_MAX_ENTRIES = 256
+# Failed translations are not retried for this long (per key).
+_RETRY_AFTER_FAILURE_S = 60.0
+_translations: SingleFlight[Optional[str]] = SingleFlight()
+_background_fills: Set["asyncio.Future[Optional[str]]"] = set()
+_failed_until: Dict[str, float] = {}
+_catalog_stats = {"hits": 0, "misses": 0, "fills": 0, "failures": 0}
+# Optional gate that runs each translation call, given the provider name and
+# the call (e.g. under an admission slot, so translations queue behind live chat).
+TranslationGate = Callable[[str, Callable[[], Awaitable[str]]], Awaitable[str]]
+_translation_gate: Optional[TranslationGate] = None
 
-# Terms/placeholders we should never translate.
+# Terms/placeholders we should never translate. Listed most specific first:
+# at the same position the earlier alternative wins (a URL is masked whole
+# rather than having "ton" inside it masked).
 _PROTECTED_PATTERNS = (
+    r"https?://[^\s)]+",
+    r"\{[A-Z0-9_]+\}",
     r"\bTON\b",
     r"\bjetton\b",
     r"\bREFERENCE_FACTS\b",
     r"\bNARRATIVE\b",
     r"\bDOGS\b",
     r"\bCATS\b",
-    r"https?://[^\s)]+",
-    r"\{[A-Z0-9_]+\}",
 )
+_PROTECTED_RE = re.compile("|".join(f"(?:{p})" for p in _PROTECTED_PATTERNS), flags=re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r"__KEEP_(\d+)__")
 
 
 def _cache_key(template_en: str, target_lang: str, provider: str, model: str) -> str:
@@ -28,70 +57,175 @@ def _cache_key(template_en: str, target_lang: str, provider: str, model: str) ->
 
 
 def _protect_terms(text: str) -> tuple[str, Dict[str, str]]:
+    """Mask protected terms with ``__KEEP_<n>__`` placeholders in one left-to-right pass."""
     protected: Dict[str, str] = {}
-    masked = text
-    idx = 0
-
-    for pattern in _PROTECTED_PATTERNS:
-        for m in list(re.finditer(pattern, masked, flags=re.IGNORECASE)):
-            original = m.group(0)
-            token = f"__KEEP_{idx}__"
-            idx += 1
-            protected[token] = original
-            masked = masked[:m.start()] + token + masked[m.end():]
-            # Restart for this pattern because indices changed.
-            break
-
-    # Re-run until no more replacements for all patterns.
-    changed = True
-    while changed:
-        changed = False
-        for pattern in _PROTECTED_PATTERNS:
-            m = re.search(pattern, masked, flags=re.IGNORECASE)
-            if not m:
-                continue
-            original = m.group(0)
-            token = f"__KEEP_{idx}__"
-            idx += 1
-            protected[token] = original
-            masked = masked[:m.start()] + token + masked[m.end():]
-            changed = True
-    return masked, protected
+
+    def _mask(m: re.Match) -> str:
+        token = f"__KEEP_{len(protected)}__"
+        protected[token] = m.group(0)
+        return token
+
+    return _PROTECTED_RE.sub(_mask, text), protected
 
 
 def _restore_terms(text: str, protected: Dict[str, str]) -> str:
-    restored = text
-    for token, original in protected.items():
-        restored = restored.replace(token, original)
-    return restored
+    # Unknown placeholders (e.g. invented by the model) are left as-is.
+    return _PLACEHOLDER_RE.sub(lambda m: protected.get(m.group(0), m.group(0)), text)
 
 
-async def localize_prompt_with_model(
+async def _request_translation(
+    client: httpx.AsyncClient,
     *,
-    template_en: str,
-    target_lang: str,
-    provider: str,
+    chosen_provider: str,
+    translator_instruction: str,
+    translation_request: str,
     ollama_url: str,
     ollama_model: str,
     openai_api_key: str | None,
     openai_model: str,
-    timeout_s: float = 25.0,
+    timeout_s: float,
 ) -> str:
-    """Translate English instruction prompt into target language with cache.
+    """Run one translation call; returns empty string on any non-success."""
+    if chosen_provider == "openai":
+        if not openai_api_key:
+            return ""
+        payload = {
+            "model": openai_model,
+            "messages": [
+                {"role": "system", "content": translator_instruction},
+                {"role": "user", "content": translation_request},
+            ],
+            "stream": False,
+            "temperature": 0,
+        }
+        resp = await client.post(
+            "https://api.openai.com/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {openai_api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+            timeout=timeout_s,
+        )
+        if resp.status_code != 200:
+            return ""
+        data = resp.json()
+        choices = data.get("choices") or []
+        if not choices:
+            return ""
+        return ((choices[0].get("message") or {}).get("content") or "").strip()
 
-    Falls back to the original English template on any failure.
+    payload = {
+        "model": ollama_model,
+        "messages": [
+            {"role": "system", "content": translator_instruction},
+            {"role": "user", "content": translation_request},
+        ],
+        "stream": False,
+        "options": {"temperature": 0},
+    }
+    resp = await client.post(f"{ollama_url.rstrip('/')}/api/chat", json=payload, timeout=timeout_s)
+    if resp.status_code != 200:
+        return ""
+    data = resp.json()
+    return ((data.get("message") or {}).get("content") or "").strip()
+
+
+def _load_catalog_file(path: Path) -> Dict[str, str]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("[I18N] ignoring unreadable prompt catalog %s: %s", path, e)
+        return {}
+    entries = raw.get("entries") if isinstance(raw, dict) else None
+    if not isinstance(entries, dict):
+        return {}
+    return {k: v for k, v in entries.items() if isinstance(k, str) and isinstance(v, str) and v}
+
+
+def _save_catalog() -> None:
+    """Merge the in-memory catalog into the file and replace it atomically."""
+    path = _CATALOG_PATH
+    if path is None:
+        return
+    try:
+        # Other workers may have added entries since we loaded; keep them.
+        merged = _load_catalog_file(path)
+        merged.update(_PROMPT_CACHE)
+        if len(merged) > _CATALOG_MAX_ENTRIES:
+            merged = dict(list(merged.items())[-_CATALOG_MAX_ENTRIES:])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".prompt_catalog.", dir=path.parent)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": merged}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("[I18N] failed to persist prompt catalog %s: %s", path, e)
+
+
+def configure_prompt_catalog(path: str | os.PathLike | None) -> int:
+    """Set the on-disk catalog location and load it; returns entries loaded.
+
+    An empty path keeps the catalog in memory only.
     """
+    global _CATALOG_PATH
+    _CATALOG_PATH = Path(path) if path else None
+    if _CATALOG_PATH is None:
+        return 0
+    entries = _load_catalog_file(_CATALOG_PATH)
+    _PROMPT_CACHE.update(entries)
+    return len(entries)
+
+
+def set_translation_gate(gate: Optional[TranslationGate]) -> None:
+    """Run every translation call as ``gate(provider, call)``; ``None`` removes the gate."""
+    global _translation_gate
+    _translation_gate = gate
+
+
+async def _gated_translation(client: httpx.AsyncClient, **request_kwargs: Any) -> str:
+    if _translation_gate is None:
+        return await _request_translation(client, **request_kwargs)
+    return await _translation_gate(
+        request_kwargs["chosen_provider"], lambda: _request_translation(client, **request_kwargs)
+    )
+
+
+def prompt_catalog_stats() -> Dict[str, Any]:
+    return {
+        "entries": len(_PROMPT_CACHE),
+        "path": str(_CATALOG_PATH) if _CATALOG_PATH else None,
+        "in_flight": _translations.stats()["in_flight"],
+        **_catalog_stats,
+    }
+
+
+def _prepare(template_en: str, target_lang: str, provider: str, ollama_model: str, openai_model: str):
+    """Return (lang, provider, cache key) or None when no translation is needed."""
     lang = (target_lang or "").strip().lower()
     if not template_en or not lang or lang in ("en", "english"):
-        return template_en
-
+        return None
     chosen_provider = (provider or "ollama").strip().lower()
     model_name = openai_model if chosen_provider == "openai" else ollama_model
-    key = _cache_key(template_en, lang, chosen_provider, model_name)
-    cached = _PROMPT_CACHE.get(key)
-    if cached:
-        return cached
+    return lang, chosen_provider, _cache_key(template_en, lang, chosen_provider, model_name)
+
 
+async def _translate(
+    key: str,
+    *,
+    template_en: str,
+    lang: str,
+    chosen_provider: str,
+    ollama_url: str,
+    ollama_model: str,
+    openai_api_key: str | None,
+    openai_model: str,
+    timeout_s: float,
+    client: httpx.AsyncClient | None,
+) -> Optional[str]:
+    """Translate one template and store it in the catalog; None on failure."""
     masked_template, protected = _protect_terms(template_en)
     translator_instruction = (
         "Translate the following instruction text into the target language.\n"
@@ -105,58 +239,178 @@ async def localize_prompt_with_model(
         "TEXT TO TRANSLATE:\n"
         f"{masked_template}"
     )
+    request_kwargs = dict(
+        chosen_provider=chosen_provider,
+        translator_instruction=translator_instruction,
+        translation_request=translation_request,
+        ollama_url=ollama_url,
+        ollama_model=ollama_model,
+        openai_api_key=openai_api_key,
+        openai_model=openai_model,
+        timeout_s=timeout_s,
+    )
 
     try:
-        async with httpx.AsyncClient(timeout=timeout_s) as client:
-            if chosen_provider == "openai":
-                if not openai_api_key:
-                    return template_en
-                payload = {
-                    "model": openai_model,
-                    "messages": [
-                        {"role": "system", "content": translator_instruction},
-                        {"role": "user", "content": translation_request},
-                    ],
-                    "stream": False,
-                    "temperature": 0,
-                }
-                resp = await client.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {openai_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json=payload,
-                )
-                if resp.status_code != 200:
-                    return template_en
-                data = resp.json()
-                choices = data.get("choices") or []
-                if not choices:
-                    return template_en
-                translated = ((choices[0].get("message") or {}).get("content") or "").strip()
-            else:
-                payload = {
-                    "model": ollama_model,
-                    "messages": [
-                        {"role": "system", "content": translator_instruction},
-                        {"role": "user", "content": translation_request},
-                    ],
-                    "stream": False,
-                    "options": {"temperature": 0},
-                }
-                resp = await client.post(f"{ollama_url.rstrip('/')}/api/chat", json=payload)
-                if resp.status_code != 200:
-                    return template_en
-                data = resp.json()
-                translated = ((data.get("message") or {}).get("content") or "").strip()
-    except Exception:
-        return template_en
+        if client is None:
+            async with httpx.AsyncClient(timeout=timeout_s) as own_client:
+                translated = await _gated_translation(own_client, **request_kwargs)
+        else:
+            translated = await _gated_translation(client, **request_kwargs)
+    except Exception as e:
+        logger.info("[I18N] prompt translation to %s failed: %s", lang, e)
+        translated = ""
 
     if not translated:
-        return template_en
+        _catalog_stats["failures"] += 1
+        _failed_until[key] = time.monotonic() + _RETRY_AFTER_FAILURE_S
+        return None
 
     restored = _restore_terms(translated, protected)
     _PROMPT_CACHE[key] = restored
+    _failed_until.pop(key, None)
+    _catalog_stats["fills"] += 1
+    if _CATALOG_PATH is not None:
+        await asyncio.to_thread(_save_catalog)
     return restored
 
+
+def _start_translation(key: str, **kwargs: Any) -> "asyncio.Future[Optional[str]]":
+    # Concurrent requests for the same key share one upstream translation.
+    return _translations.call(key, lambda: _translate(key, **kwargs))
+
+
+async def localize_prompt_with_model(
+    *,
+    template_en: str,
+    target_lang: str,
+    provider: str,
+    ollama_url: str,
+    ollama_model: str,
+    openai_api_key: str | None,
+    openai_model: str,
+    timeout_s: float = 25.0,
+    client: httpx.AsyncClient | None = None,
+) -> str:
+    """Translate English instruction prompt into target language with cache.
+
+    Pass a shared ``client`` to reuse pooled connections; otherwise a
+    short-lived client is opened for this call.
+    Falls back to the original English template on any failure.
+    """
+    prepared = _prepare(template_en, target_lang, provider, ollama_model, openai_model)
+    if prepared is None:
+        return template_en
+    lang, chosen_provider, key = prepared
+    cached = _PROMPT_CACHE.get(key)
+    if cached:
+        _catalog_stats["hits"] += 1
+        return cached
+    _catalog_stats["misses"] += 1
+
+    translated = await _start_translation(
+        key,
+        template_en=template_en,
+        lang=lang,
+        chosen_provider=chosen_provider,
+        ollama_url=ollama_url,
+        ollama_model=ollama_model,
+        openai_api_key=openai_api_key,
+        openai_model=openai_model,
+        timeout_s=timeout_s,
+        client=client,
+    )
+    return translated or template_en
+
+
+def localize_prompt_nowait(
+    *,
+    template_en: str,
+    target_lang: str,
+    provider: str,
+    ollama_url: str,
+    ollama_model: str,
+    openai_api_key: str | None,
+    openai_model: str,
+    timeout_s: float = 25.0,
+    client: httpx.AsyncClient | None = None,
+    count: bool = True,
+) -> str:
+    """Return the cached localized prompt, or the English template right away.
+
+    On a miss the translation is filled in the background (shared with any
+    in-flight translation of the same prompt) so later requests hit the
+    catalog. Must be called from a running event loop. Pass ``count=False``
+    for speculative prefetches, so only the lookup that picks the prompt
+    counts as a catalog hit or miss.
+    """
+    prepared = _prepare(template_en, target_lang, provider, ollama_model, openai_model)
+    if prepared is None:
+        return template_en
+    lang, chosen_provider, key = prepared
+    cached = _PROMPT_CACHE.get(key)
+    if cached:
+        if count:
+            _catalog_stats["hits"] += 1
+        return cached
+    if count:
+        _catalog_stats["misses"] += 1
+
+    if key in _translations or time.monotonic() < _failed_until.get(key, 0.0):
+        return template_en
+    fill = _start_translation(
+        key,
+        template_en=template_en,
+        lang=lang,
+        chosen_provider=chosen_provider,
+        ollama_url=ollama_url,
+        ollama_model=ollama_model,
+        openai_api_key=openai_api_key,
+        openai_model=openai_model,
+        timeout_s=timeout_s,
+        client=client,
+    )
+    _background_fills.add(fill)
+    fill.add_done_callback(_background_fills.discard)
+    return template_en
+
+
+async def warm_prompt_catalog(
+    templates: Iterable[tuple[str, str]],
+    *,
+    provider: str,
+    ollama_url: str,
+    ollama_model: str,
+    openai_api_key: str | None,
+    openai_model: str,
+    timeout_s: float = 25.0,
+    client: httpx.AsyncClient | None = None,
+) -> int:
+    """Translate every uncached ``(template_en, target_lang)`` pair; returns how many were filled."""
+    filled = 0
+    for template_en, target_lang in templates:
+        prepared = _prepare(template_en, target_lang, provider, ollama_model, openai_model)
+        if prepared is None or prepared[2] in _PROMPT_CACHE:
+            continue
+        lang, chosen_provider, key = prepared
+        translated = await _start_translation(
+            key,
+            template_en=template_en,
+            lang=lang,
+            chosen_provider=chosen_provider,
+            ollama_url=ollama_url,
+            ollama_model=ollama_model,
+            openai_api_key=openai_api_key,
+            openai_model=openai_model,
+            timeout_s=timeout_s,
+            client=client,
+        )
+        if translated:
+            filled += 1
+    return filled
+
+
+async def cancel_background_fills() -> None:
+    for fill in list(_background_fills):
+        fill.cancel()
+    if _background_fills:
+        await asyncio.gather(*_background_fills, return_exceptions=True)
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (provider name, factory returning that provider's content stream)
+Attempt = Tuple[str, Callable[[], AsyncIterator[str]]]
+
+
+class LatencyTracker:
+    """Rolling time-to-first-token samples and outcomes for one provider."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.hedges_started = 0
+        self.hedges_won = 0
+
+    def record_ttft(self, seconds: float) -> None:
+        self._ttft.append(seconds)
+        self._outcomes.append(True)
+
+    def record_censored(self, seconds: float) -> None:
+        # Cancelled before its first token: at least this slow. Counting it
+        # keeps a slow primary from being judged only by its fast runs.
+        self._ttft.append(seconds)
+
+    def record_error(self) -> None:
+        self._outcomes.append(False)
+
+    @property
+    def samples(self) -> int:
+        return len(self._ttft)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self._ttft:
+            return None
+        ordered = sorted(self._ttft)
+        # Nearest-rank percentile
+        idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+        return ordered[idx]
+
+    def error_rate(self) -> Optional[float]:
+        if not self._outcomes:
+            return None
+        return sum(1 for ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        error_rate = self.error_rate()
+        return {
+            "requests": self.requests,
+            "samples": self.samples,
+            "ttft_p50_ms": int(p50 * 1000) if p50 is not None else None,
+            "ttft_p95_ms": int(p95 * 1000) if p95 is not None else None,
+            "error_rate": round(error_rate, 3) if error_rate is not None else None,
+            "hedges_started": self.hedges_started,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class _Attempt:
+    __slots__ = ("name", "tracker", "it", "next", "started", "sampled")
+
+    def __init__(self, name: str, tracker: LatencyTracker, it: AsyncIterator[str], sampled: bool = True) -> None:
+        self.name = name
+        self.tracker = tracker
+        self.it = it
+        self.started = time.perf_counter()
+        # A stream replaying another request's generation (shared stream
+        # subscribers) yields at once: its latency is not the provider's.
+        self.sampled = sampled and not getattr(it, "replayed", False)
+        tracker.requests += 1
+        # The first read runs as a task so it can be raced and cancelled.
+        self.next: "asyncio.Future[str]" = asyncio.ensure_future(it.__anext__())
+
+    def record_ttft(self) -> None:
+        if self.sampled:
+            self.tracker.record_ttft(time.perf_counter() - self.started)
+
+    def record_error(self) -> None:
+        if self.sampled:
+            self.tracker.record_error()
+
+    async def cancel(self) -> None:
+        if not self.next.done():
+            self.next.cancel()
+            if self.sampled:
+                self.tracker.record_censored(time.perf_counter() - self.started)
+        try:
+            await self.next
+        except BaseException:
+            pass
+        try:
+            await self.it.aclose()
+        except Exception:
+            pass
+
+
+class RoutedStream:
+    """Content stream that races providers for the first token.
+
+    Iterating starts the first attempt. If it has produced nothing by the
+    router's hedge deadline, the next attempt starts too; whichever yields a
+    token first wins and the other is cancelled. An attempt failing before
+    its first token fails over to the next one immediately. ``provider`` is
+    the provider actually serving the stream once it has started. Content
+    streams with a true ``replayed`` attribute, and every attempt of a
+    stream created with ``sampled=False``, feed no latency samples.
+    """
+
+    def __init__(self, router: "ProviderRouter", attempts: Sequence[Attempt], sampled: bool = True) -> None:
+        if not attempts:
+            raise ValueError("at least one provider attempt is required")
+        self._router = router
+        self._sampled = sampled
+        self._attempts = list(attempts)
+        self.provider = self._attempts[0][0]
+        self.hedged = False
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._run()
+
+    def _start(self, pending: List[Attempt]) -> _Attempt:
+        name, factory = pending.pop(0)
+        return _Attempt(name, self._router.tracker(name), factory(), self._sampled)
+
+    async def _run(self) -> AsyncIterator[str]:
+        pending = list(self._attempts)
+        live = [self._start(pending)]
+        hedge_at: Optional[float] = None
+        if pending and self._router.hedging:
+            hedge_at = live[0].started + self._router.hedge_delay(live[0].name)
+        winner: Optional[_Attempt] = None
+        first: Optional[str] = None
+        last_error: Optional[BaseException] = None
+        try:
+            while winner is None:
+                if not live:
+                    if not pending:
+                        assert last_error is not None
+                        raise last_error
+                    live.append(self._start(pending))
+                    continue
+
+                timeout = None
+                if hedge_at is not None and pending and not self.hedged:
+                    timeout = max(0.0, hedge_at - time.perf_counter())
+                done, _ = await asyncio.wait(
+                    [a.next for a in live], timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedge = self._start(pending)
+                    hedge.tracker.hedges_started += 1
+                    self.hedged = True
+                    logger.info(
+                        f"[ROUTER] {live[0].name} has no first token after "
+                        f"{int((time.perf_counter() - live[0].started) * 1000)}ms; hedging to {hedge.name}"
+                    )
+                    live.append(hedge)
+                    continue
+
+                for attempt in list(live):
+                    if attempt.next not in done:
+                        continue
+                    try:
+                        first = attempt.next.result()
+                    except StopAsyncIteration:
+                        # Finished without content; still a (empty) successful answer.
+                        attempt.record_ttft()
+                        winner, first = attempt, None
+                        break
+                    except Exception as e:
+                        attempt.record_error()
+                        live.remove(attempt)
+                        last_error = e
+                        logger.info(f"[ROUTER] {attempt.name} failed before first token: {e!r}")
+                        continue
+                    attempt.record_ttft()
+                    winner = attempt
+                    break
+
+            for attempt in live:
+                if attempt is not winner:
+                    await attempt.cancel()
+            live = [winner]
+            self.provider = winner.name
+            if self.hedged and winner.name != self._attempts[0][0]:
+                winner.tracker.hedges_won += 1
+
+            if first is None:
+                return
+            yield first
+            try:
+                async for piece in winner.it:
+                    yield piece
+            except Exception:
+                winner.record_error()
+                raise
+        finally:
+            for attempt in live:
+                if attempt is not winner or not attempt.next.done():
+                    await attempt.cancel()
+            if winner is not None:
+                try:
+                    await winner.it.aclose()
+                except Exception:
+                    pass
+
+
+class ProviderRouter:
+    """Per-provider TTFT/error statistics and the hedge deadline learned from them."""
+
+    def __init__(
+        self,
+        hedging: bool = True,
+        percentile: float = 95.0,
+        min_samples: int = 20,
+        default_delay_s: float = 2.0,
+        min_delay_s: float = 0.25,
+        max_delay_s: float = 8.0,
+        window: int = 200,
+    ) -> None:
+        self.hedging = hedging
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_delay_s = default_delay_s
+        self.min_delay_s = min_delay_s
+        self.max_delay_s = max_delay_s
+        self.window = window
+        self._trackers: Dict[str, LatencyTracker] = {}
+
+    def tracker(self, provider: str) -> LatencyTracker:
+        tracker = self._trackers.get(provider)
+        if tracker is None:
+            tracker = self._trackers[provider] = LatencyTracker(self.window)
+        return tracker
+
+    def hedge_delay(self, provider: str) -> float:
+        """Seconds to wait for ``provider``'s first token before hedging."""
+        tracker = self.tracker(provider)
+        learned = tracker.percentile(self.percentile) if tracker.samples >= self.min_samples else None
+        delay = self.default_delay_s if learned is None else learned
+        return min(self.max_delay_s, max(self.min_delay_s, delay))
+
+    def rank(self, providers: Sequence[str]) -> List[str]:
+        """Order fallback providers: lowest recent error rate, then fastest median TTFT."""
+
+        def key(name: str) -> Tuple[float, float]:
+            tracker = self.tracker(name)
+            p50 = tracker.percentile(50)
+            return (tracker.error_rate() or 0.0, p50 if p50 is not None else float("inf"))
+
+        return sorted(providers, key=key)
+
+    def stream(self, attempts: Sequence[Attempt], sampled: bool = True) -> RoutedStream:
+        return RoutedStream(self, attempts, sampled)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedging": self.hedging,
+            "hedge_percentile": self.percentile,
+            "providers": {
+                name: {**tracker.stats(), "hedge_delay_ms": int(self.hedge_delay(name) * 1000)}
+                for name, tracker in self._trackers.items()
+            },
+        }
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    __slots__ = ("items", "done", "error", "subscribers", "task", "_changed")
+
+    def __init__(self) -> None:
+        self.items: List[T] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def changed(self) -> None:
+        await self._changed.wait()
+
+
+class Subscription(Generic[T]):
+    """One subscriber's stream. ``replayed`` is true when it joined a generation
+    another request started, so its timings say nothing about the upstream.
+
+    ``release`` gives up the subscriber's place in the flight. Once reading
+    has started the reader does that when it ends; a subscription closed or
+    dropped before its first read releases itself.
+    """
+
+    def __init__(self, items: AsyncIterator[T], replayed: bool, release: Callable[[], None]) -> None:
+        self._items = items
+        self.replayed = replayed
+        self._release: Optional[Callable[[], None]] = release
+
+    def _release_unread(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def __aiter__(self) -> "Subscription[T]":
+        return self
+
+    async def __anext__(self) -> T:
+        # The reader's ``finally`` releases from here on.
+        self._release = None
+        return await self._items.__anext__()
+
+    async def aclose(self) -> None:
+        self._release_unread()
+        await self._items.aclose()
+
+    def __del__(self) -> None:
+        self._release_unread()
+
+
+class SharedStreams(Generic[T]):
+    """Share one upstream stream between concurrent subscribers with the same key.
+
+    The first subscriber starts ``start()`` in a background task that buffers
+    every item; each subscriber then reads the buffer from the beginning, so
+    late joiners replay what they missed and every subscriber sees the whole
+    stream, ending with the same exception if the upstream fails. A
+    subscriber leaving never stops the upstream while others remain; the last
+    one to leave cancels it. Finished streams are forgotten at once: this
+    only deduplicates work in flight, it is not a cache.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Hashable, _Flight[T]] = {}
+        self.started = 0
+        self.joined = 0
+        self.replayed = 0
+        self.cancelled = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+
+    async def _pump(self, key: Hashable, flight: _Flight[T], start: Callable[[], AsyncIterator[T]]) -> None:
+        items = start().__aiter__()
+        try:
+            async for item in items:
+                flight.items.append(item)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except BaseException as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+            aclose = getattr(items, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _read(self, key: Hashable, flight: _Flight[T]) -> AsyncIterator[T]:
+        position = 0
+        try:
+            while True:
+                if position < len(flight.items):
+                    item = flight.items[position]
+                    position += 1
+                    yield item
+                elif flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                else:
+                    await flight.changed()
+        finally:
+            self._leave(key, flight)
+
+    def _leave(self, key: Hashable, flight: _Flight[T]) -> None:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done and flight.task is not None:
+            self.cancelled += 1
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.task.cancel()
+
+    def subscribe(self, key: Hashable, start: Callable[[], AsyncIterator[T]]) -> Subscription[T]:
+        """Stream ``key``'s items, starting ``start()`` unless it is already in flight."""
+        flight = self._flights.get(key)
+        replayed = flight is not None
+        if flight is None:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.get_running_loop().create_task(self._pump(key, flight, start))
+            self.started += 1
+        else:
+            self.joined += 1
+            self.replayed += len(flight.items)
+        # Counted now, so the flight cannot be cancelled before this subscriber reads.
+        flight.subscribers += 1
+        return Subscription(self._read(key, flight), replayed, lambda: self._leave(key, flight))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+            "started": self.started,
+            "joined": self.joined,
+            "replayed_items": self.replayed,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Mapping, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[T]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent work for the same key into one shared task.
+
+    Every caller gets its own waiter future; the result (or exception) of the
+    shared task fans out to all of them. Cancelling a waiter never cancels the
+    shared task while other waiters remain; the last waiter to leave cancels it.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call[T]] = {}
+        self.started = 0
+        self.joined = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    def _register(self, key: Hashable, task: "asyncio.Future[T]") -> _Call[T]:
+        call: _Call[T] = _Call(task)
+        self._calls[key] = call
+
+        def _forget(_task: "asyncio.Future[T]") -> None:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+        task.add_done_callback(_forget)
+        self.started += 1
+        return call
+
+    async def _wait(self, call: _Call[T]) -> T:
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+
+    def _waiter(self, call: _Call[T]) -> "asyncio.Future[T]":
+        return asyncio.ensure_future(self._wait(call))
+
+    def call(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> "asyncio.Future[T]":
+        """Return a waiter for ``key``, starting ``fn()`` unless already in flight."""
+        call = self._calls.get(key)
+        if call is None:
+            call = self._register(key, asyncio.ensure_future(fn()))
+        else:
+            self.joined += 1
+        return self._waiter(call)
+
+    def call_many(
+        self,
+        keys: Iterable[Hashable],
+        fn_many: Callable[[List[Hashable]], Awaitable[Optional[Mapping[Hashable, T]]]],
+    ) -> Dict[Hashable, "asyncio.Future[Optional[T]]"]:
+        """Like :meth:`call` for several keys at once.
+
+        Keys already in flight are joined; the rest are fetched together by a
+        single ``fn_many(missing_keys)`` call whose mapping result is split per
+        key (a ``None`` result resolves every missing key to ``None``). The
+        batch itself runs to completion even if all its waiters leave.
+        """
+        keys = list(keys)
+        missing = [k for k in keys if k not in self._calls]
+        if missing:
+            batch = asyncio.ensure_future(fn_many(missing))
+            # Mark a failure as retrieved even if every waiter already left.
+            batch.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+            async def _pick(key: Hashable) -> Optional[T]:
+                result = await asyncio.shield(batch)
+                return None if result is None else result.get(key)
+
+            for key in missing:
+                self._register(key, asyncio.ensure_future(_pick(key)))
+        self.joined += len(keys) - len(missing)
+        return {key: self._waiter(self._calls[key]) for key in keys}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "started": self.started,
+            "joined": self.joined,
+        }
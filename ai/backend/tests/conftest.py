@@ -0,0 +1,72 @@
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from circuit_breaker import CircuitBreaker, CircuitBreakers
+from ttl_cache import TTLCache
+
+DOGS = {
+    "symbol": "DOGS",
+    "name": "Dogs",
+    "type": "jetton",
+    "description": "Community meme token.",
+    "total_supply": 1000,
+    "holders": 10,
+}
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    """In-process RAG and Ollama behind the pooled clients; Ollama is primary."""
+    state = {
+        "tokens": {"DOGS": dict(DOGS)},
+        "ollama_calls": 0,
+        "ollama_pieces": ["Dogs is a community meme ", "token on TON."],
+    }
+
+    def rag(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/query":
+            return httpx.Response(200, json={"context": [], "sources": []})
+        symbols = json.loads(request.content)["symbols"]
+        return httpx.Response(200, json={"results": {
+            s: {"status": "ok", "data": state["tokens"][s]} if s in state["tokens"] else {"status": "not_found"}
+            for s in symbols
+        }})
+
+    def ollama(request: httpx.Request) -> httpx.Response:
+        state["ollama_calls"] += 1
+        lines = [{"message": {"content": piece}, "done": False} for piece in state["ollama_pieces"]]
+        lines.append({"done": True})
+        return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines))
+
+    for name, handler in (("rag", rag), ("ollama", ollama)):
+        monkeypatch.setitem(
+            main.upstream_clients._clients, name, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+    monkeypatch.setattr(main, "RAG_URL", "http://rag.test")
+    monkeypatch.setattr(main, "OLLAMA_URL", "http://ollama.test")
+    monkeypatch.setattr(main, "OPENAI_SWITCH", False)
+    monkeypatch.setattr(main, "OLLAMA_SWITCH", True)
+    monkeypatch.setattr(main, "API_KEY", "test-key")
+    monkeypatch.setattr(main, "_ticker_cache", TTLCache(64))
+    monkeypatch.setattr(main, "_ticker_response_cache", TTLCache(64))
+    monkeypatch.setattr(main, "_rag_batch_unsupported_until", 0.0)
+    monkeypatch.setattr(
+        main, "_circuits", CircuitBreakers(CircuitBreaker(n) for n in ("ollama", "openai", "cocoon", "rag"))
+    )
+    return state
+
+
+def chat_lines(text: str):
+    """POST one user message to /api/chat and return the raw NDJSON lines."""
+    client = TestClient(main.app)
+    resp = client.post(
+        "/api/chat",
+        headers={"X-API-Key": "test-key"},
+        json={"messages": [{"role": "user", "content": text}]},
+    )
+    assert resp.status_code == 200
+    return resp.text.splitlines()
@@ -0,0 +1,194 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+from admission import (
+    API,
+    BACKGROUND,
+    INTERACTIVE,
+    AdmissionControl,
+    AdmissionLimiter,
+    AdmissionRejected,
+    run_preemptible,
+    until_preempted,
+)
+from fastapi.testclient import TestClient
+
+from conftest import chat_lines
+
+
+def test_waiters_are_admitted_in_order_and_overflow_is_rejected():
+    async def run():
+        limiter = AdmissionLimiter("ollama", max_concurrent=1, max_queue=2, max_wait_s=1.0)
+        order = []
+
+        async def job(i):
+            await limiter.acquire()
+            order.append(i)
+            await asyncio.sleep(0.01)
+            limiter.release()
+
+        first = asyncio.ensure_future(job(0))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(job(i)) for i in (1, 2)]
+        await asyncio.sleep(0)
+        assert limiter.queued == 2
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        assert exc.value.reason == "queue_full"
+        await asyncio.gather(first, *queued)
+        return limiter, order
+
+    limiter, order = asyncio.run(run())
+    assert order == [0, 1, 2]
+    assert limiter.active == 0 and limiter.queued == 0
+    stats = limiter.stats()
+    assert stats["rejected_full"] == 1 and stats["queued_total"] == 2 and stats["peak_queue"] == 2
+
+
+def test_queue_wait_is_bounded_and_cancelled_waiters_leave_the_queue():
+    async def run():
+        limiter = AdmissionLimiter("ollama", max_concurrent=1, max_queue=4, max_wait_s=0.02)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        assert exc.value.reason == "queue_timeout"
+
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.queued == 0
+        limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.active == 0 and limiter.rejected_timeout == 1
+
+
+def test_saturated_provider_gets_a_busy_reply(upstreams, monkeypatch):
+    monkeypatch.setattr(
+        main, "_admission", AdmissionControl([AdmissionLimiter("ollama", max_concurrent=1, max_queue=0)])
+    )
+    main._admission.get("ollama").active = 1  # one generation already running
+
+    frames = [json.loads(line) for line in chat_lines("hello")]
+
+    assert frames == [{"error": "Ollama is busy right now, please try again in a moment", "busy": True}]
+    assert upstreams["ollama_calls"] == 0
+    # Our own limit is not an upstream outage.
+    assert main._circuits.get("ollama").consecutive_failures == 0
+
+
+def test_higher_priority_waiters_go_first():
+    async def run():
+        limiter = AdmissionLimiter("ollama", max_concurrent=1, max_queue=8, max_wait_s=1.0, background_reserve=0)
+        order = []
+        await limiter.acquire()
+
+        async def job(priority):
+            await limiter.acquire(priority)
+            order.append(priority)
+            limiter.release()
+
+        jobs = []
+        for priority in (BACKGROUND, API, INTERACTIVE):
+            jobs.append(asyncio.ensure_future(job(priority)))
+            await asyncio.sleep(0)
+        assert limiter.queued_for(API) == 1 and limiter.slo_at_risk()
+        limiter.release()
+        await asyncio.gather(*jobs)
+        return limiter, order
+
+    limiter, order = asyncio.run(run())
+    assert order == [INTERACTIVE, API, BACKGROUND]
+    assert limiter.stats()["priorities"][INTERACTIVE]["admitted"] == 1
+
+
+def test_background_keeps_a_reserve_and_is_preempted_by_live_requests():
+    async def run():
+        limiter = AdmissionLimiter("ollama", max_concurrent=2, max_queue=8, max_wait_s=0.05, background_reserve=1)
+        preempt = asyncio.Event()
+        await limiter.acquire(BACKGROUND, preempt)
+        # The last slot is kept for live requests.
+        with pytest.raises(AdmissionRejected):
+            await limiter.acquire(BACKGROUND)
+        await limiter.acquire(INTERACTIVE)
+        assert not preempt.is_set()
+
+        async def background_generation():
+            async def tokens():
+                while True:
+                    yield "token"
+                    await asyncio.sleep(0.01)
+
+            received = []
+            try:
+                async for piece in until_preempted("ollama", tokens(), preempt):
+                    received.append(piece)
+            finally:
+                limiter.release(preempt)
+            return received
+
+        generation = asyncio.ensure_future(background_generation())
+        await asyncio.sleep(0.02)
+        waited = await limiter.acquire(INTERACTIVE)  # both slots busy: preempts the background call
+        with pytest.raises(AdmissionRejected) as exc:
+            await generation
+        assert exc.value.reason == "preempted"
+        return limiter, waited
+
+    limiter, waited = asyncio.run(run())
+    assert waited < 0.05
+    assert limiter.preempted == 1 and limiter.active == 2
+
+
+def test_request_priority_header_sets_the_admission_class(upstreams):
+    client = TestClient(main.app)
+    before = main._admission_wait_seconds.count(provider="ollama", priority=INTERACTIVE)
+
+    resp = client.post(
+        "/api/chat",
+        headers={"X-API-Key": "test-key", "X-Request-Priority": "Interactive"},
+        json={"messages": [{"role": "user", "content": "hello"}]},
+    )
+
+    assert resp.status_code == 200
+    assert main._admission_wait_seconds.count(provider="ollama", priority=INTERACTIVE) == before + 1
+    assert main._admission.stats()["ollama"]["priorities"][INTERACTIVE]["admitted"] >= 1
+
+
+def test_single_slot_provider_keeps_its_slot_for_live_requests():
+    async def run():
+        limiter = AdmissionLimiter("ollama", max_concurrent=1, max_queue=4, max_wait_s=0.05, background_reserve=1)
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire(BACKGROUND)
+        assert exc.value.reason == "reserved"
+        assert await limiter.acquire(INTERACTIVE) == 0.0
+        limiter.release()
+
+        # With no reserve, a background call (e.g. a prompt translation) may use
+        # the slot but is preempted as soon as a live request queues.
+        limiter.background_reserve = 0
+        preempt = asyncio.Event()
+        await limiter.acquire(BACKGROUND, preempt)
+
+        async def translation():
+            try:
+                return await run_preemptible("ollama", asyncio.sleep(10, "translated"), preempt)
+            finally:
+                limiter.release(preempt)
+
+        background = asyncio.ensure_future(translation())
+        await asyncio.sleep(0)
+        waited = await limiter.acquire(INTERACTIVE)
+        with pytest.raises(AdmissionRejected) as exc:
+            await background
+        assert exc.value.reason == "preempted"
+        return limiter, waited
+
+    limiter, waited = asyncio.run(run())
+    assert waited < 0.05
+    assert limiter.stats()["rejected_reserved"] == 1 and limiter.active == 1
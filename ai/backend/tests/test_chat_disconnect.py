@@ -0,0 +1,120 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+import main
+
+
+async def _call_chat(text, disconnect_when):
+    """Drive /api/chat over raw ASGI; the client disconnects once ``disconnect_when(sent)`` is true."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/chat",
+        "raw_path": b"/api/chat",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"x-api-key", b"test-key")],
+        "client": ("test", 1),
+        "server": ("test", 80),
+    }
+    body = json.dumps({"messages": [{"role": "user", "content": text}]}).encode()
+    sent = []
+    gone = asyncio.Event()
+    body_read = False
+
+    async def receive():
+        nonlocal body_read
+        if not body_read:
+            body_read = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+        if disconnect_when(sent):
+            gone.set()
+
+    async def watchdog():
+        while not disconnect_when(sent):
+            await asyncio.sleep(0.01)
+        gone.set()
+
+    guard = asyncio.create_task(watchdog())
+    try:
+        await main.app(scope, receive, send)
+    finally:
+        guard.cancel()
+    return sent
+
+
+def test_disconnect_during_ticker_detection_skips_generation(upstreams, monkeypatch):
+    query_finished = []
+
+    async def slow_rag(request):
+        await asyncio.sleep(1.0)
+        query_finished.append(request.url.path)
+        return httpx.Response(200, json={"results": {}, "context": [], "sources": []})
+
+    monkeypatch.setitem(main.upstream_clients._clients, "rag", httpx.AsyncClient(transport=httpx.MockTransport(slow_rag)))
+    labels = dict(provider="ollama", model=main.OLLAMA_MODEL, mode="ticker", stage="preprocess")
+    before = main._cancelled_total.value(**labels)
+    started = time.perf_counter()
+
+    async def scenario():
+        t0 = time.perf_counter()
+        sent = await _call_chat("$DOGS", lambda sent: time.perf_counter() - t0 > 0.1)
+        await asyncio.sleep(0)  # let cancelled lookups unwind
+        return sent
+
+    sent = asyncio.run(scenario())
+
+    assert time.perf_counter() - started < 0.8
+    assert sent[0]["status"] == 499
+    assert query_finished == []  # both the ticker lookup and the general query were cancelled
+    assert upstreams["ollama_calls"] == 0
+    assert main._cancelled_total.value(**labels) == before + 1
+
+
+def test_disconnect_mid_stream_stops_upstream_generation(upstreams, monkeypatch):
+    produced = []
+
+    async def pieces():
+        for i in range(200):
+            produced.append(i)
+            yield (json.dumps({"message": {"content": f"word{i} "}, "done": False}) + "\n").encode()
+            await asyncio.sleep(0.01)
+        yield b'{"done": true}\n'
+
+    def slow_ollama(request):
+        upstreams["ollama_calls"] += 1
+        return httpx.Response(200, content=pieces())
+
+    monkeypatch.setitem(
+        main.upstream_clients._clients, "ollama", httpx.AsyncClient(transport=httpx.MockTransport(slow_ollama))
+    )
+    labels = dict(provider="ollama", model=main.OLLAMA_MODEL, mode="plain", stage="generation")
+    before = main._cancelled_total.value(**labels)
+    saved_before = main._cancellations.saved_tokens
+
+    async def scenario():
+        sent = await _call_chat("hello there", lambda sent: sum(m["type"] == "http.response.body" for m in sent) >= 2)
+        count = len(produced)
+        await asyncio.sleep(0.1)
+        return sent, count
+
+    sent, count_at_return = asyncio.run(scenario())
+
+    assert sent[0]["status"] == 200
+    assert count_at_return < 50
+    assert len(produced) == count_at_return  # nothing pulled after the handler returned
+    assert main._admission.get("ollama").active == 0
+    assert main._cancelled_total.value(**labels) == before + 1
+    # Default options cap generation at 256 tokens; only a few were produced.
+    assert main._cancellations.saved_tokens - saved_before > 200
@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import httpx
+
+import main
+from conftest import chat_lines
+
+
+def _slow_rag(upstreams, events, query_delay=0.05):
+    async def rag(request: httpx.Request) -> httpx.Response:
+        name = "query" if request.url.path == "/query" else "batch"
+        events.append(f"{name}-start")
+        await asyncio.sleep(query_delay if name == "query" else 0.05)
+        events.append(f"{name}-end")
+        if name == "query":
+            return httpx.Response(200, json={"context": ["TON is a blockchain."], "sources": []})
+        symbols = json.loads(request.content)["symbols"]
+        return httpx.Response(200, json={"results": {
+            s: {"status": "ok", "data": upstreams["tokens"][s]} if s in upstreams["tokens"] else {"status": "not_found"}
+            for s in symbols
+        }})
+
+    return rag
+
+
+def test_general_rag_runs_alongside_ticker_detection(upstreams, monkeypatch):
+    events = []
+    monkeypatch.setitem(
+        main.upstream_clients._clients, "rag", httpx.AsyncClient(transport=httpx.MockTransport(_slow_rag(upstreams, events)))
+    )
+
+    frames = [json.loads(line) for line in chat_lines("is $PEPE a token on TON?")]
+
+    # Both lookups were in flight together; no ticker, so the RAG context is used.
+    assert events.index("query-start") < events.index("batch-end")
+    assert events.index("batch-start") < events.index("query-end")
+    assert frames[-1]["done"] is True
+
+
+def test_general_rag_is_cancelled_when_ticker_mode_wins(upstreams, monkeypatch):
+    events = []
+    rag = _slow_rag(upstreams, events, query_delay=0.5)
+    monkeypatch.setitem(main.upstream_clients._clients, "rag", httpx.AsyncClient(transport=httpx.MockTransport(rag)))
+    before = main._rag_lookup_seconds.count(provider="ollama", model=main.OLLAMA_MODEL, mode="ticker", outcome="cancelled")
+
+    chat_lines("$DOGS")
+
+    assert "query-start" in events and "query-end" not in events
+    assert main._rag_lookup_seconds.count(
+        provider="ollama", model=main.OLLAMA_MODEL, mode="ticker", outcome="cancelled"
+    ) == before + 1
@@ -0,0 +1,89 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from conftest import chat_lines
+
+
+def test_plain_stream_coalesces_tokens_and_keeps_full_text(upstreams, monkeypatch):
+    monkeypatch.setattr(main, "STREAM_FLUSH_INTERVAL_MS", 10_000)
+    monkeypatch.setattr(main, "STREAM_FLUSH_CHARS", 8)
+    upstreams["ollama_pieces"] = ["Hel", "lo", " th", "ere", "!"]
+
+    frames = [json.loads(line) for line in chat_lines("hello")]
+
+    assert [f["token"] for f in frames[:-1]] == ["Hel", "lo there", "!"]
+    assert frames[-1] == {"response": "Hello there!", "done": True}
+
+
+def test_upstream_error_is_reported_as_error_frame(upstreams, monkeypatch):
+    def ollama(request):
+        return httpx.Response(500, json={"error": "model not loaded"})
+
+    monkeypatch.setitem(
+        main.upstream_clients._clients,
+        "ollama",
+        httpx.AsyncClient(transport=httpx.MockTransport(ollama)),
+    )
+    assert [json.loads(line) for line in chat_lines("hello")] == [{"error": "Ollama error: model not loaded"}]
+
+
+def test_openai_failure_fails_over_to_ollama_default_model(upstreams, monkeypatch):
+    ollama_models = []
+    original = main.upstream_clients._clients["ollama"]._transport.handler
+
+    def ollama(request):
+        ollama_models.append(json.loads(request.content)["model"])
+        return original(request)
+
+    def openai(request):
+        return httpx.Response(503, json={"error": {"message": "overloaded"}})
+
+    for name, handler in (("openai", openai), ("ollama", ollama)):
+        monkeypatch.setitem(
+            main.upstream_clients._clients, name, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+    monkeypatch.setattr(main, "OPENAI_SWITCH", True)
+    monkeypatch.setattr(main, "OPENAI_KEY", "sk-test")
+    monkeypatch.setattr(main, "_provider_router", main.ProviderRouter())
+
+    frames = [json.loads(line) for line in chat_lines("hello")]
+
+    assert frames[-1] == {"response": "Dogs is a community meme token on TON.", "done": True}
+    assert ollama_models == [main.OLLAMA_MODEL]
+    assert main._provider_router.tracker("openai").error_rate() == 1.0
+
+
+def test_configured_cocoon_takes_over_from_failing_openai(upstreams, monkeypatch):
+    cocoon_models = []
+
+    def openai(request):
+        return httpx.Response(503, json={"error": {"message": "overloaded"}})
+
+    def cocoon(request):
+        cocoon_models.append(json.loads(request.content)["model"])
+        return httpx.Response(200, json={"choices": [{"message": {"content": "Hello from Cocoon."}}]})
+
+    for name, handler in (("openai", openai), ("cocoon", cocoon)):
+        monkeypatch.setitem(
+            main.upstream_clients._clients, name, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+    monkeypatch.setattr(main, "OPENAI_SWITCH", True)
+    monkeypatch.setattr(main, "OPENAI_KEY", "sk-test")
+    monkeypatch.setattr(main, "OLLAMA_SWITCH", False)
+    monkeypatch.setattr(main, "COCOON_CONFIGURED", True)
+    monkeypatch.setattr(main, "_provider_router", main.ProviderRouter())
+    assert main._fallback_providers("openai") == ["cocoon"]
+
+    client = TestClient(main.app)
+    resp = client.post(
+        "/api/chat",
+        headers={"X-API-Key": "test-key"},
+        json={"messages": [{"role": "user", "content": "hello"}], "stream": False},
+    )
+
+    assert json.loads(resp.text.splitlines()[-1]) == {"response": "Hello from Cocoon.", "done": True}
+    assert cocoon_models == [main.COCOON_MODEL]
+    assert main._fallback_providers("cocoon") == ["openai"]
@@ -0,0 +1,24 @@
+import json
+
+import main
+from conftest import chat_lines
+
+
+def test_ticker_answer_is_replayed_from_cache(upstreams):
+    first = chat_lines("$DOGS")
+    second = chat_lines("$DOGS")
+
+    assert upstreams["ollama_calls"] == 1
+    assert second == first
+    prefix, final = (json.loads(line) for line in second)
+    assert prefix["done"] is False and final["response"].startswith(prefix["token"].strip())
+    assert final["done"] is True and "community meme" in final["response"]
+
+
+def test_changed_facts_invalidate_cached_answer(upstreams):
+    chat_lines("$DOGS")
+    main._ticker_cache.clear()
+    upstreams["tokens"]["DOGS"]["holders"] = 11
+
+    chat_lines("$DOGS")
+    assert upstreams["ollama_calls"] == 2
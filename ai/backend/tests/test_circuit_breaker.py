@@ -0,0 +1,134 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers
+from conftest import chat_lines
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_after_consecutive_failures_and_probes_once():
+    clock = Clock()
+    breaker = CircuitBreaker("ollama", failure_threshold=3, reset_timeout_s=10, clock=clock)
+
+    breaker.record_failure()
+    breaker.record_success()  # a success resets the streak
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow() and not breaker.available()
+
+    clock.now = 10
+    assert breaker.available()
+    assert breaker.allow()  # the probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.available()
+
+    breaker.record_failure()  # failed probe re-opens for another window
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.stats()["trips"] == 2
+
+
+def test_released_probe_lets_the_next_caller_probe():
+    clock = Clock()
+    breaker = CircuitBreaker("rag", failure_threshold=1, reset_timeout_s=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_late_success_from_before_the_trip_keeps_the_circuit_open():
+    clock = Clock()
+    breaker = CircuitBreaker("ollama", failure_threshold=2, reset_timeout_s=10, clock=clock)
+    assert breaker.allow()  # slow call, still in flight when the circuit trips
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.record_success()
+    assert breaker.state == OPEN and not breaker.allow()
+    clock.now = 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+
+
+def test_open_primary_fails_fast_without_calling_upstream(upstreams):
+    breaker = main._circuits.get("ollama")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    frames = [json.loads(line) for line in chat_lines("hello")]
+
+    assert frames == [{"error": "Ollama is temporarily unavailable (circuit open)"}]
+    assert upstreams["ollama_calls"] == 0
+
+
+def test_open_primary_routes_straight_to_fallback(upstreams, monkeypatch):
+    openai_calls = []
+
+    def openai(request):
+        openai_calls.append(request.url.path)
+        return httpx.Response(503)
+
+    monkeypatch.setitem(main.upstream_clients._clients, "openai", httpx.AsyncClient(transport=httpx.MockTransport(openai)))
+    monkeypatch.setattr(main, "OPENAI_SWITCH", True)
+    monkeypatch.setattr(main, "OPENAI_KEY", "sk-test")
+    breaker = main._circuits.get("openai")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    frames = [json.loads(line) for line in chat_lines("hello")]
+
+    assert frames[-1] == {"response": "Dogs is a community meme token on TON.", "done": True}
+    assert openai_calls == []
+
+
+def test_rag_failures_trip_circuit_and_skip_lookups(upstreams, monkeypatch):
+    rag_calls = []
+
+    def rag(request):
+        rag_calls.append(request.url.path)
+        return httpx.Response(503)
+
+    monkeypatch.setitem(main.upstream_clients._clients, "rag", httpx.AsyncClient(transport=httpx.MockTransport(rag)))
+    monkeypatch.setattr(main, "_circuits", CircuitBreakers([
+        CircuitBreaker("ollama"), CircuitBreaker("openai"), CircuitBreaker("cocoon"),
+        CircuitBreaker("rag", failure_threshold=2),
+    ]))
+
+    chat_lines("$DOGS price")  # batch lookup fails, then general RAG query fails
+    assert main._circuits.get("rag").state == OPEN
+    calls_before = len(rag_calls)
+
+    frames = [json.loads(line) for line in chat_lines("$DOGS price")]
+    assert len(rag_calls) == calls_before
+    assert frames[-1]["done"] is True
+
+
+def test_capabilities_report_circuit_state(upstreams):
+    main._circuits.get("rag").record_failure()
+    for _ in range(main._circuits.get("ollama").failure_threshold):
+        main._circuits.get("ollama").record_failure()
+
+    body = TestClient(main.app).get("/capabilities").json()
+
+    assert body["provider"] == "ollama" and body["features"]["ticker_mode"] is True
+    assert body["available"] == {"ollama": False, "rag": True}
+    assert body["circuits"]["rag"]["consecutive_failures"] == 1
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import main
+from conftest import chat_lines
+from degradation import DegradationController, FirstTokenLate, first_within
+
+
+def _controller(queued, available, **kwargs):
+    return DegradationController(queued.get, lambda name: available.get(name, True), **kwargs)
+
+
+def test_sheds_only_when_every_usable_provider_is_saturated():
+    queued = {"openai": 9, "ollama": 2}
+    controller = _controller(queued, {}, queue_depth=8)
+    assert controller.shed_reason(["openai", "ollama"]) is None  # ollama still has room
+    queued["ollama"] = 8
+    assert controller.shed_reason(["openai", "ollama"]) == "queue_depth"
+    assert _controller(queued, {"openai": False, "ollama": False}).shed_reason(["openai", "ollama"]) == "circuit_open"
+    assert _controller(queued, {"openai": False}, queue_depth=0).shed_reason(["openai", "ollama"]) is None
+    assert _controller(queued, {"ollama": False}, enabled=False).shed_reason(["ollama"]) is None
+
+
+def test_first_within_cancels_a_late_source():
+    cancelled = []
+
+    async def source():
+        try:
+            await asyncio.sleep(1.0)
+            yield "late"
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def consume():
+        return [item async for item in first_within(source(), 0.05)]
+
+    with pytest.raises(FirstTokenLate):
+        asyncio.run(consume())
+    assert cancelled == [True]
+
+
+def _deterministic_answer(final):
+    return final["done"] is True and "dog-meme internet culture" in final["response"]
+
+
+def test_open_circuit_serves_deterministic_ticker_answer(upstreams):
+    breaker = main._circuits.get("ollama")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    before = main._degraded_total.value(provider="ollama", model=main.OLLAMA_MODEL, reason="circuit_open")
+
+    prefix, final = (json.loads(line) for line in chat_lines("$DOGS"))
+
+    assert upstreams["ollama_calls"] == 0
+    assert final["response"].startswith(prefix["token"].strip()) and _deterministic_answer(final)
+    assert main._degraded_total.value(provider="ollama", model=main.OLLAMA_MODEL, reason="circuit_open") == before + 1
+    # Plain chat is not shed: it still goes to the provider (and fails fast on the open circuit).
+    chat_lines("hello there")
+
+
+def test_late_first_token_is_replaced_by_deterministic_answer(upstreams, monkeypatch):
+    async def slow_ollama(request):
+        upstreams["ollama_calls"] += 1
+        await asyncio.sleep(1.0)
+        return httpx.Response(200, content=json.dumps({"message": {"content": "too late"}, "done": True}) + "\n")
+
+    monkeypatch.setitem(
+        main.upstream_clients._clients, "ollama", httpx.AsyncClient(transport=httpx.MockTransport(slow_ollama))
+    )
+    monkeypatch.setattr(main, "_degradation", DegradationController(lambda name: 0, lambda name: True, ttft_deadline_s=0.1))
+    started = time.perf_counter()
+
+    lines = chat_lines("$DOGS")
+
+    assert time.perf_counter() - started < 0.8
+    assert _deterministic_answer(json.loads(lines[-1]))
+    assert main._degradation.stats()["degraded"] == {"ttft_deadline": 1}
+    # A degraded answer is not cached: the next request tries the model again.
+    assert main._ticker_response_cache.stats()["entries"] == 0
+
+
+def test_rejected_narrative_is_not_cached(upstreams):
+    upstreams["ollama_pieces"] = ["狗狗币是一个社区代币。"]  # CJK: rejected by the validator
+    calls = upstreams["ollama_calls"]
+
+    assert _deterministic_answer(json.loads(chat_lines("$DOGS")[-1]))
+    assert main._ticker_response_cache.stats()["entries"] == 0
+
+    upstreams["ollama_pieces"] = ["Dogs is a community meme ", "token on TON."]
+    final = json.loads(chat_lines("$DOGS")[-1])
+    assert upstreams["ollama_calls"] == calls + 2
+    assert "Dogs is a community meme token on TON." in final["response"]
@@ -0,0 +1,66 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from health_prober import HealthProber
+
+
+def _counting_checks(calls, delay=0.0):
+    async def rag():
+        calls.append("rag")
+        await asyncio.sleep(delay)
+        return {"status": "ok", "latency_ms": 5}
+
+    async def llm():
+        calls.append("llm")
+        raise RuntimeError("boom")
+
+    return {"rag": rag, "llm": llm}
+
+
+def test_background_loop_serves_snapshot_and_keeps_history():
+    calls = []
+
+    async def run():
+        prober = HealthProber(_counting_checks(calls), interval_s=0.01, history=3)
+        assert not prober.is_fresh()
+        prober.start()
+        await asyncio.sleep(0.06)
+        snapshot, fresh = prober.snapshot(), prober.is_fresh()
+        await prober.stop()
+        return prober, snapshot, fresh
+
+    prober, snapshot, fresh = asyncio.run(run())
+    assert fresh and not prober.running
+    assert snapshot["rag"] == {"status": "ok", "latency_ms": 5}
+    assert snapshot["llm"] == {"status": "error", "error": "boom"}
+    history = prober.history()
+    assert history["rag"]["samples"] == 3 and history["rag"]["latency_p50_ms"] == 5
+    assert history["llm"]["ok_ratio"] == 0.0
+    assert prober.probes >= 3
+
+
+def test_concurrent_refreshes_share_one_probe():
+    calls = []
+
+    async def run():
+        prober = HealthProber(_counting_checks(calls, delay=0.02))
+        return await asyncio.gather(*(prober.refresh() for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == ["rag", "llm"]
+    assert all(r == results[0] for r in results)
+
+
+def test_health_checks_live_until_prober_runs(monkeypatch):
+    calls = []
+    prober = HealthProber(_counting_checks(calls))
+    monkeypatch.setattr(main, "_health_prober", prober)
+    client = TestClient(main.app)
+
+    body = client.get("/health").json()
+    assert body["health_probe"]["source"] == "live"
+    assert body["dependencies"]["rag"]["status"] == "ok"
+    assert client.get("/health?fresh=1").json()["health_probe"]["probes"] == 2
+    assert calls == ["rag", "llm", "rag", "llm"]
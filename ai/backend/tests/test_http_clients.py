@@ -0,0 +1,50 @@
+import asyncio
+
+import httpx
+import pytest
+
+from http_clients import UpstreamClients
+
+
+def test_same_client_reused_per_upstream():
+    clients = UpstreamClients()
+    assert clients.get("ollama") is clients.get("ollama")
+    assert clients.get("ollama") is not clients.get("rag")
+
+
+def test_unknown_upstream_rejected():
+    with pytest.raises(ValueError):
+        UpstreamClients().get("nope")
+
+
+def test_per_upstream_pool_limits_override(monkeypatch):
+    monkeypatch.setenv("HTTP_POOL_MAX_CONNECTIONS", "50")
+    monkeypatch.setenv("OLLAMA_POOL_MAX_CONNECTIONS", "4")
+    clients = UpstreamClients()
+    clients.open()
+
+    stats = clients.stats()
+    assert set(stats) == {"ollama", "openai", "cocoon", "rag"}
+    assert stats["ollama"]["max_connections"] == 4
+    assert stats["rag"]["max_connections"] == 50
+    assert stats["ollama"]["connections"] == 0
+    assert stats["ollama"]["saturation"] == 0
+
+
+def test_aclose_closes_and_recreates_lazily():
+    clients = UpstreamClients()
+    first = clients.get("openai")
+    asyncio.run(clients.aclose())
+    assert first.is_closed
+    assert clients.stats() == {}
+    assert clients.get("openai") is not first
+
+
+def test_pool_stats_report_unavailable_without_pool_internals():
+    clients = UpstreamClients()
+    clients._clients["rag"] = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+
+    stats = clients.stats()["rag"]
+    assert stats["counters"] == "unavailable"
+    assert stats["connections"] is None and stats["saturation"] is None
+    assert clients.get("ollama") and clients.stats()["ollama"]["connections"] == 0
@@ -0,0 +1,67 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.messages import ALL_MESSAGES
+from message_analysis import MessageAnalyzer, analyze_text
+from ticker_scan import scan_ticker_text
+
+
+def _reference_language(text):
+    # Previous two-pass main._detect_language
+    if not text:
+        return "en"
+    cyrillic_count = sum(1 for c in text if "Ѐ" <= c <= "ӿ")
+    total_alpha = sum(1 for c in text if c.isalpha())
+    if total_alpha == 0:
+        return "en"
+    return "ru" if (cyrillic_count / total_alpha) > 0.3 else "en"
+
+
+def test_analysis_matches_separate_detectors():
+    for text in ALL_MESSAGES + ["", "12345", "Отвечай строго на русском.", "Answer only in English please"]:
+        analysis = analyze_text(text)
+        assert analysis.lang == _reference_language(text), text
+        assert analysis.scan == scan_ticker_text(text), text
+    assert analyze_text("Reply STRICTLY IN RUSSIAN").requested_lang == "ru"
+    assert analyze_text("Answer only in English").requested_lang == "en"
+    assert analyze_text("hello").requested_lang is None
+
+
+def test_repeated_messages_are_analyzed_once():
+    analyzer = MessageAnalyzer(max_entries=2)
+    first = analyzer.analyze("price of $DOGS")
+    assert analyzer.analyze("price of $DOGS") is first
+    analyzer.analyze("a")
+    analyzer.analyze("b")  # evicts the oldest entry
+    stats = analyzer.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["evictions"] == 1
+
+
+def test_chat_reuses_history_analysis_across_turns(upstreams, monkeypatch):
+    bodies = []
+    original = main.upstream_clients._clients["ollama"]._transport.handler
+
+    def ollama(request):
+        bodies.append(json.loads(request.content))
+        return original(request)
+
+    monkeypatch.setitem(main.upstream_clients._clients, "ollama", httpx.AsyncClient(transport=httpx.MockTransport(ollama)))
+    monkeypatch.setattr(main, "_message_analyzer", MessageAnalyzer())
+    history = [
+        {"role": "system", "content": "Answer strictly in English."},
+        {"role": "user", "content": "what about $DOGS?"},
+        {"role": "assistant", "content": "DOGS is a meme jetton."},
+        {"role": "user", "content": "how do wallets work?"},
+    ]
+    client = TestClient(main.app)
+    for _ in range(2):
+        client.post("/api/chat", headers={"X-API-Key": "test-key"}, json={"messages": history})
+
+    # Earlier ticker turn is stripped from the general-mode history.
+    assert [m["content"] for m in bodies[-1]["messages"]][-2:] == ["Answer strictly in English.", "how do wallets work?"]
+    stats = main._message_analyzer.stats()
+    assert stats["misses"] == 3  # system prompt + two user messages, first turn only
+    assert stats["hits"] >= 3
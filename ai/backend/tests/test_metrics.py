@@ -0,0 +1,69 @@
+import pytest
+
+from fastapi.testclient import TestClient
+
+import main
+from conftest import chat_lines
+from metrics import Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("stage_seconds", "Stage time.", ("provider", "outcome"), buckets=(0.1, 1.0))
+    hist.observe(0.05, provider="ollama", outcome="ok")
+    hist.observe(0.1, provider="ollama", outcome="ok")
+    hist.observe(3.0, provider="ollama", outcome="ok")
+    hist.observe(0.5, provider='a"b', outcome="error")
+
+    lines = hist.render()
+    assert lines[:2] == ["# HELP stage_seconds Stage time.", "# TYPE stage_seconds histogram"]
+    assert 'stage_seconds_bucket{provider="ollama",outcome="ok",le="0.1"} 2' in lines
+    assert 'stage_seconds_bucket{provider="ollama",outcome="ok",le="+Inf"} 3' in lines
+    assert 'stage_seconds_sum{provider="ollama",outcome="ok"} 3.15' in lines
+    assert 'stage_seconds_count{provider="a\\"b",outcome="error"} 1' in lines
+
+
+def test_histogram_caps_label_series():
+    hist = Histogram("m", "h", ("model",), max_series=2)
+    for model in ("a", "b", "c", "d"):
+        hist.observe(1.0, model=model)
+    assert hist.count(model="b") == 1 and hist.count(model="other") == 2
+
+
+def test_chat_stages_are_exported(upstreams):
+    before = main._ttft_seconds.count(provider="ollama", model=main.OLLAMA_MODEL, mode="ticker", outcome="ok")
+    chat_lines("$DOGS")
+    chat_lines("what is TON?")
+
+    labels = dict(provider="ollama", model=main.OLLAMA_MODEL)
+    assert main._ttft_seconds.count(**labels, mode="ticker", outcome="ok") == before + 1
+    assert main._ticker_detection_seconds.count(**labels, mode="ticker", outcome="found") >= 1
+    assert main._rag_lookup_seconds.count(**labels, mode="plain", outcome="empty") >= 1
+    assert main._generation_seconds.count(**labels, mode="plain", outcome="ok") >= 1
+
+    resp = TestClient(main.app).get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE ai_chat_stream_open_seconds histogram" in resp.text
+    assert 'ai_chat_stream_open_seconds_count{provider="ollama",model="%s",mode="plain",outcome="ok"}' % (
+        main.OLLAMA_MODEL
+    ) in resp.text
+    assert 'ai_chat_stream_responses_total{provider="ollama",mode="plain"}' in resp.text
+    assert main._stream_frames_total.value(provider="ollama", mode="ticker") >= 1
+    assert main._stream_bytes_total.value(provider="ollama", mode="plain") >= main._stream_frames_total.value(
+        provider="ollama", mode="plain"
+    )
+
+
+def test_counter_renders_and_rejects_decrements():
+    registry = MetricsRegistry()
+    counter = registry.counter("cancelled_total", "Cancelled.", ("stage",))
+    counter.inc(stage="preprocess")
+    counter.inc(2, stage="preprocess")
+    with pytest.raises(ValueError):
+        counter.inc(-1, stage="preprocess")
+    assert counter.value(stage="preprocess") == 3
+    assert registry.render().splitlines() == [
+        "# HELP cancelled_total Cancelled.",
+        "# TYPE cancelled_total counter",
+        'cancelled_total{stage="preprocess"} 3.0',
+    ]
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from benchmarks import ticker_narrative_reference as legacy
+from benchmarks.narratives import ALL_NARRATIVES
+from narrative_checks import NarrativeValidator, Stage, TICKER_NARRATIVE_STAGES
+
+EDGE_CASES = [
+    ("en", "", "DOGS", "   "),
+    ("en", "", "", "A meme about nothing in particular."),
+    ("en", "Dogs", "DOGS", "Supply is huge. Holders are many."),
+    ("en", "Dogs", "DOGS", "Dogs mirrors Binance  Smart\nChain memes."),
+    ("en", "Dogs", "DOGS", "Dogs is not Ethereum-based; dogecoinish vibes only."),
+    ("ru", "Dogs", "DOGS", "DOGS — мем про собак. Supply and holders are shown above."),
+    ("ru", "Dogs", "DOGS", "DOGS DOGS DOGS мем"),
+    ("ru", "Дог", "DOG", "Доги и коты в TON."),
+    ("de", "Dogs", "DOGS", "Dogs is a digital asset."),
+]
+
+_ALPHABET = "abcdeinorstuyADNOST .!?\n\tдогиэкосистемцифровTONsupply"
+
+
+def _assert_parity(validator, entry, ton_only):
+    lang, name, symbol, text = entry
+    fallback = f"{name or symbol} fallback"
+    verdict = validator.vet(text, lang, name, symbol, ton_only=ton_only)
+    got = verdict.text if verdict.ok else fallback
+    assert got == legacy.vet_ticker_narrative(text, lang, name, symbol, ton_only, fallback), entry
+
+
+@pytest.mark.parametrize("ton_only", [True, False])
+def test_pipeline_matches_legacy_checks(ton_only):
+    validator = NarrativeValidator()
+    for entry in ALL_NARRATIVES + EDGE_CASES:
+        _assert_parity(validator, entry, ton_only)
+
+
+def test_pipeline_matches_legacy_checks_on_random_text():
+    rng = random.Random(20)
+    validator = NarrativeValidator()
+    for _ in range(2000):
+        text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 60)))
+        _assert_parity(validator, (rng.choice(["en", "ru"]), "Dogs", "DOGS", text), rng.random() < 0.5)
+
+
+def test_first_failed_check_short_circuits_and_is_counted():
+    validator = NarrativeValidator()
+    verdict = validator.vet("HMSTR is a utility token used for transactions.", "en", "Hamster", "HMSTR", ton_only=True)
+    assert verdict.rejected_by == "utility_boilerplate" and verdict.text == ""
+    stats = validator.stats()
+    assert stats["runs"] == 1 and stats["rejected"] == 1
+    assert stats["stages"]["utility_boilerplate"]["rejected"] == 1
+    assert stats["stages"]["non_ton_chain"]["calls"] == 0  # never reached
+    assert stats["stages"]["latin_in_ru"]["calls"] == 0  # RU-only
+
+
+def test_stage_names_must_be_unique():
+    with pytest.raises(ValueError):
+        NarrativeValidator(list(TICKER_NARRATIVE_STAGES) + [Stage("cjk", "check", lambda n: False)])
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from ndjson_stream import NDJSONFrameWriter, StreamStats, flush_ticks
+
+
+def test_frames_match_json_dumps_wire_format():
+    writer = NDJSONFrameWriter()
+    for text in ["plain", "кириллица \"quoted\"\n", "emoji \U0001F436 \\ tab\t"]:
+        assert writer.token_frame(text) == (json.dumps({"token": text, "done": False}) + "\n").encode()
+        assert writer.response_frame(text) == (json.dumps({"response": text, "done": True}) + "\n").encode()
+        assert writer.error_frame(text) == (json.dumps({"error": text}) + "\n").encode()
+
+
+def test_tokens_coalesce_by_size_and_time():
+    now = [0.0]
+    writer = NDJSONFrameWriter(flush_interval_s=0.03, flush_chars=10, clock=lambda: now[0])
+
+    frames = [writer.push("a")]  # first token goes out immediately
+    frames += [writer.push("bb"), writer.push("cc")]  # buffered
+    frames.append(writer.push("dddddd"))  # 10 chars pending -> size flush
+    frames.append(writer.push("e"))
+    now[0] = 0.05
+    frames.append(writer.push("f"))  # interval elapsed -> time flush
+    frames.append(writer.push("g"))
+    frames.append(writer.flush())
+    frames.append(writer.flush())
+
+    tokens = [json.loads(f)["token"] if f else None for f in frames]
+    assert tokens == ["a", None, None, "bbccdddddd", None, "ef", None, "g", None]
+    assert writer.text == "abbccddddddefg"
+    assert writer.tokens == 7 and writer.frames == 4
+
+
+def test_buffered_tokens_are_flushed_while_upstream_stalls():
+    writer = NDJSONFrameWriter(flush_interval_s=0.01, flush_chars=100)
+    resume = asyncio.Event()
+    sent = []
+
+    async def upstream():
+        yield "a"
+        yield "b"
+        await resume.wait()  # stalls with "b" buffered
+        yield "c"
+
+    async def run():
+        async for piece in flush_ticks(upstream(), writer):
+            frame = writer.flush() if piece is None else writer.push(piece)
+            if frame:
+                sent.append(json.loads(frame)["token"])
+            if sent == ["a", "b"]:
+                resume.set()
+        sent.append(json.loads(writer.flush())["token"])
+
+    asyncio.run(asyncio.wait_for(run(), 1.0))
+    assert sent == ["a", "b", "c"]
+    assert writer.flush_due_in() is None
+
+
+def test_stream_stats_aggregate_per_response():
+    stats = StreamStats()
+    writer = NDJSONFrameWriter()
+    writer.push("hello")
+    writer.response_frame("hello")
+    stats.record(writer)
+    snapshot = stats.stats()
+    assert snapshot["responses"] == 1 and snapshot["frames"] == 2 and snapshot["tokens"] == 1
+    assert snapshot["bytes"] == writer.bytes
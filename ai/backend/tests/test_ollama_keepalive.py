@@ -0,0 +1,72 @@
+import asyncio
+import calendar
+import json
+
+import httpx
+import pytest
+
+from ollama_keepalive import OllamaKeepAlive, keep_alive_seconds, parse_active_hours
+
+
+def _utc(hour):
+    return float(calendar.timegm((2026, 1, 5, hour, 30, 0)))
+
+
+def test_active_hours_parse_and_wrap():
+    assert parse_active_hours("") is None
+    assert parse_active_hours("7-23") == (7, 23)
+    with pytest.raises(ValueError):
+        parse_active_hours("7")
+
+    keeper = OllamaKeepAlive(lambda: None, "http://o", ["m"], active_hours=(22, 6))
+    assert keeper.in_active_hours(_utc(23)) and keeper.in_active_hours(_utc(5))
+    assert not keeper.in_active_hours(_utc(12))
+    assert keep_alive_seconds("30m") == 1800 and keep_alive_seconds("-1") is None
+
+
+def test_warm_loads_models_and_reports_state():
+    requests = []
+    now = [_utc(10)]
+
+    def handler(request):
+        body = json.loads(request.content)
+        requests.append(body)
+        if body["model"] == "missing":
+            return httpx.Response(404, json={"error": "model not found"})
+        return httpx.Response(200, json={"done": True, "load_duration": 2_500_000_000})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    keeper = OllamaKeepAlive(
+        lambda: client, "http://o/", ["qwen", "missing", "qwen"], keep_alive="10m", clock=lambda: now[0]
+    )
+
+    assert asyncio.run(keeper.warm_all()) == 1
+    assert requests[0] == {"model": "qwen", "prompt": "", "stream": False, "keep_alive": "10m"}
+    models = keeper.stats()["models"]
+    assert models["qwen"]["state"] == "loaded" and models["qwen"]["last_load_ms"] == 2500
+    assert models["missing"]["state"] == "error"
+
+    now[0] += 11 * 60  # keep_alive ran out without a ping
+    assert keeper.model_state("qwen") == "expired"
+
+
+def test_background_loop_pings_only_in_active_hours():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"done": True})
+
+    async def run(hour):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        keeper = OllamaKeepAlive(
+            lambda: client, "http://o", ["qwen"], interval_s=0.01, active_hours=(8, 20), clock=lambda: _utc(hour)
+        )
+        keeper.start()
+        await asyncio.sleep(0.05)
+        await keeper.stop()
+
+    asyncio.run(run(3))
+    assert calls == ["/api/generate"]  # startup warm-up only
+    asyncio.run(run(12))
+    assert len(calls) > 3
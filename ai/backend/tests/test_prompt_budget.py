@@ -0,0 +1,118 @@
+import json
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from prompt_budget import assemble_prompt, dedupe_snippets, estimate_tokens, message_tokens, truncate_to_tokens
+
+
+def _turn(role, words):
+    return {"role": role, "content": " ".join(f"{role}{i}" for i in range(words))}
+
+
+def test_estimate_and_truncate():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("привет") == 3
+    text = "first part. " * 50 + "the end"
+    cut = truncate_to_tokens(text, 20)
+    assert cut.startswith("…") and cut.endswith("the end") and estimate_tokens(cut) <= 20
+    assert truncate_to_tokens("short", 20) == "short"
+
+
+def test_dedupe_drops_repeats_and_contained_snippets():
+    snippets = [
+        "TON is a layer-1 blockchain designed by Telegram.",
+        "",
+        "TON is a layer-1 blockchain designed by Telegram.",
+        "DOGS is a meme jetton.",
+        "Intro. TON is a layer-1 blockchain designed by Telegram. It uses sharding.",
+    ]
+    assert dedupe_snippets(snippets) == [
+        "Intro. TON is a layer-1 blockchain designed by Telegram. It uses sharding.",
+        "DOGS is a meme jetton.",
+    ]
+
+
+def test_oldest_turns_go_first_and_pinned_messages_stay():
+    system = [{"role": "system", "content": "Be brief."}]
+    history = [
+        {"role": "system", "content": "Reply in English."},
+        _turn("user", 40),
+        _turn("assistant", 40),
+        _turn("user", 40),
+        _turn("assistant", 40),
+        {"role": "user", "content": "And now?"},
+    ]
+    budget = sum(message_tokens(m) for m in system + history[:1] + history[-3:]) + 30
+
+    messages, report = assemble_prompt(system, history, budget)
+
+    assert messages[:2] == [system[0], history[0]]
+    assert messages[-3:] == history[-3:]
+    assert messages[2]["content"].startswith("…")  # boundary turn keeps its recent part
+    assert report.turns_in == 6 and report.turns_kept == 5 and report.turns_truncated == 1
+    assert report.used <= budget and report.trimmed
+
+
+def test_context_is_deduped_and_capped_by_share():
+    def render(snippets):
+        return {"role": "system", "content": "CONTEXT:\n" + "\n---\n".join(snippets)}
+
+    context = ["alpha " * 30, "alpha " * 30, "beta " * 30, "gamma " * 30]
+    messages, report = assemble_prompt(
+        [], [{"role": "user", "content": "q"}], 200, context=context, render_context=render, context_share=0.5
+    )
+
+    assert report.snippets_in == 4 and report.snippets_deduped == 1 and report.snippets_kept == 2
+    assert messages[0]["content"].count("---") == 1 and messages[-1]["content"] == "q"
+
+
+def test_chat_fits_history_into_model_budget(upstreams, monkeypatch):
+    bodies = []
+    original = main.upstream_clients._clients["ollama"]._transport.handler
+
+    def ollama(request):
+        bodies.append(json.loads(request.content))
+        return original(request)
+
+    monkeypatch.setitem(main.upstream_clients._clients, "ollama", httpx.AsyncClient(transport=httpx.MockTransport(ollama)))
+    monkeypatch.setattr(main, "PROMPT_TOKEN_BUDGETS", {main.OLLAMA_MODEL: 120})
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "words " * 40} for i in range(6)]
+    history.append({"role": "user", "content": "hello"})
+
+    TestClient(main.app).post("/api/chat", headers={"X-API-Key": "test-key"}, json={"messages": history})
+
+    sent = bodies[0]["messages"]
+    assert sent[-1] == {"role": "user", "content": "hello"}
+    assert len(sent) < len(history) and not any(m["content"].startswith("turn 0") for m in sent)
+
+
+
+def test_history_fits_the_smallest_budget_in_the_provider_chain(upstreams, monkeypatch):
+    bodies = []
+    original = main.upstream_clients._clients["ollama"]._transport.handler
+
+    def ollama(request):
+        bodies.append(json.loads(request.content))
+        return original(request)
+
+    def openai(request):
+        return httpx.Response(503, json={"error": {"message": "overloaded"}})
+
+    for name, handler in (("ollama", ollama), ("openai", openai)):
+        monkeypatch.setitem(main.upstream_clients._clients, name, httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(main, "OPENAI_SWITCH", True)
+    monkeypatch.setattr(main, "OPENAI_KEY", "sk-test")
+    monkeypatch.setattr(main, "_provider_router", main.ProviderRouter())
+    # Only the Ollama fallback has a small window; OpenAI's default budget fits everything.
+    monkeypatch.setattr(main, "PROMPT_TOKEN_BUDGETS", {main.OLLAMA_MODEL: 120})
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "words " * 40} for i in range(6)]
+    history.append({"role": "user", "content": "hello"})
+
+    TestClient(main.app).post("/api/chat", headers={"X-API-Key": "test-key"}, json={"messages": history})
+
+    sent = bodies[0]["messages"]
+    assert sent[-1] == {"role": "user", "content": "hello"}
+    assert len(sent) < len(history) and not any(m["content"].startswith("turn 0") for m in sent)
@@ -0,0 +1,155 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import prompt_i18n
+
+TEMPLATE = "Reply ONLY in Russian.\nDescribe the TON jetton."
+KWARGS = dict(
+    template_en=TEMPLATE,
+    target_lang="ru",
+    provider="ollama",
+    ollama_url="http://ollama.test",
+    ollama_model="m",
+    openai_api_key=None,
+    openai_model="gpt",
+)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fresh catalog plus a fake Ollama that "translates" after a short delay."""
+    monkeypatch.setattr(prompt_i18n, "_PROMPT_CACHE", {})
+    monkeypatch.setattr(prompt_i18n, "_CATALOG_PATH", None)
+    monkeypatch.setattr(prompt_i18n, "_failed_until", {})
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await asyncio.sleep(0.02)
+        return httpx.Response(200, json={"message": {"content": "Отвечай по-русски. __KEEP_0__ __KEEP_1__"}})
+
+    return calls, lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_nowait_returns_english_then_fills_in_background(llm):
+    calls, make_client = llm
+
+    async def run():
+        client = make_client()
+        first = prompt_i18n.localize_prompt_nowait(**KWARGS, client=client)
+        second = prompt_i18n.localize_prompt_nowait(**KWARGS, client=client)
+        await asyncio.gather(*prompt_i18n._background_fills)
+        return first, second, prompt_i18n.localize_prompt_nowait(**KWARGS, client=client)
+
+    first, second, third = asyncio.run(run())
+    assert first == second == TEMPLATE
+    assert third == "Отвечай по-русски. TON jetton"
+    assert calls == ["/api/chat"]
+
+
+def test_concurrent_translations_share_one_call(llm):
+    calls, make_client = llm
+
+    async def run():
+        client = make_client()
+        return await asyncio.gather(
+            *(prompt_i18n.localize_prompt_with_model(**KWARGS, client=client) for _ in range(5))
+        )
+
+    assert set(asyncio.run(run())) == {"Отвечай по-русски. TON jetton"}
+    assert calls == ["/api/chat"]
+
+
+def test_translations_run_inside_the_gate(llm, monkeypatch):
+    calls, make_client = llm
+    entered = []
+
+    async def gate(provider, call):
+        entered.append(provider)
+        return await call()
+
+    monkeypatch.setattr(prompt_i18n, "_translation_gate", None)
+    prompt_i18n.set_translation_gate(gate)
+
+    localized = asyncio.run(prompt_i18n.localize_prompt_with_model(**KWARGS, client=make_client()))
+
+    assert localized.startswith("Отвечай") and entered == ["ollama"] and calls == ["/api/chat"]
+
+
+def test_catalog_persists_across_restarts(llm, tmp_path, monkeypatch):
+    calls, make_client = llm
+    path = tmp_path / "catalog.json"
+    prompt_i18n.configure_prompt_catalog(path)
+
+    filled = asyncio.run(
+        prompt_i18n.warm_prompt_catalog(
+            [(TEMPLATE, "ru"), (TEMPLATE, "en")],
+            **{k: v for k, v in KWARGS.items() if k not in ("template_en", "target_lang")},
+            client=make_client(),
+        )
+    )
+    assert filled == 1
+    assert len(json.loads(path.read_text(encoding="utf-8"))["entries"]) == 1
+
+    # A fresh process loads the catalog and never calls the LLM.
+    monkeypatch.setattr(prompt_i18n, "_PROMPT_CACHE", {})
+    assert prompt_i18n.configure_prompt_catalog(path) == 1
+    assert asyncio.run(prompt_i18n.localize_prompt_with_model(**KWARGS, client=make_client())) != TEMPLATE
+    assert calls == ["/api/chat"]
+
+
+def test_failed_translation_backs_off(monkeypatch):
+    monkeypatch.setattr(prompt_i18n, "_PROMPT_CACHE", {})
+    monkeypatch.setattr(prompt_i18n, "_failed_until", {})
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(500)
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        assert prompt_i18n.localize_prompt_nowait(**KWARGS, client=client) == TEMPLATE
+        await asyncio.gather(*prompt_i18n._background_fills)
+        assert prompt_i18n.localize_prompt_nowait(**KWARGS, client=client) == TEMPLATE
+        assert not prompt_i18n._background_fills
+
+    asyncio.run(run())
+    assert calls == ["/api/chat"]
+
+
+def test_url_containing_protected_word_round_trips():
+    # Regression: "ton" inside the URL used to be masked first, then the URL
+    # (placeholder included) was masked again and restore leaked "__KEEP_0__".
+    text = "See https://ton.org/docs about the TON jetton {SYMBOL}."
+    masked, protected = prompt_i18n._protect_terms(text)
+    assert masked == "See __KEEP_0__ about the __KEEP_1__ __KEEP_2__ __KEEP_3__."
+    assert protected["__KEEP_0__"] == "https://ton.org/docs"
+    assert prompt_i18n._restore_terms(masked, protected) == text
+
+
+def test_restore_handles_reordered_and_unknown_placeholders():
+    masked, protected = prompt_i18n._protect_terms("DOGS " * 12)
+    assert len(protected) == 12
+    translated = "__KEEP_11__ __KEEP_1__ __KEEP_10__ __KEEP_99__"
+    assert prompt_i18n._restore_terms(translated, protected) == "DOGS DOGS DOGS __KEEP_99__"
+
+
+def test_speculative_prefetch_is_not_counted(llm, monkeypatch):
+    calls, make_client = llm
+    monkeypatch.setattr(prompt_i18n, "_catalog_stats", {"hits": 0, "misses": 0, "fills": 0, "failures": 0})
+
+    async def run():
+        client = make_client()
+        prompt_i18n.localize_prompt_nowait(**KWARGS, client=client, count=False)
+        await asyncio.gather(*prompt_i18n._background_fills)
+        prompt_i18n.localize_prompt_nowait(**KWARGS, client=client, count=False)
+        return prompt_i18n.localize_prompt_nowait(**KWARGS, client=client)
+
+    assert asyncio.run(run()) == "Отвечай по-русски. TON jetton"
+    assert calls == ["/api/chat"]
+    stats = prompt_i18n.prompt_catalog_stats()
+    assert (stats["hits"], stats["misses"], stats["fills"]) == (1, 0, 1)
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from provider_router import ProviderRouter
+from shared_stream import SharedStreams
+
+
+def _provider(events, name, delay=0.0, pieces=("a", "b"), error=None):
+    async def gen():
+        try:
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            for piece in pieces:
+                yield f"{name}:{piece}"
+        except asyncio.CancelledError:
+            events.append(f"{name} cancelled")
+            raise
+
+    return name, gen
+
+
+def _collect(stream):
+    async def run():
+        return [piece async for piece in stream]
+
+    return asyncio.run(run())
+
+
+def _router(**kwargs):
+    kwargs.setdefault("default_delay_s", 0.05)
+    kwargs.setdefault("min_delay_s", 0.0)
+    return ProviderRouter(**kwargs)
+
+
+def test_fast_primary_is_not_hedged():
+    events = []
+    router = _router()
+    stream = router.stream([_provider(events, "openai"), _provider(events, "ollama")])
+    assert _collect(stream) == ["openai:a", "openai:b"]
+    assert (stream.provider, stream.hedged) == ("openai", False)
+    assert router.tracker("ollama").requests == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    events = []
+    router = _router()
+    stream = router.stream([_provider(events, "openai", delay=1.0), _provider(events, "ollama", delay=0.01)])
+    assert _collect(stream) == ["ollama:a", "ollama:b"]
+    assert (stream.provider, stream.hedged) == ("ollama", True)
+    assert events == ["openai cancelled"]
+    assert router.tracker("ollama").hedges_won == 1
+
+
+def test_primary_wins_race_after_hedge_started():
+    events = []
+    router = _router()
+    stream = router.stream([_provider(events, "openai", delay=0.08), _provider(events, "ollama", delay=1.0)])
+    assert _collect(stream) == ["openai:a", "openai:b"]
+    assert stream.hedged and events == ["ollama cancelled"]
+
+
+def test_failure_before_first_token_fails_over_immediately():
+    events = []
+    router = _router(default_delay_s=5.0)
+    stream = router.stream([_provider(events, "openai", error=RuntimeError("503")), _provider(events, "ollama")])
+    assert _collect(stream) == ["ollama:a", "ollama:b"]
+    assert (stream.provider, stream.hedged) == ("ollama", False)
+    assert router.tracker("openai").error_rate() == 1.0
+
+
+def test_last_error_raised_when_every_provider_fails():
+    events = []
+    stream = _router().stream([
+        _provider(events, "openai", error=RuntimeError("first")),
+        _provider(events, "ollama", error=RuntimeError("second")),
+    ])
+    with pytest.raises(RuntimeError, match="second"):
+        _collect(stream)
+
+
+def test_hedge_deadline_learned_from_ttft_percentile():
+    router = ProviderRouter(percentile=90, min_samples=10, default_delay_s=2.0, min_delay_s=0.1, max_delay_s=1.0)
+    tracker = router.tracker("ollama")
+    for ms in range(10, 110, 10):
+        tracker.record_ttft(ms / 1000.0)
+    assert router.hedge_delay("ollama") == pytest.approx(0.1)
+    assert router.hedge_delay("openai") == 1.0  # no samples: default, clamped to max
+
+    tracker.record_ttft(0.45)
+    assert router.hedge_delay("ollama") == pytest.approx(0.1)
+    for _ in range(5):
+        tracker.record_ttft(0.45)
+    assert router.hedge_delay("ollama") == pytest.approx(0.45)
+
+
+def test_replayed_shared_streams_feed_no_latency_samples():
+    async def run():
+        streams = SharedStreams()
+        router = _router(hedging=False)
+
+        async def upstream():
+            await asyncio.sleep(0.02)
+            yield "ollama:a"
+
+        async def request():
+            return [piece async for piece in router.stream([("ollama", lambda: streams.subscribe("k", upstream))])]
+
+        return router, await asyncio.gather(request(), request(), request())
+
+    router, results = asyncio.run(run())
+    assert results == [["ollama:a"]] * 3
+    tracker = router.tracker("ollama")
+    assert tracker.requests == 3 and tracker.samples == 1
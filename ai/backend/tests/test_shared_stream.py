@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import httpx
+
+import main
+from shared_stream import SharedStreams
+
+
+def test_late_joiner_replays_the_whole_stream():
+    async def run():
+        streams = SharedStreams()
+        runs = []
+
+        async def upstream():
+            runs.append(1)
+            for piece in ("Dogs ", "is ", "a ", "meme"):
+                yield piece
+                await asyncio.sleep(0.01)
+
+        async def read(delay):
+            await asyncio.sleep(delay)
+            return [piece async for piece in streams.subscribe("DOGS", upstream)]
+
+        results = await asyncio.gather(read(0), read(0.025))
+        return streams, runs, results
+
+    streams, runs, results = asyncio.run(run())
+    assert results == [["Dogs ", "is ", "a ", "meme"]] * 2
+    assert len(runs) == 1
+    stats = streams.stats()
+    assert stats["in_flight"] == 0 and stats["joined"] == 1 and stats["replayed_items"] >= 2
+
+
+def test_upstream_is_cancelled_only_when_the_last_subscriber_leaves():
+    async def run():
+        streams = SharedStreams()
+        closed = asyncio.Event()
+
+        async def upstream():
+            try:
+                while True:
+                    yield "token"
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        first = streams.subscribe("k", upstream)
+        second = streams.subscribe("k", upstream)
+        assert await first.__anext__() == "token"
+        await second.__anext__()
+        await first.aclose()
+        await asyncio.sleep(0.03)
+        assert not closed.is_set() and "k" in streams
+        await second.__anext__()
+        await second.aclose()
+        await asyncio.wait_for(closed.wait(), 1.0)
+        return streams
+
+    streams = asyncio.run(run())
+    assert "k" not in streams and streams.stats()["cancelled"] == 1
+
+
+def test_failure_reaches_every_subscriber():
+    async def run():
+        streams = SharedStreams()
+
+        async def upstream():
+            yield "partial"
+            raise RuntimeError("upstream died")
+
+        async def read():
+            pieces = []
+            try:
+                async for piece in streams.subscribe("k", upstream):
+                    pieces.append(piece)
+            except RuntimeError as e:
+                pieces.append(str(e))
+            return pieces
+
+        return await asyncio.gather(read(), read())
+
+    assert asyncio.run(run()) == [["partial", "upstream died"]] * 2
+
+
+def test_identical_concurrent_chats_share_one_generation(upstreams, monkeypatch):
+    async def slow_ollama(request):
+        upstreams["ollama_calls"] += 1
+        await asyncio.sleep(0.05)
+        lines = [{"message": {"content": "Hello there!"}, "done": False}, {"done": True}]
+        return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines))
+
+    monkeypatch.setitem(
+        main.upstream_clients._clients, "ollama", httpx.AsyncClient(transport=httpx.MockTransport(slow_ollama))
+    )
+    monkeypatch.setattr(main, "CHAT_DEDUP_SWITCH", True)
+    monkeypatch.setattr(main, "_shared_streams", SharedStreams())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://ai.test") as client:
+            async def post(text):
+                resp = await client.post(
+                    "/api/chat",
+                    headers={"X-API-Key": "test-key"},
+                    json={"messages": [{"role": "user", "content": text}]},
+                )
+                return [json.loads(line) for line in resp.text.splitlines()]
+
+            return await asyncio.gather(post("hello"), post("hello"), post("hello"), post("good morning"))
+
+    first, second, third, other = asyncio.run(run())
+    assert first == second == third and first[-1] == {"response": "Hello there!", "done": True}
+    assert other[-1]["done"] is True
+    assert upstreams["ollama_calls"] == 2
+    assert main._shared_streams.stats()["joined"] == 2
+
+
+def test_subscriber_closed_before_reading_releases_the_flight():
+    async def run():
+        streams = SharedStreams()
+        closed = asyncio.Event()
+
+        async def upstream():
+            try:
+                while True:
+                    yield "token"
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.set()
+
+        subscription = streams.subscribe("k", upstream)
+        await asyncio.sleep(0.02)  # the upstream is streaming into the buffer
+        await subscription.aclose()
+        await asyncio.wait_for(closed.wait(), 1.0)
+        assert "k" not in streams
+
+        closed.clear()
+        subscription = streams.subscribe("k", upstream)
+        await asyncio.sleep(0.02)
+        del subscription  # dropped without being read or closed
+        await asyncio.wait_for(closed.wait(), 1.0)
+        return streams
+
+    streams = asyncio.run(run())
+    assert streams.stats()["cancelled"] == 2 and streams.stats()["in_flight"] == 0
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "DOGS"
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.call("DOGS", work) for _ in range(5)))
+        return flights, results
+
+    flights, results = asyncio.run(run())
+    assert results == ["DOGS"] * 5
+    assert len(runs) == 1
+    assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 4}
+
+
+def test_shared_task_survives_until_last_waiter_leaves():
+    async def run():
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(10)
+
+        first = flights.call("k", work)
+        second = flights.call("k", work)
+        await started.wait()
+        shared = flights._calls["k"].task
+
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not shared.cancelled()
+
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await shared
+        assert "k" not in flights
+
+    asyncio.run(run())
+
+
+def test_call_many_batches_missing_keys_and_joins_in_flight():
+    batches = []
+
+    async def run():
+        flights = SingleFlight()
+        gate = asyncio.Event()
+
+        async def single():
+            await gate.wait()
+            return "single-A"
+
+        async def batch(keys):
+            batches.append(list(keys))
+            await gate.wait()
+            return {k: f"batch-{k}" for k in keys}
+
+        a = flights.call("A", single)
+        waiters = flights.call_many(["A", "B", "C"], batch)
+        gate.set()
+        return await a, {k: await w for k, w in waiters.items()}
+
+    single_result, many = asyncio.run(run())
+    assert batches == [["B", "C"]]
+    assert single_result == "single-A"
+    assert many == {"A": "single-A", "B": "batch-B", "C": "batch-C"}
@@ -0,0 +1,166 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import main
+from ttl_cache import TTLCache
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    """Route the pooled RAG client to an in-process handler and reset caches."""
+    calls = []
+    tokens = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/tokens/batch":
+            symbols = json.loads(request.content)["symbols"]
+            return httpx.Response(200, json={"results": {
+                s: {"status": "ok", "data": tokens[s]} if s in tokens else {"status": "not_found"}
+                for s in symbols
+            }})
+        symbol = request.url.path.rsplit("/", 1)[-1]
+        if symbol in tokens:
+            return httpx.Response(200, json=tokens[symbol])
+        return httpx.Response(200, json={"error": "not_found", "symbol": symbol})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(main.upstream_clients._clients, "rag", client)
+    monkeypatch.setattr(main, "RAG_URL", "http://rag.test")
+    monkeypatch.setattr(main, "_ticker_cache", TTLCache(64))
+    monkeypatch.setattr(main, "_rag_batch_unsupported_until", 0.0)
+    return calls, tokens
+
+
+def test_valid_ticker_is_cached(rag):
+    calls, tokens = rag
+    tokens["DOGS"] = {"symbol": "DOGS", "name": "Dogs"}
+
+    symbol, data, error = asyncio.run(main.detect_ticker_via_rag("$DOGS", "http://rag.test"))
+    assert (symbol, error) == ("DOGS", None)
+    assert data["name"] == "Dogs"
+
+    asyncio.run(main.detect_ticker_via_rag("$DOGS", "http://rag.test"))
+    assert calls == ["/tokens/batch"]
+
+
+def test_miss_is_negative_cached(rag):
+    calls, _ = rag
+    assert asyncio.run(main.detect_ticker_via_rag("$NOPE", "http://rag.test")) == (None, None, "not_found")
+    assert main._get_cached_ticker("NOPE") == (False, None)
+
+
+def test_stale_entry_is_served_and_refreshed(rag, monkeypatch):
+    calls, tokens = rag
+    tokens["DOGS"] = {"symbol": "DOGS", "name": "Dogs v2"}
+    now = [0.0]
+    cache = TTLCache(64, clock=lambda: now[0])
+    monkeypatch.setattr(main, "_ticker_cache", cache)
+    cache.set("DOGS", (True, {"symbol": "DOGS", "name": "Dogs v1"}), ttl_s=1, stale_ttl_s=60)
+    now[0] = 5.0
+
+    async def run():
+        result = await main.detect_ticker_via_rag("$DOGS", "http://rag.test")
+        await asyncio.gather(*main._ticker_refresh_tasks.values())
+        return result
+
+    symbol, data, _ = asyncio.run(run())
+    assert data["name"] == "Dogs v1"
+    assert calls == ["/tokens/DOGS"]
+    assert cache.get("DOGS").value[1]["name"] == "Dogs v2"
+
+
+def _slow_rag(monkeypatch, delays, tokens):
+    """Pre-batch RAG stub whose per-symbol latency is controlled by ``delays``."""
+    state = {"active": 0, "peak": 0, "finished": []}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(405)
+        symbol = request.url.path.rsplit("/", 1)[-1]
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delays.get(symbol, 0.0))
+        finally:
+            state["active"] -= 1
+        state["finished"].append(symbol)
+        if symbol in tokens:
+            return httpx.Response(200, json=tokens[symbol])
+        return httpx.Response(404)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(main.upstream_clients._clients, "rag", client)
+    monkeypatch.setattr(main, "_ticker_cache", TTLCache(64))
+    monkeypatch.setattr(main, "_rag_batch_unsupported_until", 0.0)
+    return state
+
+
+def test_highest_scored_valid_symbol_wins_even_if_slower(monkeypatch):
+    # "$AAA" outranks plain uppercase "BBB"; BBB answers first but must not win.
+    tokens = {"AAA": {"symbol": "AAA"}, "BBB": {"symbol": "BBB"}}
+    _slow_rag(monkeypatch, {"AAA": 0.05, "BBB": 0.0}, tokens)
+
+    symbol, _, error = asyncio.run(main.detect_ticker_via_rag("$AAA vs BBB", "http://rag.test"))
+    assert (symbol, error) == ("AAA", None)
+
+
+def test_lower_priority_lookups_cancelled_after_winner(monkeypatch):
+    tokens = {"AAA": {"symbol": "AAA"}, "BBB": {"symbol": "BBB"}}
+    state = _slow_rag(monkeypatch, {"AAA": 0.0, "BBB": 0.5}, tokens)
+
+    async def run():
+        result = await main.detect_ticker_via_rag("$AAA vs BBB", "http://rag.test")
+        await asyncio.sleep(0.01)
+        return result
+
+    assert asyncio.run(run())[0] == "AAA"
+    assert state["finished"] == ["AAA"]
+    assert main._get_cached_ticker("BBB") is None
+
+
+def test_fan_out_limit_and_negative_cache(monkeypatch):
+    monkeypatch.setattr(main, "TICKER_LOOKUP_CONCURRENCY", 2)
+    state = _slow_rag(monkeypatch, {s: 0.01 for s in ("AAA", "BBB", "CCC", "DDD")}, {})
+
+    result = asyncio.run(main.detect_ticker_via_rag("AAA BBB CCC DDD", "http://rag.test"))
+    assert result == (None, None, "not_found")
+    assert state["peak"] == 2
+    assert all(main._get_cached_ticker(s) == (False, None) for s in ("AAA", "BBB", "CCC", "DDD"))
+
+
+def test_uncached_candidates_verified_in_one_batch(rag):
+    calls, tokens = rag
+    tokens["BBB"] = {"symbol": "BBB"}
+    main._cache_ticker("CCC", False)
+
+    symbol, _, error = asyncio.run(main.detect_ticker_via_rag("AAA BBB CCC", "http://rag.test"))
+    assert (symbol, error) == ("BBB", None)
+    assert calls == ["/tokens/batch"]
+    assert main._get_cached_ticker("AAA") == (False, None)
+
+
+def test_batch_unsupported_is_remembered(monkeypatch):
+    _slow_rag(monkeypatch, {}, {"AAA": {"symbol": "AAA"}})
+
+    assert asyncio.run(main.detect_ticker_via_rag("$AAA", "http://rag.test"))[0] == "AAA"
+    assert main._rag_batch_unsupported_until > 0
+
+
+def test_concurrent_requests_for_same_symbol_share_one_rag_call(rag, monkeypatch):
+    calls, tokens = rag
+    tokens["DOGS"] = {"symbol": "DOGS"}
+    monkeypatch.setattr(main, "_ticker_flights", main.SingleFlight())
+
+    async def run():
+        return await asyncio.gather(
+            *(main.detect_ticker_via_rag("$DOGS", "http://rag.test") for _ in range(10))
+        )
+
+    results = asyncio.run(run())
+    assert {r[0] for r in results} == {"DOGS"}
+    assert calls == ["/tokens/batch"]
+    assert main._ticker_cache.stats()["entries"] == 1
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from benchmarks import ticker_scan_reference as legacy
+from benchmarks.messages import ALL_MESSAGES
+from ticker_scan import scan_ticker_text
+
+EDGE_CASES = [
+    "",
+    "   ",
+    "$",
+    "$ ",
+    "$$DOGS",
+    "$ dogs",
+    "$dogs_v2",
+    "pay $5 for DOGS",
+    "$KKA and KKA",  # Kelvin sign folds to "k" under IGNORECASE
+    "ABC123DEFGHIJ long token",
+    "(DOGS) [NOT] {TON} 'HMSTR' \"CATI\"",
+    "dogs? DOGS? Dogs.",
+    "TONUSD tonusd TONUSDT",
+    "ok",
+    "42",
+    "the",
+    "token dogs",
+    "dogs\tтокен",
+    "монета not",
+]
+
+_ALPHABET = "aAbBdDgGnNoOsStTuU019 $$()[]'\"?.,;!_-\tтокенцаDOGS"
+
+
+def _assert_parity(text):
+    scan = scan_ticker_text(text)
+    assert list(scan.candidates) == legacy._extract_ticker_candidates(text), text
+    assert scan.explicit_signal == legacy._has_explicit_ticker_signal(text), text
+    assert scan.strong_context == legacy._is_ticker_context_strong(text), text
+
+
+@pytest.mark.parametrize("text", ALL_MESSAGES + EDGE_CASES)
+def test_matches_legacy_helpers(text):
+    _assert_parity(text)
+
+
+def test_matches_legacy_helpers_on_random_text():
+    rng = random.Random(6)
+    words = ["DOGS", "dogs", "token", "TON", "$NOT", "цена", "of", "THE", "HMSTR", "x1", "(CATI)"]
+    for _ in range(3000):
+        if rng.random() < 0.5:
+            text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 40)))
+        else:
+            text = rng.choice(" ,$(").join(rng.choice(words) for _ in range(rng.randint(1, 8)))
+        _assert_parity(text)
+
+
+def test_scan_reports_scores_and_dollar_symbols():
+    scan = scan_ticker_text("price of $DOGS vs (STON)?")
+    assert scan.candidates[:2] == ("DOGS", "STON")
+    assert dict(scan.scores)["DOGS"] == 17
+    assert scan.dollar_symbols == {"DOGS"}
+    assert scan.has_context and scan.strong_context and scan.explicit_signal
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import main
+from conftest import chat_lines
+from trending import FRESH, WARMED, NarrativeWarmer, TrendingSymbols
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scores_decay_so_recent_traffic_ranks_first():
+    clock = FakeClock()
+    trending = TrendingSymbols(half_life_s=60, max_symbols=2, clock=clock)
+    for _ in range(4):
+        trending.record("dogs")
+    clock.now += 120  # DOGS decays to 1.0
+    trending.record("NOT")
+    trending.record("NOT")
+
+    assert [symbol for symbol, _ in trending.top(5)] == ["NOT", "DOGS"]
+    assert trending.top(5, min_score=1.5) == [("NOT", 2.0)]
+    trending.record("TON")  # evicts the coldest symbol
+    assert sorted(symbol for symbol, _ in trending.top(5)) == ["NOT", "TON"]
+
+
+def test_warmer_yields_to_live_traffic():
+    trending = TrendingSymbols()
+    for symbol in ("DOGS", "DOGS", "NOT", "NOT"):
+        trending.record(symbol)
+    calls = []
+    idle = iter([True, True, False])
+
+    async def refresh(symbol):
+        calls.append(("refresh", symbol))
+
+    async def warm(symbol, lang):
+        calls.append((symbol, lang))
+        return WARMED
+
+    warmer = NarrativeWarmer(trending, refresh, warm, lambda: next(idle), languages=["en", "ru"], min_score=1.5)
+
+    assert asyncio.run(warmer.run_once()) == 1
+    assert len(calls) == 2 and calls[0][0] == "refresh"
+    assert warmer.stats()["deferred_busy"] == 1
+
+
+def _warmer():
+    return NarrativeWarmer(
+        main._trending, main._refresh_ticker, main._warm_ticker_narrative, main._providers_idle,
+        languages=["en"], min_score=1.5,
+    )
+
+
+def test_warmed_symbol_is_served_from_cache(upstreams, monkeypatch):
+    monkeypatch.setattr(main, "_trending", TrendingSymbols())
+    chat_lines("$DOGS")
+    chat_lines("$DOGS")
+    main._ticker_response_cache.clear()
+    calls = upstreams["ollama_calls"]
+
+    assert asyncio.run(_warmer().run_once()) == 1
+    assert upstreams["ollama_calls"] == calls + 1
+    prefix, final = (json.loads(line) for line in chat_lines("$DOGS"))
+    assert upstreams["ollama_calls"] == calls + 1
+    assert "Dogs is a community meme token on TON." in final["response"]
+
+    warmer = _warmer()
+    asyncio.run(warmer.run_once())
+    assert warmer.stats()["outcomes"] == {FRESH: 1}
+    assert upstreams["ollama_calls"] == calls + 1
+
+
+def test_warm_runs_stay_out_of_latency_metrics(upstreams, monkeypatch):
+    monkeypatch.setattr(main, "_trending", TrendingSymbols())
+    chat_lines("$DOGS")
+    chat_lines("$DOGS")
+    main._ticker_response_cache.clear()
+    histograms = (main._ttft_seconds, main._generation_seconds, main._stream_open_seconds)
+    before = [histogram.render() for histogram in histograms]
+    samples = main._provider_router.tracker("ollama").samples
+
+    assert asyncio.run(_warmer().run_once()) == 1
+    assert [histogram.render() for histogram in histograms] == before
+    assert main._provider_router.tracker("ollama").samples == samples
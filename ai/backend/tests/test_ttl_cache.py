@@ -0,0 +1,60 @@
+from ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_fresh_then_stale_then_expired():
+    clock = FakeClock()
+    cache = TTLCache(10, clock=clock)
+    cache.set("DOGS", 1, ttl_s=10, stale_ttl_s=5)
+
+    assert cache.get("DOGS").stale is False
+    clock.now += 12
+    hit = cache.get("DOGS")
+    assert hit.value == 1 and hit.stale is True
+    clock.now += 5
+    assert cache.get("DOGS") is None
+    assert len(cache) == 0
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"], stats["expirations"]) == (1, 1, 1, 1)
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = TTLCache(2)
+    cache.set("A", 1, ttl_s=60)
+    cache.set("B", 2, ttl_s=60)
+    cache.get("A")
+    cache.set("C", 3, ttl_s=60)
+
+    assert "A" in cache
+    assert "B" not in cache
+    assert "C" in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entry_without_stale_window_is_a_miss_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(10, clock=clock)
+    cache.set("SPAM", False, ttl_s=1)
+    clock.now += 1
+    assert cache.get("SPAM") is None
+
+
+def test_fresh_for_does_not_touch_stats():
+    clock = FakeClock()
+    cache = TTLCache(10, clock=clock)
+    cache.set("DOGS", 1, ttl_s=10, stale_ttl_s=5)
+    clock.now += 4
+
+    assert cache.fresh_for("DOGS") == 6
+    assert cache.fresh_for("NOT") == 0
+    clock.now += 7
+    assert cache.fresh_for("DOGS") == 0
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+# Regex for candidate extraction (alphanumeric 2-10 chars)
+TICKER_RE = re.compile(r"\b[a-zA-Z0-9]{2,10}\b")
+
+# Common non-ticker words to filter out (expand as needed)
+COMMON_WORDS = {
+    "THE", "WHAT", "THIS", "THAT", "HAVE", "WITH", "FROM", "THEY", "BEEN",
+    "WERE", "SAID", "EACH", "WHICH", "THEIR", "ABOUT", "WOULD", "THESE",
+    "OTHER", "COULD", "SOME", "THAN", "THEN", "THEM", "INTO", "ALSO",
+    "YOUR", "JUST", "LIKE", "MORE", "VERY", "WHEN", "MAKE", "TIME",
+    "YEAR", "OVER", "ONLY", "SUCH", "WELL", "BACK", "GOOD", "MUCH",
+    "HTTP", "HTTPS", "WWW", "API", "URL", "COM", "ORG", "NET", "HTML",
+    "JSON", "XML", "JPEG", "PNG", "GIF", "PDF", "DOC", "TXT", "CSV",
+    "AND", "FOR", "ARE", "BUT", "NOT", "YOU", "ALL", "CAN", "HER",
+    "WAS", "ONE", "OUR", "OUT", "DAY", "GET", "HAS", "HIM", "HIS",
+    "HOW", "MAN", "NEW", "NOW", "OLD", "SEE", "TWO", "WAY", "WHO",
+    "BOY", "DID", "ITS", "LET", "PUT", "SAY", "SHE", "TOO", "USE",
+}
+
+# Ticker context keywords (signals this is likely about crypto/tokens)
+TICKER_CONTEXT_EN = {
+    "token", "coin", "crypto", "price", "supply", "market", "cap",
+    "contract", "address", "blockchain", "wallet", "exchange",
+    "trading", "buy", "sell", "hodl", "moon", "lambo", "dip",
+    "pump", "dump", "whale", "airdrop", "mint", "burn", "stake",
+}
+
+TICKER_CONTEXT_RU = {
+    "токен", "монета", "крипто", "цена", "саплай", "капитализация",
+    "контракт", "адрес", "блокчейн", "кошелёк", "биржа", "обмен",
+    "торговля", "купить", "продать", "холдить", "луна", "памп",
+    "дамп", "кит", "аирдроп", "минт", "сжигание", "стейкинг",
+}
+
+MAX_CANDIDATES = 8
+
+# Context words match anywhere as substrings of the lowercased text.
+_CONTEXT_RE = re.compile(
+    "|".join(re.escape(w) for w in sorted(TICKER_CONTEXT_EN | TICKER_CONTEXT_RU, key=len, reverse=True))
+)
+# "$" followed by optional whitespace and the word it prefixes (if any).
+_DOLLAR_WORD_RE = re.compile(r"\$\s*(\w*)")
+_PAIR_SUFFIX_RE = re.compile(r"\b[A-Z0-9]{2,10}(USDT|USD|TON)\b")
+_STANDALONE_RE = re.compile(r"[a-zA-Z0-9]{2,10}")
+_TICKER_NOUNS = ("token", "coin", "jetton", "ticker", "токен", "монета", "тикер", "джеттон")
+_EXPLICIT_FORM_RE = re.compile(
+    r"\b[a-z0-9]{{2,10}}\s+(?:{0})\b|\b(?:{0})\s+[a-z0-9]{{2,10}}\b".format("|".join(_TICKER_NOUNS))
+)
+_WRAP_OPEN = frozenset("([{\"'")
+_WRAP_CLOSE = frozenset(")]}\"'?!.,;")
+
+
+@dataclass(frozen=True)
+class TickerScan:
+    """Everything ticker detection needs from one message, computed in one pass."""
+
+    candidates: Tuple[str, ...]
+    scores: Tuple[Tuple[str, int], ...]
+    dollar_symbols: FrozenSet[str]
+    has_context: bool
+    strong_context: bool
+    explicit_signal: bool
+
+
+EMPTY_SCAN = TickerScan((), (), frozenset(), False, False, False)
+
+
+def _dollar_prefixed(token: str, dollar_words: Dict[str, None], exotic_words: List[str]) -> bool:
+    """Same as ``re.search(rf"\\$\\s*{token}\\b", text, re.IGNORECASE)``."""
+    if token.lower() in dollar_words:
+        return True
+    # Non-ASCII words can still case-fold onto ASCII (e.g. the Kelvin sign).
+    return any(re.fullmatch(re.escape(token), w, flags=re.IGNORECASE) for w in exotic_words)
+
+
+def scan_ticker_text(text: str) -> TickerScan:
+    """
+    Tokenize a message once and derive ticker candidates, their scores,
+    $-signals and context flags together.
+
+    Outputs are identical to the previous per-helper implementation
+    (candidate extraction, explicit-signal and strong-context checks).
+    """
+    if not text:
+        return EMPTY_SCAN
+
+    text_lower = text.lower()
+    has_context = _CONTEXT_RE.search(text_lower) is not None
+
+    # "$WORD" / "$ WORD" positions, gathered once for every token check below.
+    dollar_words: Dict[str, None] = {}
+    exotic_words: List[str] = []
+    exact_prefixes: Set[str] = set()
+    has_dollar = "$" in text
+    if has_dollar:
+        for m in _DOLLAR_WORD_RE.finditer(text):
+            word = m.group(1)
+            if word:
+                if word.isascii():
+                    dollar_words[word.lower()] = None
+                else:
+                    exotic_words.append(word)
+            # Text right after each "$", for the literal "$TOKEN" / "$ TOKEN" +10 score.
+            exact_prefixes.add(text[m.start() + 1:m.start() + 12])
+
+    matches = list(TICKER_RE.finditer(text))
+    text_stripped_lower = text.strip().lower()
+    strong_context = has_dollar
+    wrapped: Set[str] = set()
+    for m in matches:
+        token = m.group(0)
+        if not strong_context and len(token) >= 3 and not any(c.islower() for c in token):
+            strong_context = True
+        start, end = m.span()
+        if start > 0 and end < len(text) and text[start - 1] in _WRAP_OPEN and text[end] in _WRAP_CLOSE:
+            wrapped.add(token)
+
+    scored: List[Tuple[int, str]] = []
+    dollar_symbols: Set[str] = set()
+    seen: Set[str] = set()
+    for m in matches:
+        token = m.group(0)
+        symbol = token.upper()
+        if symbol in seen or symbol.isdigit() or symbol in COMMON_WORDS:
+            continue
+
+        has_dollar_signal = has_dollar and _dollar_prefixed(token, dollar_words, exotic_words)
+        is_standalone_symbol_query = len(matches) == 1 and text_stripped_lower == token.lower()
+
+        # Skip mostly lowercase without context/symbol signal
+        if token.islower() and not has_context and not has_dollar_signal and not is_standalone_symbol_query:
+            continue
+        # Skip very short tokens without uppercase or context
+        if len(symbol) < 3 and not (token.isupper() or has_context):
+            continue
+
+        seen.add(symbol)
+        if has_dollar_signal:
+            dollar_symbols.add(symbol)
+
+        score = 0
+        # +10: Preceded by $ (strong ticker signal)
+        if has_dollar and any(p.startswith(token) or p.startswith(" " + token) for p in exact_prefixes):
+            score += 10
+        # +5: All uppercase in original text
+        if token.isupper():
+            score += 5
+        # +3: Has meaningful uppercase signal (not just sentence TitleCase like "Tell")
+        elif any(c.isupper() for c in token):
+            if not (len(token) > 1 and token[0].isupper() and token[1:].islower()):
+                score += 3
+        # +2: Near ticker context words
+        if has_context:
+            score += 2
+        # +1: Wrapped in punctuation (e.g., "DOGS?" or "(MCOM)")
+        if token in wrapped:
+            score += 1
+        scored.append((score, symbol))
+
+    # Sort by score (descending), then alphabetically
+    scored.sort(key=lambda x: (-x[0], x[1]))
+
+    return TickerScan(
+        candidates=tuple(sym for _, sym in scored[:MAX_CANDIDATES]),
+        scores=tuple((sym, score) for score, sym in scored),
+        dollar_symbols=frozenset(dollar_symbols),
+        has_context=has_context,
+        strong_context=strong_context,
+        explicit_signal=_explicit_signal(text, text_lower, has_dollar),
+    )
+
+
+def _explicit_signal(text: str, text_lower: str, has_dollar: bool) -> bool:
+    # Strong universal signals
+    if has_dollar:
+        return True
+    # The regexes below only run when their literal parts are present.
+    if ("USD" in text or "TON" in text) and _PAIR_SUFFIX_RE.search(text):
+        return True
+
+    # Single standalone token symbol: e.g., "dogs"
+    text_stripped = text.strip()
+    if _STANDALONE_RE.fullmatch(text_stripped):
+        symbol = text_stripped.upper()
+        if not symbol.isdigit() and symbol not in COMMON_WORDS:
+            return True
+
+    # Explicit EN/RU forms: "dogs token", "token dogs", "dogs токен", "токен dogs"
+    if not any(noun in text_lower for noun in _TICKER_NOUNS):
+        return False
+    return _EXPLICIT_FORM_RE.search(text_lower) is not None
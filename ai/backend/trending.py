@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TrendingSymbols:
+    """Request counts per ticker symbol with exponential decay.
+
+    Each detected ticker adds 1 to its symbol's score; scores halve every
+    ``half_life_s``, so the top of :meth:`top` follows current traffic rather
+    than all-time totals. At most ``max_symbols`` are tracked; the lowest
+    score is dropped to make room.
+    """
+
+    def __init__(
+        self,
+        half_life_s: float = 3600.0,
+        max_symbols: int = 512,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.half_life_s = half_life_s
+        self.max_symbols = max(1, max_symbols)
+        self._clock = clock
+        # symbol -> (score, as of)
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        self.recorded = 0
+
+    def _decayed(self, score: float, since: float, now: float) -> float:
+        if self.half_life_s <= 0:
+            return score
+        return score * math.pow(0.5, (now - since) / self.half_life_s)
+
+    def record(self, symbol: str) -> None:
+        symbol = symbol.upper()
+        now = self._clock()
+        score, since = self._scores.get(symbol, (0.0, now))
+        if symbol not in self._scores and len(self._scores) >= self.max_symbols:
+            coldest = min(self._scores, key=lambda s: self._decayed(*self._scores[s], now))
+            del self._scores[coldest]
+        self._scores[symbol] = (self._decayed(score, since, now) + 1.0, now)
+        self.recorded += 1
+
+    def top(self, n: int, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """The ``n`` highest-scoring symbols with a score of at least ``min_score``."""
+        now = self._clock()
+        ranked = sorted(
+            ((symbol, self._decayed(score, since, now)) for symbol, (score, since) in self._scores.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return [(symbol, score) for symbol, score in ranked[:n] if score >= min_score]
+
+    def stats(self, n: int = 10) -> Dict[str, Any]:
+        return {
+            "tracked": len(self._scores),
+            "recorded": self.recorded,
+            "half_life_s": self.half_life_s,
+            "top": {symbol: round(score, 2) for symbol, score in self.top(n)},
+        }
+
+
+# warm(symbol, lang) outcome
+WARMED = "warmed"
+FRESH = "fresh"
+
+
+class NarrativeWarmer:
+    """Pre-generate ticker answers for trending symbols while providers are idle.
+
+    Every ``interval_s`` the ``top_n`` symbols from ``trending`` (scoring at
+    least ``min_score``) are refreshed with ``refresh(symbol)`` and then
+    ``warm(symbol, lang)`` runs for each language. ``warm`` returns
+    :data:`WARMED`, :data:`FRESH` (a cached answer is still good) or another
+    outcome string, which is only counted. Work stops for the cycle as soon
+    as ``idle()`` is false, so live requests always come first.
+    """
+
+    def __init__(
+        self,
+        trending: TrendingSymbols,
+        refresh: Callable[[str], Awaitable[None]],
+        warm: Callable[[str, str], Awaitable[str]],
+        idle: Callable[[], bool],
+        languages: Sequence[str] = ("en", "ru"),
+        top_n: int = 10,
+        min_score: float = 3.0,
+        interval_s: float = 60.0,
+    ) -> None:
+        self.trending = trending
+        self._refresh = refresh
+        self._warm = warm
+        self._idle = idle
+        self.languages = list(dict.fromkeys(lang for lang in languages if lang))
+        self.top_n = top_n
+        self.min_score = min_score
+        self.interval_s = interval_s
+        self.cycles = 0
+        self.deferred = 0
+        self.outcomes: Dict[str, int] = {}
+        self.last_cycle_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        """One warming pass; returns how many answers were generated."""
+        self.cycles += 1
+        self.last_cycle_at = time.time()
+        warmed = 0
+        for symbol, _score in self.trending.top(self.top_n, self.min_score):
+            if not self._idle():
+                self.deferred += 1
+                break
+            try:
+                await self._refresh(symbol)
+            except Exception as e:
+                logger.info(f"[WARM] fact refresh for {symbol} failed: {e!r}")
+            for lang in self.languages:
+                if not self._idle():
+                    self.deferred += 1
+                    return warmed
+                try:
+                    outcome = await self._warm(symbol, lang)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"[WARM] {symbol}/{lang} failed: {e!r}")
+                    outcome = "error"
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+                if outcome == WARMED:
+                    warmed += 1
+                    logger.info(f"[WARM] pre-generated ticker answer for {symbol} lang={lang}")
+        return warmed
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_s)
+            await self.run_once()
+
+    def start(self) -> None:
+        if self.interval_s > 0 and self.languages and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_s": self.interval_s,
+            "languages": self.languages,
+            "top_n": self.top_n,
+            "min_score": self.min_score,
+            "cycles": self.cycles,
+            "deferred_busy": self.deferred,
+            "outcomes": dict(self.outcomes),
+            "trending": self.trending.stats(self.top_n),
+        }
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar("V")
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    fresh_until: float
+    stale_until: float
+
+
+@dataclass(frozen=True)
+class CacheHit(Generic[V]):
+    value: V
+    stale: bool
+
+
+class TTLCache(Generic[V]):
+    """Bounded LRU cache with per-entry TTL and an optional stale window.
+
+    ``get`` returns a :class:`CacheHit` while the entry is fresh, and keeps
+    returning it flagged ``stale=True`` until ``stale_until`` so callers can
+    serve it while they refresh in the background. Past the stale window the
+    entry is dropped and the lookup counts as a miss.
+    """
+
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, _Entry[V]]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and self._clock() < entry.stale_until
+
+    def get(self, key: Hashable) -> Optional[CacheHit[V]]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = self._clock()
+        if now >= entry.stale_until:
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        if now < entry.fresh_until:
+            self.hits += 1
+            return CacheHit(entry.value, stale=False)
+        self.stale_hits += 1
+        return CacheHit(entry.value, stale=True)
+
+    def set(self, key: Hashable, value: V, ttl_s: float, stale_ttl_s: float = 0.0) -> None:
+        now = self._clock()
+        fresh_until = now + max(ttl_s, 0.0)
+        self._data[key] = _Entry(value, fresh_until, fresh_until + max(stale_ttl_s, 0.0))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def fresh_for(self, key: Hashable) -> float:
+        """Seconds until ``key`` goes stale (0 if missing or already stale); does not count as a lookup."""
+        entry = self._data.get(key)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry.fresh_until - self._clock())
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        entry = self._data.pop(key, None)
+        return entry.value if entry is not None else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+        }
@@ -21,6 +21,8 @@ async def post_chat_once(messages: list, api_key: str, timeout_s: float) -> tupl
             headers={
                 "Content-Type": "application/json",
                 "X-API-Key": api_key,
+                # HTTP proxy callers queue behind Telegram chats on the AI backend.
+                "X-Request-Priority": "api",
             },
         )
     content_type = upstream.headers.get("content-type", "application/x-ndjson")
@@ -39,6 +41,7 @@ async def stream_chat(messages: list, api_key: str, timeout_s: float = 60.0):
             headers={
                 "Content-Type": "application/json",
                 "X-API-Key": api_key,
+                "X-Request-Priority": "interactive",
             },
         ) as response:
             yield ai_backend_url, response
@@ -3,6 +3,7 @@ from pathlib import Path
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os, json
+import asyncio
 import hashlib
 from datetime import datetime
 import urllib.request
@@ -32,6 +33,7 @@ SWAP_COFFEE_BASE_URL = _normalize_url(
 COFFEE_KEY = (os.getenv("COFFEE_KEY") or os.getenv("TOKENS_API_KEY") or "").strip()
 INNER_CALLS_KEY = (os.getenv("INNER_CALLS_KEY") or os.getenv("API_KEY") or "").strip()
 TOKENS_VERIFICATION = os.getenv("TOKENS_VERIFICATION", "WHITELISTED,COMMUNITY,UNKNOWN")
+TOKENS_BATCH_MAX = int(os.getenv("TOKENS_BATCH_MAX", "16"))
 
 
 def _mask_secret(value: str, visible: int = 4) -> str:
@@ -362,6 +364,9 @@ class QueryRequest(BaseModel):
     query: str
     top_k: int = 5
 
+class TokenBatchRequest(BaseModel):
+    symbols: List[str]
+
 class Project(BaseModel):
     id: str
     name: str
@@ -387,8 +392,8 @@ async def get_project(project_id: str, api_key: str = Depends(verify_inner_calls
             return p
     return {"error": "not found"}
 
-@app.get("/tokens/{symbol}")
-async def get_token(symbol: str, api_key: str = Depends(verify_inner_calls_key)):
+def _lookup_token(symbol: str) -> Dict[str, Any]:
+    """Build the /tokens payload for one symbol (blocking: calls swap.coffee)."""
     now = datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
     normalized = _normalize_symbol(symbol)
     source_params = {
@@ -519,6 +524,52 @@ async def get_token(symbol: str, api_key: str = Depends(verify_inner_calls_key))
 
     return token
 
+def _batch_entry(token: Dict[str, Any]) -> Dict[str, Any]:
+    error = token.get("error")
+    if not error:
+        return {"status": "ok", "data": token}
+    if error == "not_found":
+        return {"status": "not_found"}
+    return {"status": "unavailable", "reason": token.get("reason")}
+
+# In-flight swap.coffee lookups by normalized symbol; concurrent requests share one.
+_token_lookups: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+async def _lookup_token_shared(symbol: str) -> Dict[str, Any]:
+    key = _normalize_symbol(symbol)
+    task = _token_lookups.get(key)
+    if task is None:
+        task = asyncio.ensure_future(asyncio.to_thread(_lookup_token, key))
+        _token_lookups[key] = task
+        task.add_done_callback(lambda t: _token_lookups.pop(key, None) if _token_lookups.get(key) is t else None)
+    # Shield so one caller disconnecting does not fail the others.
+    return await asyncio.shield(task)
+
+@app.get("/tokens/{symbol}")
+async def get_token(symbol: str, api_key: str = Depends(verify_inner_calls_key)):
+    return await _lookup_token_shared(symbol)
+
+@app.post("/tokens/batch")
+async def get_tokens_batch(req: TokenBatchRequest, api_key: str = Depends(verify_inner_calls_key)):
+    """Look up several symbols in one call; upstream fetches run concurrently.
+
+    Returns {"results": {SYMBOL: {"status": "ok", "data": {...}} |
+    {"status": "not_found"} | {"status": "unavailable", "reason": ...}}}.
+    """
+    symbols: List[str] = []
+    for raw in req.symbols:
+        normalized = _normalize_symbol(raw)
+        if normalized and normalized not in symbols:
+            symbols.append(normalized)
+    if len(symbols) > TOKENS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {TOKENS_BATCH_MAX} symbols per batch.")
+
+    tokens = await asyncio.gather(*(_lookup_token_shared(s) for s in symbols))
+    return {
+        "results": {symbol: _batch_entry(token) for symbol, token in zip(symbols, tokens)},
+        "updated_at": datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+    }
+
 @app.post("/ingest")
 async def ingest(req: IngestRequest, api_key: str = Depends(verify_inner_calls_key)):
     store = load_store()